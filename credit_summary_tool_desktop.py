@@ -38,7 +38,7 @@ import numpy as np
 from reports import desktop_map_report
 from database.models import CreditData
 from database.database import build_database
-from database.credit_calc import run_calculator, save_output
+from database.credit_calc import run_calculator, save_output, ProjectSession
 from database.scenario_calc import run_scenario_report
 from reports import plotting
 
@@ -82,10 +82,14 @@ def main():
     # Instantiate CreditData object
     C = CreditData(db=database_path)
     
+    # Current scores and f-acres are computed once and shared by the credit
+    # and scenario calculators
+    session = ProjectSession(C)
+    
     arcpy.AddMessage('calculating credits')
     
     # Retrieve projected credit report
-    current_credits, projected_credits = run_calculator(C)
+    current_credits, projected_credits = run_calculator(session)
     
     arcpy.AddMessage('building report')
     
@@ -100,7 +104,7 @@ def main():
     )
     
     # Get scenario results
-    scenario_report = run_scenario_report(C)
+    scenario_report = run_scenario_report(session)
     save_output(outputs, scenario_report, 'scenario_report.csv')
     
     # Create and save plots
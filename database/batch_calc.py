@@ -0,0 +1,250 @@
+import credit_calc as calc
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+# Habitat attributes that can be projected, in the order of the attribute
+# axis of a scenario batch
+HAB_ATTRS = calc.HAB_ATTRS
+
+SEASONS = calc.SEASONS
+
+
+def stack_projected_values(projected_values_list, site_scale_values):
+    '''
+    Returns a scenario x map unit x attribute array of site-scale values
+    with the projected values of each scenario substituted for the current
+    values, and a scenario x map unit array that is True where the map unit
+    is in the scenario. Follows credit_calc.project_site_scale: values that
+    appear in multiple seasons are averaged, missing projected values keep
+    the current value and map units without projected values are left out.
+    :param projected_values_list: list of projected_values in tidy form with
+    columns ['map_unit_id', 'hab_attr', and 'attr_value']
+    :param site_scale_values: the site_scale_values table read from the
+    database, map units along the map unit axis are in this order.
+    '''
+    map_unit_ids = pd.Index(site_scale_values['map_unit_id'])
+    current = np.asarray(site_scale_values[HAB_ATTRS], dtype='float64')
+    n_scenarios = len(projected_values_list)
+    n_units = len(map_unit_ids)
+    if n_scenarios == 0:
+        return (np.zeros((0,) + current.shape),
+                np.zeros((0, n_units), dtype=bool))
+
+    # stack all scenarios in a single tidy table, one row of the override
+    # matrix per scenario and map unit
+    rows = []
+    hab_attrs = []
+    attr_values = []
+    for i, projected_values in enumerate(projected_values_list):
+        units = map_unit_ids.get_indexer(projected_values['map_unit_id'])
+        rows.append(np.where(units >= 0, i * n_units + units, -1))
+        hab_attrs.append(projected_values['hab_attr'].values)
+        attr_values.append(np.asarray(
+            projected_values.drop(['map_unit_id', 'hab_attr'], axis=1)
+            .iloc[:, 0], dtype='float64'))
+
+    overrides, present = calc.override_matrix(
+        np.concatenate(rows), np.concatenate(hab_attrs),
+        np.concatenate(attr_values), n_scenarios * n_units)
+    overrides = overrides.reshape(n_scenarios, n_units, len(HAB_ATTRS))
+    projected = np.where(np.isnan(overrides), current, overrides)
+
+    return projected, present.reshape(n_scenarios, n_units)
+
+
+def score_batch(project, projected, present, site_scale_values,
+                trigger=None):
+    '''
+    Returns an OrderedDict of scores, as scenario x map unit arrays, for a
+    batch of projected site-scale values. Seasonal scores of map units not
+    in a scenario are NaN.
+    :param project: an instance of the CreditData class.
+    :param projected, present: from stack_projected_values
+    :param site_scale_values: the site_scale_values table read from the
+    database.
+    :param trigger: optional breeding trigger, see credit_calc.score_arrays
+    '''
+    values, site = calc.site_scale_arrays(site_scale_values)
+    for i, hab_attr in enumerate(HAB_ATTRS):
+        values[hab_attr] = projected[:, :, i]
+    # dist_sage is not projected
+    values['dist_sage'] = values['dist_sage'] + np.zeros(present.shape)
+
+    scores = calc.score_arrays(project, values, site, trigger)
+    for season in SEASONS:
+        scores[season] = np.where(present, scores[season], np.nan)
+
+    return scores
+
+
+def facres_batch(desktop_results, site_scale_values, scores, local_scale):
+    '''
+    Returns an OrderedDict of habitat function and functional acre arrays
+    (scenario x map unit, map units in the order of desktop_results) for
+    each season, as calc_facres computes them for a single scenario.
+    :param scores: seasonal scores from score_batch
+    :param local_scale: the current or projected local-scale table
+    '''
+    return calc.facres_arrays(desktop_results, 
+                              site_scale_values['map_unit_id'], scores, 
+                              local_scale)
+
+
+def credit_arrays(project, desktop_results, pre_facre_report, facres,
+                  pre_facres=None, multipliers=None):
+    '''
+    Returns the credit report of calc_credits for pre_facre_report compared
+    to itself, used as a template for the joined rows, multipliers and 
+    reserve contributions, and an OrderedDict of the post f-acre, delta and
+    credit columns (scenario x template row arrays) for each scenario.
+    :param pre_facre_report: the f-acre report to compare each scenario to
+    :param facres: post f-acre arrays from facres_batch
+    :param pre_facres: optional pre f-acre arrays from facres_batch, one
+    per scenario, to compare each scenario to instead of the f-acres of
+    pre_facre_report
+    :param multipliers: optional dict of 'mgmt_multiplier' and/or
+    'meadow_multiplier' arrays (scenario x template row) to use instead of
+    the multipliers of the template
+    '''
+    template = calc.calc_credits(project, desktop_results, pre_facre_report,
+                                 pre_facre_report)
+    rows = pd.Index(desktop_results['map_unit_id']).get_indexer(
+        template['map_unit_id'])
+    mgmt_multiplier = template['mgmt_multiplier'].values
+    meadow_multiplier = template['meadow_multiplier'].values
+    if multipliers is not None:
+        mgmt_multiplier = multipliers.get('mgmt_multiplier', mgmt_multiplier)
+        meadow_multiplier = multipliers.get('meadow_multiplier',
+                                            meadow_multiplier)
+
+    columns = OrderedDict(
+        (column + '_post', values[:, rows])
+        for column, values in facres.items()
+        )
+    if pre_facres is not None:
+        for column, values in pre_facres.items():
+            columns[column + '_pre'] = values[:, rows]
+        pre = dict(
+            (season + '_facres', columns[season + '_facres_pre'])
+            for season in SEASONS
+            )
+    else:
+        pre = dict(
+            (season + '_facres', template[season + '_facres_pre'].values)
+            for season in SEASONS
+            )
+    post = dict(
+        (season + '_facres', columns[season + '_facres_post'])
+        for season in SEASONS
+        )
+
+    columns.update(calc.credit_columns(
+        pre, post, mgmt_multiplier, meadow_multiplier,
+        template['total_contribution'].values))
+
+    return template, columns
+
+
+def current_credit_arrays(project, desktop_results, site_scale_values, 
+                          scores, current_ls, baseline_facres, 
+                          multipliers=None):
+    '''
+    Returns the template and credit columns of credit_arrays for current
+    credits of a batch of scores, each compared to the standard baseline
+    (from the project's policy context) corrected by its own scores (the 
+    baseline is the lower of the two) as run_calculator does.
+    :param scores: seasonal scores, scenario x map unit arrays
+    :param baseline_facres: baseline f-acre report of calc_facres, used as
+    the credit report template
+    :param multipliers: see credit_arrays
+    '''
+    standard_baseline = project.policy_context.baseline_scores(
+        site_scale_values['map_unit_id'])
+    baseline_scores = OrderedDict()
+    for season in SEASONS:
+        standard = standard_baseline[season] + np.zeros(scores[season].shape)
+        with np.errstate(invalid='ignore'):
+            lower = standard > scores[season]
+        baseline_scores[season] = np.where(lower, scores[season], standard)
+
+    facres = facres_batch(desktop_results, site_scale_values, scores,
+                          current_ls)
+    pre_facres = facres_batch(desktop_results, site_scale_values,
+                              baseline_scores, current_ls)
+    return credit_arrays(project, desktop_results, baseline_facres, facres,
+                         pre_facres, multipliers)
+
+
+def credits_batch(project, desktop_results, pre_facre_report, facres, names):
+    '''
+    Returns an OrderedDict of credit reports, one per scenario, identical to
+    calc_credits(project, desktop_results, pre_facre_report, post) for the
+    post f-acre report of each scenario.
+    :param pre_facre_report: the f-acre report to compare each scenario to
+    :param facres: post f-acre arrays from facres_batch
+    :param names: scenario names, in the order of the scenario axis
+    '''
+    template, columns = credit_arrays(project, desktop_results, 
+                                      pre_facre_report, facres)
+
+    credit_reports = OrderedDict()
+    for i, name in enumerate(names):
+        report = OrderedDict(
+            (column, template[column].values) for column in template.columns
+            )
+        for column, values in columns.items():
+            report[column] = values[i]
+        credit_reports[name] = pd.DataFrame(report, index=template.index,
+                                            columns=template.columns)
+
+    return credit_reports
+
+
+def calc_batch_credits(project, names, projected_values_list, current_facres,
+                       local_scale=None):
+    '''
+    Scores, computes functional acres and credits for a batch of projected
+    values in one vectorized pass. Returns an OrderedDict of credit reports
+    keyed by name, identical to running project_site_scale,
+    score_site_scale, calc_facres and calc_credits on each one.
+    :param project: an instance of the CreditData class.
+    :param names: name of each set of projected values
+    :param projected_values_list: list of projected_values in tidy form with
+    columns ['map_unit_id', 'hab_attr', and 'attr_value']
+    :param current_facres: the f-acre report to compare to
+    :param local_scale: local-scale table, projected_ls if None
+    '''
+    site_scale_values = project.site_scale_values
+    projected, present = stack_projected_values(projected_values_list,
+                                                site_scale_values)
+
+    return calc_projected_credits(project, names, projected, present,
+                                  current_facres, local_scale)
+
+
+def calc_projected_credits(project, names, projected, present, 
+                           current_facres, local_scale=None):
+    '''
+    Returns an OrderedDict of credit reports keyed by name, as 
+    calc_batch_credits does, for a batch of site-scale values that are 
+    already stacked.
+    :param projected: scenario x map unit x attribute array of site-scale 
+    values (attributes in HAB_ATTRS order, map units in the order of 
+    site_scale_values)
+    :param present: scenario x map unit array, True where the map unit is in
+    the scenario
+    :param names, current_facres, local_scale: see calc_batch_credits
+    '''
+    desktop_results = project.desktop_results
+    site_scale_values = project.site_scale_values
+    if local_scale is None:
+        local_scale = project.projected_ls
+
+    scores = score_batch(project, projected, present, site_scale_values)
+    facres = facres_batch(desktop_results, site_scale_values, scores,
+                          local_scale)
+
+    return credits_batch(project, desktop_results, current_facres, facres,
+                         names)
@@ -0,0 +1,206 @@
+import credit_calc as calc
+import batch_calc as batch
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+# Transect metrics averaged into each site-scale value, in the order of the
+# attribute axis of resampled means
+TRANSECT_ATTRS = OrderedDict([
+    ('dist_sage', 'dist_sage'),
+    ('sage_cover', 'sage_cover'),
+    ('sage_height', 'sage_height'),
+    ('shrub_cover', 'shrub_cover'),
+    ('forb_cover', 'forb_cover'),
+    ('forb_rich', 'unique_forbs'),
+    ('grass_cover', 'grass_cover'),
+    ('brotec_cover', 'brotec_cover')
+])
+
+
+def transect_arrays(transect_metrics, site_scale_values):
+    '''
+    Returns the transect metrics as a transect x attribute array grouped by
+    map unit in the order of site_scale_values, and the position of the
+    first transect and number of transects of each map unit.
+    :param transect_metrics: the transect_metrics table read from the
+    database
+    :param site_scale_values: the site_scale_values table read from the
+    database
+    '''
+    units = pd.Index(site_scale_values['map_unit_id']).get_indexer(
+        transect_metrics['map_unit_id'])
+    keep = np.flatnonzero(units >= 0)
+    order = keep[np.argsort(units[keep], kind='mergesort')]
+    data = np.asarray(
+        transect_metrics[list(TRANSECT_ATTRS.values())], dtype='float64'
+        )[order]
+    counts = np.bincount(units[order], minlength=len(site_scale_values))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype('int64')
+    return data, starts, counts
+
+
+def resample_means(data, starts, counts, draws, sizes=None):
+    '''
+    Returns replicate x map unit x attribute means of transects drawn with
+    replacement within each map unit, averaged as site_scale_metrics does:
+    missing metrics count as 0 unless all transects are missing, and forb
+    richness is an integer mean.
+    :param data, starts, counts: from transect_arrays
+    :param draws: replicate x map unit x transect array of uniform random
+    numbers in [0, 1), at least as many transects as are drawn
+    :param sizes: number of transects drawn for each map unit, an array
+    over map units or replicates x map units; the surveyed number if None
+    '''
+    if sizes is None:
+        sizes = counts
+    sizes = np.asarray(sizes, dtype='int64') + np.zeros(draws.shape[:2],
+                                                         dtype='int64')
+    valid = np.arange(draws.shape[2]) < sizes[:, :, np.newaxis]
+    valid &= (counts > 0)[:, np.newaxis]
+    picks = starts[:, np.newaxis] + np.floor(
+        draws * counts[:, np.newaxis]).astype('int64')
+    picks = np.where(valid, picks, 0)
+
+    if len(data) == 0:
+        values = np.empty(picks.shape + (len(TRANSECT_ATTRS),))
+        values.fill(np.nan)
+    else:
+        values = data[picks]
+    measured = ~np.isnan(values) & valid[:, :, :, np.newaxis]
+    sums = np.where(measured, values, 0).sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / sizes[:, :, np.newaxis]
+    means[~measured.any(axis=2)] = np.nan
+
+    forb_rich = list(TRANSECT_ATTRS.keys()).index('forb_rich')
+    means[:, :, forb_rich] = np.floor(means[:, :, forb_rich])
+    return means
+
+
+def replicate_credits(project, means, site_scale_values, desktop_results,
+                      current_ls, baseline_facres, credit_column):
+    '''
+    Returns replicate x template row arrays of current credits for
+    resampled site-scale values, compared to the standard baseline corrected
+    by each replicate's scores as run_calculator does, and the template
+    credit report.
+    :param means: replicate x map unit x attribute array from resample_means
+    :param baseline_facres: baseline f-acre report of the point estimates,
+    used as the credit report template
+    '''
+    values, site = calc.site_scale_arrays(site_scale_values)
+    for i, hab_attr in enumerate(TRANSECT_ATTRS.keys()):
+        values[hab_attr] = means[:, :, i]
+    scores = calc.score_arrays(project, values, site)
+    template, credits = batch.current_credit_arrays(
+        project, desktop_results, site_scale_values, scores, current_ls,
+        baseline_facres)
+    return template, credits[credit_column]
+
+
+def point_estimates(project):
+    '''
+    Returns the current credit report and baseline f-acre report from the
+    surveyed site-scale values, as run_calculator calculates them.
+    :param project: an instance of the CreditData class, or a 
+    credit_calc.ProjectSession to reuse its current state.
+    '''
+    session = calc.project_session(project)
+    return session.current_credits, session.baseline_facres
+
+
+def bootstrap_credits(project, replicates=1000, confidence=0.9,
+                      credit_column='saleable_credits', seed=None,
+                      chunk_size=100):
+    '''
+    Estimates the uncertainty of current credits from transect sampling.
+    Transects are resampled with replacement within each map unit, averaged
+    into site-scale values and scored, and each replicate's credits are
+    calculated in vectorized chunks. Map unit characteristics (meadow,
+    dominant sage species) are held at their surveyed values. Returns a
+    table of the estimate and confidence interval of each map unit, and an
+    OrderedDict of the same for the project total.
+    :param project: an instance of the CreditData class.
+    :param replicates: number of bootstrap replicates
+    :param confidence: width of the confidence interval, e.g. 0.9 for the
+    5th to 95th percentile
+    :param credit_column: column of the calc_credits report to estimate
+    :param seed: seed for the random numbers, for repeatable intervals
+    :param chunk_size: number of replicates scored at once, limits memory
+    '''
+    # read from database
+    site_scale_values = project.site_scale_values
+    desktop_results = project.desktop_results
+    current_ls = project.current_ls
+
+    current_credits, baseline_facres = point_estimates(project)
+
+    data, starts, counts = transect_arrays(project.transect_metrics,
+                                           site_scale_values)
+    n_transects = counts.max() if len(counts) > 0 else 0
+    random_state = np.random.RandomState(seed)
+
+    results = []
+    for start in range(0, replicates, chunk_size):
+        n_replicates = min(chunk_size, replicates - start)
+        draws = random_state.random_sample(
+            (n_replicates, len(site_scale_values), n_transects))
+        means = resample_means(data, starts, counts, draws)
+        template, credits = replicate_credits(
+            project, means, site_scale_values, desktop_results, current_ls,
+            baseline_facres, credit_column)
+        results.append(credits)
+    credits = np.concatenate(results)
+
+    tail = 100 * (1 - confidence) / 2
+    percentiles = [tail, 100 - tail]
+
+    estimate = current_credits.set_index('map_unit_id')[credit_column]
+    intervals = template[['map_unit_id', 'map_unit_name']].copy()
+    intervals[credit_column] = estimate.reindex(
+        intervals['map_unit_id']).values
+    with np.errstate(invalid='ignore'):
+        intervals['mean'] = pd.DataFrame(credits).mean().values
+        intervals['std'] = pd.DataFrame(credits).std().values
+        lower, upper = nan_percentiles(credits, percentiles)
+    intervals['lower'] = lower
+    intervals['upper'] = upper
+
+    totals = pd.DataFrame(credits).sum(axis=1).values
+    project_interval = OrderedDict()
+    project_interval[credit_column] = current_credits[credit_column].sum()
+    project_interval['mean'] = totals.mean()
+    project_interval['std'] = totals.std(ddof=1)
+    lower, upper = nan_percentiles(totals[:, np.newaxis], percentiles)
+    project_interval['lower'] = lower[0]
+    project_interval['upper'] = upper[0]
+
+    return intervals, project_interval
+
+
+def nan_percentiles(values, percentiles):
+    '''
+    Returns each percentile of the columns of values, ignoring NaN (NaN
+    where a column is all NaN), interpolated as np.percentile does.
+    '''
+    # NaN sort last, so the observed values of each column come first
+    ordered = np.sort(values, axis=0)
+    observed = (~np.isnan(values)).sum(axis=0)
+    columns = np.arange(values.shape[1])
+    last = np.maximum(observed - 1, 0)
+    results = []
+    for percentile in percentiles:
+        position = percentile / 100.0 * last
+        below = np.floor(position).astype('int64')
+        above = np.minimum(below + 1, last)
+        fraction = position - below
+        if len(ordered) == 0:
+            result = np.zeros(values.shape[1])
+        else:
+            result = (ordered[below, columns] * (1 - fraction)
+                      + ordered[above, columns] * fraction)
+        result[observed == 0] = np.nan
+        results.append(result)
+    return results
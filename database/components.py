@@ -1,18 +1,40 @@
 import sqlite3
 from sqlite3 import Error
 import sys
+from collections import OrderedDict
 from arcpy import AddMessage
 
+# Pragmas for bulk loading a database that is thrown away if the build fails
+BUILD_PRAGMAS = OrderedDict([
+    ('journal_mode', 'OFF'),
+    ('synchronous', 'OFF'),
+    ('cache_size', -262144),  # in KiB, 256 MB
+    ('temp_store', 'MEMORY'),
+    ('mmap_size', 268435456)
+])
 
-def create_connection(db_file):
+# Durable settings restored before a built database is put in place
+DURABLE_PRAGMAS = OrderedDict([
+    ('journal_mode', 'DELETE'),
+    ('synchronous', 'FULL'),
+    ('temp_store', 'DEFAULT'),
+    ('mmap_size', 0)
+])
+
+
+def create_connection(db_file, pragmas=None):
     """
     Create a database connection to the sqlite database specified by db_file
     :param db_file: database file
+    :param pragmas: optional dict of pragma names and values to set on the
+    connection (e.g., BUILD_PRAGMAS)
     :return: connection object or None
     """
     conn = None
     try:
         conn = sqlite3.connect(db_file)
+        if pragmas:
+            set_pragmas(conn, pragmas)
     except Error as e:
         # conn.close()
         AddMessage(e)
@@ -21,6 +43,18 @@ def create_connection(db_file):
     return conn
 
 
+def set_pragmas(conn, pragmas):
+    """
+    Set pragmas on a connection
+    :param conn: connection object
+    :param pragmas: dict of pragma names and values
+    :return: None
+    """
+    c = conn.cursor()
+    for name, value in pragmas.items():
+        c.execute('PRAGMA {} = {}'.format(name, value))
+
+
 def create_table(conn, create_table_sql):
     """
     Create a table from the create_table_sql statement
@@ -58,6 +92,28 @@ def insert_data(conn, sql_file, data):
     return c.lastrowid
 
 
+def insert_many(conn, sql_file, data):
+    """
+    Insert many rows into the specified table using a .sql file. The sql
+    file is read once and all rows are loaded with a single executemany.
+    :param conn: connection object
+    :param sql_file: a .sql file containing the sql command
+    :param data: a list of tuples
+    :return: the number of rows inserted
+    """
+    with open(sql_file, 'r') as file:
+        sql = file.read()
+    try:
+        c = conn.cursor()
+        c.executemany(sql, data)
+    except Error as e:
+        conn.close()
+        AddMessage(e)
+        sys.exit(0)
+    
+    return len(data)
+
+
 def create_view(conn, sql_file):
     """
     Executes a sql file
@@ -74,3 +130,49 @@ def create_view(conn, sql_file):
         conn.close()
         AddMessage(e)
         sys.exit(0)
+
+
+def finalize_database(conn):
+    """
+    Restores durable settings on a connection opened with BUILD_PRAGMAS, 
+    checks the integrity of the database and compacts it with VACUUM
+    :param conn: connection object
+    :return: None
+    """
+    try:
+        conn.commit()
+        set_pragmas(conn, DURABLE_PRAGMAS)
+        c = conn.cursor()
+        c.execute('PRAGMA integrity_check')
+        result = c.fetchone()[0]
+        if result != 'ok':
+            conn.close()
+            AddMessage('integrity check failed: {}'.format(result))
+            sys.exit(0)
+        c.execute('VACUUM')
+    except Error as e:
+        conn.close()
+        AddMessage(e)
+        sys.exit(0)
+
+
+def copy_database(source, destination):
+    """
+    Copies the database open on source into destination in a single pass
+    using the sqlite3 online backup API (python 3.7+), or by replaying an 
+    sql dump where the backup API is not available
+    :param source: connection object to copy from
+    :param destination: connection object to copy into
+    :return: None
+    """
+    try:
+        if hasattr(source, 'backup'):
+            source.backup(destination)
+        else:
+            destination.executescript('\n'.join(source.iterdump()))
+        destination.commit()
+    except Error as e:
+        source.close()
+        destination.close()
+        AddMessage(e)
+        sys.exit(0)
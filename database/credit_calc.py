@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from math import floor
+from collections import OrderedDict
 from models import CreditData
 import os
 
@@ -8,378 +8,322 @@ import os
 # Constants
 BREEDING_TRIGGER = 0.3
 
+SEASONS = ['breed', 'summer', 'winter']
+
+# Habitat attributes that can be projected, in the order of the attribute
+# axis of an override matrix
+HAB_ATTRS = [
+    'sage_cover',
+    'sage_height',
+    'shrub_cover',
+    'forb_cover',
+    'forb_rich',
+    'grass_cover',
+    'brotec_cover'
+]
+
 
 # Functions
 
-def score_site_scale(project, site_scale_values):
+def site_scale_arrays(site_scale_values):
     '''
-    Returns dataframe with score of provided site_scale_values
+    Returns the habitat attribute values and the map unit characteristics
+    used to score site_scale_values as dicts of numpy arrays.
+    :param site_scale_values: the site_scale_values table to be scored.
+    '''
+    hab_attrs = [
+        'sage_cover', 
+        'sage_height', 
+        'shrub_cover',
+        'forb_cover', 
+        'forb_rich', 
+        'grass_cover', 
+        'brotec_cover',
+        'dist_sage'
+    ]
+    values = dict(
+        (hab_attr, np.asarray(site_scale_values[hab_attr], dtype='float64'))
+        for hab_attr in hab_attrs
+        )
+    
+    meadow = site_scale_values['meadow']
+    sage_species = site_scale_values['sage_species']
+    site = {
+        'meadow': (meadow != 'No Meadow').values,
+        'altered': (meadow == 'Altered').values,
+        'unaltered': (meadow == 'Unaltered').values,
+        'arid': site_scale_values['arid'].values,
+        'mesic': site_scale_values['mesic'].values,
+        'big_sage': (sage_species == 'Big Sagebrush').values,
+        'low_sage': (sage_species == 'Low or Black Sagebrush').values,
+        'no_sage': (sage_species == 'None').values,
+        'indirect': (
+            site_scale_values['indirect_benefits_area']
+            .astype('int').astype('bool').values
+            ),
+        'phase_3': (site_scale_values['conifer_phase'] == 'Phase III').values,
+        'spring_hsi': site_scale_values['spring_hsi'].values,
+        'summer_hsi': site_scale_values['summer_hsi'].values,
+        'winter_hsi': site_scale_values['winter_hsi'].values
+    }
+    
+    return values, site
+
+
+def score_arrays(project, values, site, trigger=None):
+    '''
+    Returns an OrderedDict of attribute, habitat function and seasonal 
+    scores as numpy arrays, in the column order of score_site_scale.
     :param project: an instance of the CreditData class. Used to get
     scoring curves and scoring weights associated with the project.
-    :param site_scale_values: the site_scale_values table to be
-    scored.
+    :param values: dict of habitat attribute values from site_scale_arrays.
+    The last axis is the map unit; leading axes (e.g. scenario) are scored 
+    in the same pass.
+    :param site: dict of map unit characteristics from site_scale_arrays, 
+    one value per map unit.
+    :param trigger: optional breeding trigger (True or False, or a boolean 
+    array) to use instead of the one calculated from shrub and grass cover
     '''
-    
     # read from database
-    scoring_curves = project.scoring_curves
+    curve_table = project.curve_table
     curve_lookup = project.curve_lookup
-    scoring_weights = project.scoring_weights
+    weight_table = project.weight_table
 
-    # helper function to lookup score of any value against any scoring curve
-    def score_attribute(hab_value, curve_name):
+    # helper function to score values against any scoring curve
+    def score_attribute(hab_values, curve_name):
         """
-        Looks up a score from the 'scoring_curves' dataframe for the measure of any 
-        habitat attribute (e.g., 35 percent cover of forb_cover). N/A returns 0.
-        :param hab_value: measure of the habitat attribute, percents as integers
+        Looks up scores from the compiled scoring curves for the measures of 
+        any habitat attribute (e.g., 35 percent cover of forb_cover). N/A 
+        returns 0.
+        :param hab_values: measures of the habitat attribute, percents as 
+        integers
         :param curve_name: name of the scoring curve to use (e.g., b_sage_cover).
         """
-        if np.isnan(hab_value):
-            return 0
-        else:
-            return scoring_curves.loc[int(floor(hab_value)), curve_name]
+        return curve_table.score(hab_values, curve_name)
     
+    # helper function for the weighted average of arid and mesic scores
+    def score_precip(hab_values, score):
+        return (
+            score_attribute(hab_values, score + '_arid') * site['arid']
+            + score_attribute(hab_values, score + '_mesic') * site['mesic']
+        )
 
-    # Create site scale score dataframe
-    site_scale_scores = site_scale_values.loc[:, ['map_unit_id']].copy()
+    scores = OrderedDict()
+    meadow = site['meadow']
     
     # Score attributes
     # b_trigger is the sum of grass cover and sage cover > 30%, NA is interpretted as 0
-    site_scale_scores['b_trigger'] = (
-        site_scale_values.loc[:, 'shrub_cover'].fillna(0)
-        + site_scale_values.loc[:, 'grass_cover'].fillna(0)
+    shrub_cover = values['shrub_cover']
+    grass_cover = values['grass_cover']
+    scores['b_trigger'] = (
+        np.where(np.isnan(shrub_cover), 0, shrub_cover)
+        + np.where(np.isnan(grass_cover), 0, grass_cover)
     ) > BREEDING_TRIGGER
+    if trigger is not None:
+        scores['b_trigger'] = (
+            np.zeros(scores['b_trigger'].shape, dtype=bool) | trigger
+            )
     
     # b_sage_cover is the straight score
     score = 'b_sage_cover'
     value = curve_lookup[score]  # evaluates to value = sage_cover
-    site_scale_scores[score] = (
-        site_scale_values[value]
-        .apply(lambda x: score_attribute(x*100, score))
-    )
+    scores[score] = score_attribute(values[value]*100, score)
     
     # b_shrub_cover is the straight score
     score = 'b_shrub_cover'
     value = curve_lookup[score]
-    site_scale_scores[score] = (
-        site_scale_values[value]
-        .apply(lambda x: score_attribute(x*100, score))
-    )
+    scores[score] = score_attribute(values[value]*100, score)
     
     # b_forb_cover is either the meadow score (use mesic) or, 
     # if not meadow, the weighted average by precipitation zone, 
     # calc both and average
-    # calculate for meadow first
-    filt = site_scale_values['meadow']!='No Meadow'
     score = 'b_forb_cover'
-    value = curve_lookup[score]
-    score_appended = score + '_mesic'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x*100, score_appended))
-    )
-    # calculated weighted average for arid and mesic 
-    # (note filt is reversed)
-    score = 'b_forb_cover'
-    value = curve_lookup[score]
-    score_arid = score + '_arid'
-    score_mesic = score + '_mesic'
-    site_scale_scores.loc[~filt, score] = (
-        site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x*100, score_arid))
-        * site_scale_values.loc[~filt, 'arid']
-        + site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x*100, score_mesic))
-        * site_scale_values.loc[~filt, 'mesic']
-    )
+    hab_values = values[curve_lookup[score]]*100
+    scores[score] = np.where(
+        meadow, 
+        score_attribute(hab_values, score + '_mesic'),
+        score_precip(hab_values, score)
+        )
 
     # b_forb_rich is either the meadow score (use mesic) or, if not 
     # meadow, the weighted average by precipitation zone, calc both 
     # and average. Do not multiply by 100.
-    # calculate for meadow first
-    filt = site_scale_values['meadow'] != 'No Meadow'
     score = 'b_forb_rich'
-    value = curve_lookup[score]
-    score_meadow = score + '_mesic'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x, score_meadow))
-    )
-    # calculated weighted average for arid and mesic 
-    # (note filt is reversed)
-    score_arid = score + '_arid'
-    score_mesic = score + '_mesic'
-    site_scale_scores.loc[~filt, score] = (
-        site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x, score_arid))
-        * site_scale_values.loc[~filt, 'arid']
-        + site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x, score_mesic))
-        * site_scale_values.loc[~filt, 'mesic']
-    )
+    hab_values = values[curve_lookup[score]]
+    scores[score] = np.where(
+        meadow, 
+        score_attribute(hab_values, score + '_mesic'),
+        score_precip(hab_values, score)
+        )
 
     # s_forb_cover is either the meadow score (use meadow) or, if not 
     # meadow, the weighted average by precipitation zone, calc both 
     # and average
-    # calculate for meadow first
-    filt = site_scale_values['meadow'] != 'No Meadow'
     score = 's_forb_cover'
-    value = curve_lookup[score]
-    score_meadow = score + '_meadow'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x*100, score_meadow))
-    )
-    # calculated weighted average for arid and mesic 
-    # (note filt is reversed)
-    score_arid = score + '_arid'
-    score_mesic = score + '_mesic'
-    site_scale_scores.loc[~filt, score] = (
-        site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x*100, score_arid))
-        * site_scale_values.loc[~filt, 'arid']
-        + site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x*100, score_mesic))
-        * site_scale_values.loc[~filt, 'mesic']
-    )
+    hab_values = values[curve_lookup[score]]*100
+    scores[score] = np.where(
+        meadow, 
+        score_attribute(hab_values, score + '_meadow'),
+        score_precip(hab_values, score)
+        )
 
     # s_forb_rich is either the meadow score (use mesic) or, if not 
     # meadow, the weighted average by precipitation zone, calc both 
-    # and average
-    # calculate for meadow first
-    filt = site_scale_values['meadow'] != 'No Meadow'
+    # and average. Do not multiply by 100.
     score = 's_forb_rich'
-    value = curve_lookup[score]
-    score_meadow = score + '_mesic'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x, score_meadow))
-    )
-    # calculated weighted average for arid and mesic 
-    # (note filt is reversed)
-    score_arid = score + '_arid'
-    score_mesic = score + '_mesic'
-    site_scale_scores.loc[~filt, score] = (
-        site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x, score_arid))
-        * site_scale_values.loc[~filt, 'arid']
-        + site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x, score_mesic))
-        * site_scale_values.loc[~filt, 'mesic']
-    )
+    hab_values = values[curve_lookup[score]]
+    scores[score] = np.where(
+        meadow, 
+        score_attribute(hab_values, score + '_mesic'),
+        score_precip(hab_values, score)
+        )
 
     # s_grass_cover is either the meadow score (use meadow) or, 
     # if not meadow, the weighted average by precipitation zone, 
     # calc both and average
-    filt = site_scale_values['meadow'] != 'No Meadow'
     score = 's_grass_cover'
-    value = curve_lookup[score]
-    score_meadow = score + '_meadow'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x*100, score_meadow))
-    )
-    # calculated weighted average for arid and mesic 
-    # (note filt is reversed)
-    score_arid = score + '_arid'
-    score_mesic = score + '_mesic'
-    site_scale_scores.loc[~filt, score] = (
-        site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x*100, score_arid))
-        * site_scale_values.loc[~filt, 'arid']
-        + site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x*100, score_mesic))
-        * site_scale_values.loc[~filt, 'mesic']
-    )
+    hab_values = values[curve_lookup[score]]*100
+    scores[score] = np.where(
+        meadow, 
+        score_attribute(hab_values, score + '_meadow'),
+        score_precip(hab_values, score)
+        )
 
     # s_dist_sage is 1 if no_meadow or, if meadow, use altered or 
     # unaltered. 
     # Do not multiply by 100.
-    filt = site_scale_values['meadow'] == 'No Meadow'
     score = 's_dist_sage'
-    value = curve_lookup[score]
-    score_meadow = score + '_meadow'
-    site_scale_scores.loc[filt, score] = 1
+    hab_values = values[curve_lookup[score]]
     # use a weighted average for altered and unaltered, where weight is 
     # either 1 or 0 
-    score_altered = score + '_altered'
-    score_unaltered = score + '_unaltered'
-    site_scale_scores.loc[~filt, score] = (
-        site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x, score_altered))
-        * (site_scale_values.loc[~filt, 'meadow'] == 'Altered').astype(int)
-        + site_scale_values.loc[~filt, value]
-        .apply(lambda x: score_attribute(x, score_unaltered))
-        * (site_scale_values.loc[~filt, 'meadow'] == 'Unaltered').astype(int)
-    )
+    scores[score] = np.where(
+        ~meadow,
+        1,
+        score_attribute(hab_values, score + '_altered') * site['altered']
+        + score_attribute(hab_values, score + '_unaltered') * site['unaltered']
+        )
     
-    # w_sage_height is either big or low (use sage_species column)
+    # w_sage_height and w_sage_cover are either big or low (use 
+    # sage_species column), 0 if no sage. Other species are not scored.
     score = 'w_sage_height'
-    value = curve_lookup[score]
-    filt = site_scale_values['sage_species'] == 'Big Sagebrush'
-    score_curve = score + '_big'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x, score_curve))
-    )
-
-    filt = site_scale_values['sage_species'] == 'Low or Black Sagebrush'
-    score_curve = score + '_low'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x, score_curve))
-    )
-
-    filt = site_scale_values['sage_species'] == 'None'
-    site_scale_scores.loc[filt, score] = 0
+    hab_values = values[curve_lookup[score]]
+    scores[score] = np.where(
+        site['big_sage'], score_attribute(hab_values, score + '_big'),
+        np.where(
+            site['low_sage'], score_attribute(hab_values, score + '_low'),
+            np.where(site['no_sage'], 0, np.nan)
+            )
+        )
     
-    # w_sage_cover is either big or low (use sage_species column)
     score = 'w_sage_cover'
-    value = curve_lookup[score]
-    filt = site_scale_values['sage_species']=='Big Sagebrush'
-    score_curve = score + '_big'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x*100, score_curve))
-    )
-
-    filt = site_scale_values['sage_species']=='Low or Black Sagebrush'
-    score_curve = score + '_low'
-    site_scale_scores.loc[filt, score] = (
-        site_scale_values.loc[filt, value]
-        .apply(lambda x: score_attribute(x*100, score_curve))
-    )
-
-    filt = site_scale_values['sage_species']=='None'
-    site_scale_scores.loc[filt, score] = 0
+    hab_values = values[curve_lookup[score]]*100
+    scores[score] = np.where(
+        site['big_sage'], score_attribute(hab_values, score + '_big'),
+        np.where(
+            site['low_sage'], score_attribute(hab_values, score + '_low'),
+            np.where(site['no_sage'], 0, np.nan)
+            )
+        )
     
     # Score brotec
     score = 'brotec_cover'
     value = curve_lookup[score]
-    site_scale_scores[score] = (
-        site_scale_values[value]
-        .apply(lambda x: score_attribute(x*100, score))
-    )
+    scores[score] = score_attribute(values[value]*100, score)
 
-    # helper function for returning attr_weight
-    def get_attr_weight(season, hab_attr):
-        return scoring_weights.loc[(season, hab_attr), 'score_weight']
+    # attribute and function weights, compiled once per project
+    attr_weight = weight_table.attr_weight
+    func_weight = weight_table.func_weight
     
-    # helper function for returning func_weight
-    def get_func_weight(season, hab_function):
-        scoring_weights_ungroup = scoring_weights.reset_index()  # for pandas v0.16
-        function_weights = (
-            scoring_weights_ungroup.groupby(['season', 'hab_function']).sum()
-        )
-        return function_weights.loc[(season, hab_function), 'score_weight']
+    # map units where the HSI is used or the score is 0 regardless of 
+    # habitat quality
+    indirect = site['indirect']
+    phase_3 = site['phase_3']
     
     # Cover score for breeding is the weighted sum of sage_cover and 
     # shrub_cover if the breeding trigger is True, else 0. Un-weight 
     # by weight of cover as habitat function for interpretability (100% is 
     # max score). Note grass cover is only used to establish breeding 
     # trigger, it is not a scored attribute.
-    site_scale_scores['b_cover'] = (
-        ((site_scale_scores['b_sage_cover'] 
-        * get_attr_weight('breed', 'sage_cover')
-        + site_scale_scores['b_shrub_cover'] 
-        * get_attr_weight('breed', 'shrub_cover'))
-        * site_scale_scores['b_trigger'].astype(int))
-        / get_func_weight('breed', 'cover')
+    scores['b_cover'] = (
+        (scores['b_sage_cover'] * attr_weight('breed', 'sage_cover')
+        + scores['b_shrub_cover'] * attr_weight('breed', 'shrub_cover'))
+        * scores['b_trigger'].astype(int)
+        / func_weight('breed', 'cover')
         )
     
     # Forage score for breeding is weighted sum of forb cover and forb 
     # richness. Un-weight by weight of forage as habitat function for 
     # nterpretability (100% is max score).
-    site_scale_scores['b_forage'] = (
-        (site_scale_scores['b_forb_cover'] 
-            * get_attr_weight('breed', 'forb_cover')
-        + site_scale_scores['b_forb_rich'] 
-        * get_attr_weight('breed', 'forb_rich'))
-        / get_func_weight('breed', 'forage')
+    scores['b_forage'] = (
+        (scores['b_forb_cover'] * attr_weight('breed', 'forb_cover')
+        + scores['b_forb_rich'] * attr_weight('breed', 'forb_rich'))
+        / func_weight('breed', 'forage')
         )
     
     # Forage score for summer is weighted sum of forb cover and forb 
     # richness. Un-weight by weight of forage as habitat function for 
     # interpretability (100% is max score).
-    site_scale_scores['s_forage'] = (
-        (site_scale_scores['s_forb_cover'] 
-        * get_attr_weight('summer', 'forb_cover')
-        + site_scale_scores['s_forb_rich'] 
-        * get_attr_weight('summer', 'forb_rich'))
-        / get_func_weight('summer', 'forage'))
+    scores['s_forage'] = (
+        (scores['s_forb_cover'] * attr_weight('summer', 'forb_cover')
+        + scores['s_forb_rich'] * attr_weight('summer', 'forb_rich'))
+        / func_weight('summer', 'forage')
+        )
     
     # Cover score for summer is same as grass_cover score. 
-    site_scale_scores['s_cover'] = site_scale_scores['s_grass_cover']
+    scores['s_cover'] = scores['s_grass_cover']
     
     # Site-scale breeding is weighted sum of cover and forage multiplied  by 
     # brotec_cover score. If trigger is not met, 0. If indirect_benefit_area, 
     # use HSI. If conifer_phase == 'Phase III', then 0.
-    # First calculate the weighted sum
-    site_scale_scores['breed'] = (
-        (site_scale_scores['b_cover'] 
-            * get_func_weight('breed', 'cover')
-        + site_scale_scores['b_forage'] 
-        * get_func_weight('breed', 'forage'))
-        * site_scale_scores['brotec_cover']
+    breed = (
+        (scores['b_cover'] * func_weight('breed', 'cover')
+        + scores['b_forage'] * func_weight('breed', 'forage'))
+        * scores['brotec_cover']
         )
-    # Overwrite for map units that don't meet trigger
-    filt = ~site_scale_scores['b_trigger']
-    site_scale_scores.loc[filt, 'breed'] = 0
-    # Overwrite HSI for indirect benefit map units
-    filt = (
-        site_scale_values['indirect_benefits_area']
-        .astype('int').astype('bool')
-    )
-    site_scale_scores.loc[filt, 'breed'] = (
-        site_scale_values.loc[filt, 'spring_hsi']
-    )
-    # Overwrite for map units that have phase 3 conifer
-    filt = site_scale_values['conifer_phase'] == 'Phase III'
-    site_scale_scores.loc[filt, 'breed'] = 0
+    breed = np.where(scores['b_trigger'], breed, 0)
+    breed = np.where(indirect, site['spring_hsi'], breed)
+    scores['breed'] = np.where(phase_3, 0, breed)
     
     # Site-scale summer is weighted sum of forage and cover multiplied by 
     # brotec_cover score, multiplied by dist_sage score. If 
     # indirect_benefit_area, use HSI. If conifer_phase == 'Phase III', then 0.
-    # First calculate the weighted sum
-    site_scale_scores['summer'] = (
-        (site_scale_scores['s_forage'] 
-         * get_func_weight('summer', 'forage')
-        + site_scale_scores['s_cover'] 
-        * get_func_weight('summer', 'cover'))
-        * site_scale_scores['brotec_cover']
-        * site_scale_scores['s_dist_sage']
+    summer = (
+        (scores['s_forage'] * func_weight('summer', 'forage')
+        + scores['s_cover'] * func_weight('summer', 'cover'))
+        * scores['brotec_cover']
+        * scores['s_dist_sage']
         )
-    # Overwrite HSI for indirect benefit map units
-    filt = (
-        site_scale_values['indirect_benefits_area']
-        .astype('int').astype('bool')
-    )
-    site_scale_scores.loc[filt, 'summer'] = (
-        site_scale_values.loc[filt, 'summer_hsi']
-    )
-    # Overwrite for map units that have phase 3 conifer
-    filt = site_scale_values['conifer_phase'] == 'Phase III'
-    site_scale_scores.loc[filt, 'summer'] = 0
+    summer = np.where(indirect, site['summer_hsi'], summer)
+    scores['summer'] = np.where(phase_3, 0, summer)
     
     # Site scale winter is the weighted sum of sage_height and sage_cover 
     # scores. No modifiers. If indirect_benefit_area, use HSI. If 
     # conifer_phase == 'Phase III', then 0.
-    # First calculate the weighted sum
-    site_scale_scores['winter'] = (
-        site_scale_scores['w_sage_height'] 
-        * get_attr_weight('winter', 'sage_height')
-        + site_scale_scores['w_sage_cover'] 
-        * get_attr_weight('winter', 'sage_cover'))
-    # Overwrite HSI for indirect benefit map units
-    filt = (
-        site_scale_values['indirect_benefits_area']
-        .astype('int').astype('bool')
-    )
-    site_scale_scores.loc[filt, 'winter'] = (
-        site_scale_values.loc[filt, 'winter_hsi']
-    )
-    # Overwrite for map units that have phase 3 conifer
-    filt = site_scale_values['conifer_phase'] == 'Phase III'
-    site_scale_scores.loc[filt, 'winter'] = 0
+    winter = (
+        scores['w_sage_height'] * attr_weight('winter', 'sage_height')
+        + scores['w_sage_cover'] * attr_weight('winter', 'sage_cover')
+        )
+    winter = np.where(indirect, site['winter_hsi'], winter)
+    scores['winter'] = np.where(phase_3, 0, winter)
+    
+    return scores
+
+
+def score_site_scale(project, site_scale_values):
+    '''
+    Returns dataframe with score of provided site_scale_values
+    :param project: an instance of the CreditData class. Used to get
+    scoring curves and scoring weights associated with the project.
+    :param site_scale_values: the site_scale_values table to be
+    scored.
+    '''
+    values, site = site_scale_arrays(site_scale_values)
+    scores = score_arrays(project, values, site)
+    
+    # Create site scale score dataframe
+    site_scale_scores = site_scale_values.loc[:, ['map_unit_id']].copy()
+    for score, score_values in scores.items():
+        site_scale_scores[score] = score_values
     
     return site_scale_scores
 
@@ -423,6 +367,52 @@ def correct_baseline(standard_baseline, current_site_scale):
     # Plug this into calc_facres to get baseline facres
 
 
+def take(values, positions):
+    '''
+    Returns values at positions along the last axis, NaN where a position is
+    -1 (as pandas.Index.get_indexer returns for a missing key). Values keep
+    their dtype if every position is found, as they do in a left merge.
+    '''
+    values = np.asarray(values)
+    if (positions >= 0).all():
+        return values[..., positions]
+    if values.shape[-1] == 0:
+        missing = np.empty(values.shape[:-1] + positions.shape)
+        missing.fill(np.nan)
+        return missing
+    found = values[..., np.where(positions >= 0, positions, 0)]
+    return np.where(positions >= 0, found, np.nan)
+
+
+def facres_arrays(desktop_results, map_unit_ids, scores, local_scale):
+    '''
+    Returns an OrderedDict of the seasonal score, local-scale score, habitat
+    function and functional acre arrays of calc_facres, aligned to the rows
+    of desktop_results. Scores may have leading axes (e.g. one per 
+    scenario).
+    :param map_unit_ids: map unit of each position along the last axis of 
+    scores
+    :param scores: dict of 'breed', 'summer' and 'winter' score arrays
+    :param local_scale: the current or projected local-scale table
+    '''
+    desktop_ids = desktop_results['map_unit_id']
+    units = pd.Index(map_unit_ids).get_indexer(desktop_ids)
+    local = pd.Index(local_scale['map_unit_id']).get_indexer(desktop_ids)
+    area = desktop_results['map_unit_area'].values
+
+    facres = OrderedDict()
+    for season in SEASONS:
+        season_scores = take(scores[season], units)
+        ls = take(local_scale['ls_' + season].values, local)
+        facres[season] = season_scores
+        facres['ls_' + season] = ls + np.zeros(season_scores.shape, 
+                                               dtype=ls.dtype)
+        facres[season + '_overall'] = season_scores * ls
+        facres[season + '_facres'] = facres[season + '_overall'] * area
+
+    return facres
+
+
 def calc_facres(desktop_results, site_scale_scores, local_scale):
     '''Returns f-acre report for any set of site_scale_scores'''
     
@@ -434,204 +424,236 @@ def calc_facres(desktop_results, site_scale_scores, local_scale):
              'meadow', 
              'map_unit_area']
             ]
-        .copy()
+        .reset_index(drop=True)
     )
     
-    # Join local_scale
-    facres_report = pd.merge(
-        facres_report,
-        local_scale,
-        how='left',
-        on='map_unit_id'
-    )
+    # Align local_scale and site_scale_scores to desktop_results and 
+    # calculate habitat function and functional acres
+    facres = facres_arrays(
+        desktop_results, 
+        site_scale_scores['map_unit_id'],
+        dict((season, site_scale_scores[season].values) 
+             for season in SEASONS),
+        local_scale
+        )
     
-    # Join site_scale_scores
-    facres_report = pd.merge(
-        facres_report, 
-        site_scale_scores[
-            ['map_unit_id', 
-             'breed',
-             'summer',
-             'winter']
-            ], 
-        how='left', 
-        on='map_unit_id')
+    columns = OrderedDict(
+        (column, facres_report[column].values)
+        for column in facres_report.columns
+        )
+    for season in SEASONS:
+        for column in [season, 'ls_' + season, season + '_overall', 
+                       season + '_facres']:
+            columns[column] = facres[column]
+    
+    return pd.DataFrame(columns, columns=list(columns.keys()))
 
-    # Calculate habitat function
-    for season in ['breed', 'summer', 'winter']:
-        facres_report[season + '_overall'] = (
-            facres_report[season] * facres_report['ls_' + season]
+
+def credit_columns(pre_facres, post_facres, mgmt_multiplier, 
+                   meadow_multiplier, total_contribution):
+    '''
+    Returns an OrderedDict of the delta, seasonal credit, habitat type, 
+    credit, reserve and saleable credit arrays of calc_credits. Inputs are 
+    arrays aligned to the same map units, f-acres may have leading axes.
+    :param *_facres: dict of 'breed_facres', 'summer_facres' and 
+    'winter_facres' arrays
+    '''
+    columns = OrderedDict()
+    for season in SEASONS:
+        columns[season + '_delta'] = (
+            post_facres[season + '_facres'] - pre_facres[season + '_facres']
         )
-        
-        # Calculate functional acres
-        facres_report[season + '_facres'] = (
-            facres_report[season +'_overall'] 
-            * facres_report['map_unit_area']
+
+    # multiply difference by multipliers for each season
+    columns['breed_credits'] = columns['breed_delta'] * mgmt_multiplier
+    columns['summer_credits'] = (
+        columns['summer_delta'] * (mgmt_multiplier + meadow_multiplier)
+    )
+    columns['winter_credits'] = columns['winter_delta'] * mgmt_multiplier
+
+    # credits are the maximum of the seasons, the habitat type is the season
+    # with the maximum (None if all are NaN or credits are 0)
+    stacked = np.array(
+        [columns[season + '_credits'] for season in SEASONS], dtype='float64'
         )
-    
-    # re-order columns
-    facres_col_order = [
-        'map_unit_id', 
-        'map_unit_name', 
-        'meadow', 
-        'map_unit_area', 
-        'breed',
-        'ls_breed', 
-        'breed_overall', 
-        'breed_facres', 
-        'summer',
-        'ls_summer', 
-        'summer_overall', 
-        'summer_facres', 
-        'winter',
-        'ls_winter', 
-        'winter_overall', 
-        'winter_facres'
-    ]
-    
-    facres_report = facres_report[facres_col_order]
-    
-    return facres_report
+    missing = np.isnan(stacked)
+    filled = np.where(missing, -np.inf, stacked)
+    credits = filled.max(axis=0)
+    no_credits = missing.all(axis=0)
+    credits[no_credits] = np.nan
+    habitat_types = np.array(
+        ['Breeding', 'Late Brood-Rearing', 'Winter'], dtype=object
+        )
+    habitat_type = habitat_types[filled.argmax(axis=0)]
+    habitat_type[no_credits | (credits == 0)] = 'None'
+    columns['habitat_type'] = habitat_type
+    columns['credits'] = credits
+
+    columns['reserve_credits'] = credits * total_contribution
+    columns['saleable_credits'] = credits - columns['reserve_credits']
+
+    return columns
+
+
+def matching_rows(pre_facre_report, post_facre_report, keys):
+    '''
+    Returns the rows of pre_facre_report and post_facre_report that an inner
+    merge on keys pairs up, in the order of pre_facre_report. Map unit ids 
+    are unique in both reports.
+    '''
+    pre_rows = np.arange(len(pre_facre_report))
+    post_rows = pd.Index(post_facre_report['map_unit_id']).get_indexer(
+        pre_facre_report['map_unit_id'])
+    found = post_rows >= 0
+    for key in keys[1:]:
+        pre_values = pre_facre_report[key].values
+        post_values = take(post_facre_report[key].values.astype(object), 
+                           post_rows)
+        both_null = pd.isnull(pre_values) & pd.isnull(post_values)
+        found &= (pre_values == post_values) | both_null
+    return pre_rows[found], post_rows[found]
 
 
 def calc_credits(project, desktop_results, pre_facre_report, post_facre_report):
     '''
     Returns credits as difference between pre_facre_report and post_facre_report.
-    :param project: an instance of the CreditData class. Used to get reserve account,
-    standard values and mulipliers policy data associated with the project.
+    :param project: an instance of the CreditData class. Used to get the policy
+    context (multipliers and reserve account) associated with the project.
     :param desktop_results: the desktop_results view from the project database
     :param *_facre_report: the pre or post f_acre report from calc_facres()
     '''
-    
-    # read from database
-    reserve_account = project.reserve_account
-    standard_values = project.standard_values
-    multipliers_policy = project.multipliers_policy
-    
-    # merge pre and post reports on map_unit_id
-    credit_compare = pd.merge(
-        pre_facre_report, 
-        post_facre_report, 
-        on=['map_unit_id', 
-            'map_unit_name', 
-            'meadow', 
-            'map_unit_area'], 
-        suffixes=('_pre', '_post'))
-    
-    # calculate deltas per season
-    for season in ['breed', 'summer', 'winter']:
-        credit_compare[season + '_delta'] = (
-            credit_compare[season + '_facres_post'] 
-            - credit_compare[season + '_facres_pre']
+
+    # multipliers and reserve contributions, computed once per project
+    policy = project.policy_context
+
+    # pair pre and post rows on the merge keys, and keep map units that are
+    # in desktop_results and the reserve account
+    keys = ['map_unit_id', 'map_unit_name', 'meadow', 'map_unit_area']
+    pre_rows, post_rows = matching_rows(pre_facre_report, post_facre_report,
+                                        keys)
+    map_unit_ids = pre_facre_report['map_unit_id'].values[pre_rows]
+    units = policy.rows(map_unit_ids)
+    found = np.in1d(map_unit_ids, desktop_results['map_unit_id'].values)
+    found &= units >= 0
+    found[found] = policy.in_reserve[units[found]]
+    pre_rows = pre_rows[found]
+    post_rows = post_rows[found]
+    units = units[found]
+    
+    # pre and post columns, suffixed where both reports have them
+    credit_compare = OrderedDict(
+        (key, pre_facre_report[key].values[pre_rows]) for key in keys
         )
-    
-    # prepare mgmt multiplier dataframe
-    multipliers_df = (
-        desktop_results[
-            ['map_unit_id', 
-             'phma', 
-             'ghma', 
-             'ohma']
-            ].copy()
-    )
-    
-    # weight each mgmt category by its multiplier
-    for mgmt_cat in ['PHMA', 'GHMA', 'OHMA']:
-        col_name = mgmt_cat.lower()
-        filt = multipliers_policy['mgmt_cat'] == mgmt_cat
-        multipliers_df[col_name] = (
-            multipliers_df[col_name] 
-            * multipliers_policy.loc[filt, 'multiplier'].values
+    for report, rows, suffix, other in [
+            (pre_facre_report, pre_rows, '_pre', post_facre_report),
+            (post_facre_report, post_rows, '_post', pre_facre_report)]:
+        for column in report.columns:
+            if column in keys:
+                continue
+            name = column + suffix if column in other.columns else column
+            credit_compare[name] = report[column].values[rows]
+    
+    mgmt_multiplier = policy.mgmt_multiplier[units]
+    meadow_multiplier = policy.meadow_multiplier[units]
+    total_contribution = policy.total_contribution[units]
+
+    credits = credit_columns(
+        dict((season + '_facres', credit_compare[season + '_facres_pre'])
+             for season in SEASONS),
+        dict((season + '_facres', credit_compare[season + '_facres_post'])
+             for season in SEASONS),
+        mgmt_multiplier, meadow_multiplier, total_contribution
         )
     
-    # calculate weighted average
-    col_names = [mgmt_cat.lower() for mgmt_cat in ['PHMA', 'GHMA', 'OHMA']]
-    multipliers_df['mgmt_multiplier'] = multipliers_df[col_names].sum(axis=1)
-    
-    # merge with facre deltas
-    credit_compare = pd.merge(
-        credit_compare, 
-        multipliers_df[
-            ['map_unit_id', 
-             'mgmt_multiplier']
-            ], 
-        on='map_unit_id')
-    
-    # apply meadow multiplier
-    standard_values.set_index('variable', inplace=True)
-    meadow_multiplier = (
-        standard_values.at['meadow_multiplier', 'standard_value']
-    )
+    for season in SEASONS:
+        credit_compare[season + '_delta'] = credits[season + '_delta']
+    credit_compare['mgmt_multiplier'] = mgmt_multiplier
     credit_compare['meadow_multiplier'] = meadow_multiplier
+    for column in ['breed_credits', 'summer_credits', 'winter_credits', 
+                   'habitat_type', 'credits']:
+        credit_compare[column] = credits[column]
+    credit_compare['total_contribution'] = total_contribution
+    credit_compare['reserve_credits'] = credits['reserve_credits']
+    credit_compare['saleable_credits'] = credits['saleable_credits']
     
-    # overwrite meadow multiplier if not meadow
-    filt = credit_compare['meadow'] == 'No Meadow'
-    credit_compare.loc[filt, 'meadow_multiplier'] = 0
-    
-    # multiply difference from above by multipliers for each season
-    credit_compare['breed_credits'] = (
-        credit_compare['breed_delta'] 
-        * credit_compare['mgmt_multiplier']
-    )
-    
-    credit_compare['summer_credits'] = (
-        credit_compare['summer_delta'] 
-        * (credit_compare['mgmt_multiplier'] 
-           + credit_compare['meadow_multiplier'])
-    )
-    
-    credit_compare['winter_credits'] = (
-        credit_compare['winter_delta'] 
-        * credit_compare['mgmt_multiplier']
-    )
-    
-    # identify maximum diff and save seasonal habitat type to new variable
-    credit_columns = ['breed_credits', 'summer_credits', 'winter_credits']
-    
-    season_dict = {
-        np.nan: 'None',
-        'breed_credits': 'Breeding',
-        'summer_credits': 'Late Brood-Rearing',
-        'winter_credits': 'Winter'
-    }
-    
-    credit_compare['habitat_type'] = (
-        credit_compare.loc[:, credit_columns].idxmax(axis=1)
-    )
-    credit_compare['habitat_type'] = (
-        credit_compare['habitat_type'].map(season_dict)
-    )
-    
-    # Calculate current credits generated as maximum diff
-    credit_compare['credits'] = (
-        credit_compare.loc[:, credit_columns].max(axis=1)
-    )
-    
-    # Overwrite map units with no credits to None
-    filt = credit_compare['credits'] == 0
-    credit_compare.loc[filt, 'habitat_type'] = 'None'
-    
-    # Get reserve account contribution
-    credit_compare = pd.merge(
-        credit_compare, 
-        reserve_account[
-            ['map_unit_id', 
-             'total_contribution']
-            ], 
-        on='map_unit_id')
-    
-    credit_compare['reserve_credits'] = (
-        credit_compare['credits'] 
-        * credit_compare['total_contribution']
+    return pd.DataFrame(credit_compare, columns=list(credit_compare.keys()))
+
+
+def override_matrix(rows, hab_attrs, attr_values, n_rows):
+    '''
+    Returns an n_rows x HAB_ATTRS array of projected values, NaN where an 
+    attribute is not projected, and an array that is True for each row with
+    any projected value. Values of an attribute that appear in multiple 
+    seasons (e.g., b_sage_cover and w_sage_cover) are averaged.
+    :param rows: row of each projected value, -1 to leave it out
+    :param hab_attrs: seasonal attribute name of each projected value
+    :param attr_values: projected values
+    :param n_rows: number of rows (e.g., map units)
+    '''
+    rows = np.asarray(rows, dtype='int64')
+    attr_values = np.asarray(attr_values, dtype='float64')
+    n_attrs = len(HAB_ATTRS)
+
+    # attribute of each seasonal name (e.g., b_sage_cover is sage_cover), 
+    # -1 for names that are not projected attributes and for missing names
+    # (code -1)
+    codes, names = pd.factorize(np.asarray(hab_attrs, dtype=object))
+    name_attrs = np.array(
+        [next((i for i, hab_attr in enumerate(HAB_ATTRS) 
+               if str(name).endswith(hab_attr)), -1)
+         for name in names] + [-1],
+        dtype='int64')
+    attrs = name_attrs[codes]
+
+    found = rows >= 0
+    present = np.zeros(n_rows, dtype=bool)
+    present[rows[found]] = True
+
+    valid = found & (attrs >= 0) & ~np.isnan(attr_values)
+    cells = rows[valid] * n_attrs + attrs[valid]
+    sums = np.bincount(cells, weights=attr_values[valid], 
+                       minlength=n_rows * n_attrs)
+    counts = np.bincount(cells, minlength=n_rows * n_attrs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        overrides = sums / counts
+    return overrides.reshape(n_rows, n_attrs), present
+
+
+def projected_overrides(projected_values, site_scale_values):
+    '''
+    Returns the override matrix of override_matrix for tidy projected_values,
+    map units in the order of site_scale_values. Projected_values should be
+    in tidy form with columns ['map_unit_id', 'hab_attr', and 'attr_value'];
+    map units not in site_scale_values are left out.
+    '''
+    rows = pd.Index(site_scale_values['map_unit_id']).get_indexer(
+        projected_values['map_unit_id'])
+    attr_values = (
+        projected_values.drop(['map_unit_id', 'hab_attr'], axis=1).iloc[:, 0]
     )
-    
-    # Create site_scale_values table by substituting in projected values
-    credit_compare['saleable_credits'] = (
-        credit_compare['credits'] 
-        - credit_compare['reserve_credits']
+    return override_matrix(rows, projected_values['hab_attr'].values, 
+                           attr_values.values, len(site_scale_values))
+
+
+def substitute_site_scale(site_scale_values, overrides, present):
+    '''
+    Returns the site_scale_values of the map units that are present, with 
+    the projected values of overrides substituted for the current values 
+    where they are not NaN.
+    :param overrides: map unit x HAB_ATTRS array, e.g. from 
+    projected_overrides
+    :param present: True for each map unit to keep
+    '''
+    current = np.asarray(site_scale_values[HAB_ATTRS], dtype='float64')
+    projected = np.where(np.isnan(overrides), current, overrides)[present]
+
+    projected_site_scale = (
+        site_scale_values[present].reset_index(drop=True)
     )
-    
-    return credit_compare
+    for i in np.flatnonzero(~np.isnan(overrides).all(axis=0)):
+        projected_site_scale[HAB_ATTRS[i]] = projected[:, i]
+
+    return projected_site_scale
 
 
 def project_site_scale(projected_values, site_scale_values):
@@ -640,123 +662,130 @@ def project_site_scale(projected_values, site_scale_values):
     should be in tidy form with columns ['map_unit_id', 'hab_attr', and 
     'attr_value']
     '''
-    
-    # Pivot projected values
-    projected_pivot = (
-        projected_values
-        .set_index(['map_unit_id', 'hab_attr'])
-        .unstack()
-        .reset_index(col_fill=None)
-    )    
-    col_names = [name for _, name in projected_pivot.columns]
-    projected_pivot.columns = col_names
-    
-    # Eliminate seasonal duplication
-    hab_attrs = [
-        'sage_cover', 
-        'sage_height', 
-        'shrub_cover',
-        'forb_cover', 
-        'forb_rich', 
-        'grass_cover', 
-        'brotec_cover'
-    ]
-    
-    projected_single = projected_pivot[['map_unit_id']].copy()
-    
-    # average any values that appear in multiple seasons (values should
-    # be identical given one field assessment)
-    for hab_attr in hab_attrs:
-        filt = projected_pivot.columns.str.endswith(hab_attr)
-        if filt.sum() > 0:  # one or more columns ends with hab_attr
-            projected_single[hab_attr] = (
-                projected_pivot.loc[:, filt].mean(axis=1)
+    overrides, present = projected_overrides(projected_values, 
+                                             site_scale_values)
+    return substitute_site_scale(site_scale_values, overrides, present)
+
+
+class ProjectSession(object):
+    '''
+    Current state of a project shared by run_calculator and 
+    scenario_calc.run_scenario_report: the current site-scale scores, 
+    current and baseline f-acre reports, current credits and policy context,
+    each computed once on first use. Tables and other attributes are read 
+    from the project, so a session can be passed wherever an instance of 
+    CreditData is expected. Reports are returned as copies, as CreditData 
+    returns tables. Create the session after the database is built; the 
+    state is not recomputed if the database changes.
+    '''
+    def __init__(self, project):
+        '''
+        :param project: an instance of the CreditData class.
+        '''
+        self.project = project
+        self._state = {}
+
+    def __getattr__(self, name):
+        # only called for attributes the session does not define
+        if name in ('project', '_state'):
+            raise AttributeError(name)
+        return getattr(self.project, name)
+
+    def _get(self, name, compute):
+        if name not in self._state:
+            self._state[name] = compute()
+        return self._state[name].copy()
+
+    @property
+    def current_site_scale(self):
+        return self._get(
+            'current_site_scale',
+            lambda: score_site_scale(self.project, 
+                                     self.project.site_scale_values)
             )
-    
-    # Substitute projected into current values
-    suffixes = ('_preTEMP', '_postTEMP')
-    projected_site_scale = pd.merge(
-        site_scale_values, 
-        projected_single, 
-        on='map_unit_id', 
-        suffixes=suffixes)
-    
-    for hab_attr in hab_attrs:
-        if projected_site_scale.columns.str.startswith(hab_attr).sum() > 1:  # i.e., 2 columns end the same
-            filt = projected_site_scale[hab_attr + suffixes[1]].notnull()
-            projected_site_scale.loc[filt, hab_attr] = (
-                projected_site_scale.loc[filt, hab_attr + suffixes[1]]
+
+    @property
+    def current_facres(self):
+        return self._get(
+            'current_facres',
+            lambda: calc_facres(self.project.desktop_results, 
+                                self.current_site_scale, 
+                                self.project.current_ls)
             )
-            projected_site_scale.loc[~filt, hab_attr] = (
-                projected_site_scale.loc[~filt, hab_attr + suffixes[0]]
+
+    @property
+    def baseline_facres(self):
+        # the baseline is the standard baseline or current score if lower
+        return self._get(
+            'baseline_facres',
+            lambda: calc_facres(
+                self.project.desktop_results,
+                correct_baseline(self.project.standard_baseline, 
+                                 self.current_site_scale),
+                self.project.current_ls)
             )
-    
-    drop_cols = (
-        projected_site_scale.columns.str.endswith(suffixes[0]) | 
-        projected_site_scale.columns.str.endswith(suffixes[1])
-    )
-    
-    projected_site_scale = projected_site_scale.loc[:, ~drop_cols].copy()
 
-    # re-order columns to be the same as the current site_scale_values
-    projected_site_scale = projected_site_scale[site_scale_values.columns]
+    @property
+    def current_credits(self):
+        return self._get(
+            'current_credits',
+            lambda: calc_credits(self, self.project.desktop_results, 
+                                 self.baseline_facres, self.current_facres)
+            )
+
+    @property
+    def policy_context(self):
+        return self.project.policy_context
 
-    return projected_site_scale
+
+def project_session(project):
+    '''Returns project if it is a ProjectSession, otherwise a new session 
+    of project'''
+    if isinstance(project, ProjectSession):
+        return project
+    return ProjectSession(project)
 
 
 def run_calculator(project, projected_values_input=None):
     """
     returns current and projected credit dataframes
-    :param project: an instance of the CreditData class.
+    :param project: an instance of the CreditData class, or a ProjectSession
+    to reuse its current state.
     :param projected_values_input: optional table of 
     projected_values as csv. Projected_values should be in tidy form with 
     columns ['map_unit_id', 'hab_attr', and 'attr_value']
     """
+    session = project_session(project)
+    
     # read in projected_values csv if provided, or read from database
     if projected_values_input:
         projected_values = pd.read_csv(projected_values_input)
     else:
-        projected_values = project.projected_values
+        projected_values = session.projected_values
     
     # read from database
-    site_scale_values = project.site_scale_values
-    current_ls = project.current_ls
-    projected_ls = project.projected_ls
-    desktop_results = project.desktop_results
-    standard_baseline = project.standard_baseline
-    
-    # Score current site-scale values
-    current_site_scale = score_site_scale(project, site_scale_values)
-    
-    # Create current functional acre report
-    current_facres = calc_facres(desktop_results, current_site_scale, 
-                                 current_ls)
-    
-    # Get baseline site scale scores
-    baseline_corrected = correct_baseline(standard_baseline, 
-                                          current_site_scale)
-    
-    # Create baseline funcional acre report
-    baseline_facres = calc_facres(desktop_results, baseline_corrected, 
-                                  current_ls)
+    site_scale_values = session.site_scale_values
+    projected_ls = session.projected_ls
+    desktop_results = session.desktop_results
     
-    # Calculate current credits    
-    current_credits = calc_credits(project, desktop_results,baseline_facres, 
-                                   current_facres)
+    # Current f-acres and credits (against the baseline corrected by current
+    # scores), computed once per session
+    current_facres = session.current_facres
+    current_credits = session.current_credits
     
     # Project site-scale values
     projected_site_scale = project_site_scale(projected_values, 
                                               site_scale_values)
     
     # Score projected site-scale values
-    projected_scores = score_site_scale(project, projected_site_scale)
+    projected_scores = score_site_scale(session, projected_site_scale)
     
     # Create projected functional acre report
     projected_facres = calc_facres(desktop_results, projected_scores, 
                                    projected_ls)
     
     # Calculate projected credits
-    projected_credits = calc_credits(project, desktop_results, current_facres, 
+    projected_credits = calc_credits(session, desktop_results, current_facres, 
                                      projected_facres)
     
     return current_credits, projected_credits
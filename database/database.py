@@ -4,21 +4,117 @@ import numpy as np
 from datetime import datetime
 import time
 import sys
-from models import CreditCalculator
+import multiprocessing
+import hashlib
+import shutil
+from models import CreditCalculator, CalculatorWorkbook
 from models import PolicyTables
 import sqlite3
 from sqlite3 import Error
 from arcpy import AddMessage
 from components import (create_connection, create_table, insert_data, 
-                        create_view)
+                        insert_many, create_view, finalize_database,
+                        copy_database, BUILD_PRAGMAS)
 
 # Hack in sql directory b/c Arc can't handle relative path names
 sql_dir = os.path.join(sys.path[0], 'sql')
 
+# Views in order of creation (later views select from earlier views)
+VIEWS = [
+    'view_desktop_results',
+    'view_transect_data',
+    'view_site_scale_values',
+    'view_reserve_account',
+    'view_baseline'
+]
+
+# Materialized tables in order of creation, rebuilt from 
+# materialize_<table>.sql after import
+MATERIALIZED = [
+    'transect_metrics',
+    'site_scale_metrics'
+]
+
 # Functions
+def df_to_rows(df):
+    """
+    Returns the rows of a data frame as a list of tuples of native python
+    types, with nulls as None, ready for executemany
+    :param df: a pandas data frame
+    """
+    values = df.astype(object).where(pd.notnull(df), None)
+    return [tuple(row) for row in values.values.tolist()]
+
+
+def content_hash(rows):
+    """
+    Returns a fingerprint of the rows of a table, as returned by df_to_rows
+    :param rows: a list of tuples
+    """
+    return hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()
+
+
+def stored_hashes(conn):
+    """
+    Returns a dict of table_name: content_hash recorded at the last import
+    :param conn: connection object
+    """
+    c = conn.cursor()
+    c.execute('SELECT table_name, content_hash FROM import_hashes')
+    return dict(c.fetchall())
+
+
+def load_table(conn, table_name, df, hashes=None):
+    """
+    Replaces the contents of a table with a data frame in a single 
+    transaction, inserting all rows with one executemany, and records the 
+    content hash of the data. Reports the insert rate.
+    :param conn: connection object
+    :param table_name: name of the table, the insert statement is read from 
+    insert_<table_name>.sql
+    :param df: the data frame to insert
+    :param hashes: optional dict of stored content hashes (see 
+    stored_hashes), if the hash of df matches the stored hash the table is
+    left as is
+    :return: True if the table was reloaded
+    """
+    start = time.time()
+    rows = df_to_rows(df)
+    digest = content_hash(rows)
+    if hashes is not None and hashes.get(table_name) == digest:
+        AddMessage('{} unchanged, skipping'.format(table_name))
+        return False
+    
+    sql_file = os.path.join(sql_dir, 'insert_' + table_name + '.sql')
+    hashes_sql = os.path.join(sql_dir, 'insert_import_hashes.sql')
+    with conn:
+        conn.execute('DELETE FROM {}'.format(table_name))
+        insert_many(conn, sql_file, rows)
+        insert_data(conn, hashes_sql, 
+                    (table_name, digest, datetime.now().isoformat()))
+    elapsed = time.time() - start
+    rate = len(rows) / elapsed if elapsed > 0 else float(len(rows))
+    AddMessage('inserted {} rows into {} ({} rows/sec)'.format(
+        len(rows), table_name, int(rate)))
+    
+    return True
+
+
+def open_database(database):
+    """
+    Returns (conn, owned) for a database path or an already open connection.
+    A connection is opened, and owned by the caller, only if a path is 
+    given. This lets build_database run every step on a single connection.
+    :param database: path to the database or a connection object
+    """
+    if isinstance(database, sqlite3.Connection):
+        return database, False
+    return create_connection(database), True
+
+
 def create_database(database_path):
     # create a database connection
-    conn = create_connection(database_path)
+    conn, owned = open_database(database_path)
     
     # create tables
     if conn is not None:        
@@ -33,17 +129,29 @@ def create_database(database_path):
                 sql = sql_file.read()
                 create_table(conn, sql)
         
-        conn.close()
+        if owned:
+            conn.close()
         
     else:
         AddMessage ("Error! failed to create database connection.")
 
     
-def import_credit_calc(database_path, credit_calc_file):
+def import_credit_calc(database_path, credit_calc_file, processes=None,
+                       incremental=False):
+    """
+    Reads the Project Calculator and inserts each table into the database.
+    Returns the names of the tables that were (re)loaded.
+    :param database_path: path to the project database
+    :param credit_calc_file: path to the Project Calculator
+    :param processes: if greater than 1, the calculator sheets are parsed in
+    a pool of this many worker processes before the tables are read
+    :param incremental: if True, only tables whose content hash differs 
+    from the last import are deleted and reloaded
+    """
     database = database_path
 
     # create database connection
-    conn = create_connection(database)
+    conn, owned = open_database(database)
     
     # instantiate credit calculator object
     project_calc = CreditCalculator(credit_calc_file)
@@ -51,6 +159,7 @@ def import_credit_calc(database_path, credit_calc_file):
     # read in tables
     start = time.time()
     AddMessage('reading calculator at ' + credit_calc_file)
+    project_calc.workbook.parse_all(processes)
     map_units_df = project_calc.map_units_df
     current_ls_df = project_calc.current_ls_df
     projected_ls_df = project_calc.projected_ls_df
@@ -76,37 +185,10 @@ def import_credit_calc(database_path, credit_calc_file):
     current_credits_df = project_calc.current_credits_df
     projected_credits_df = project_calc.projected_credits_df
     
+    AddMessage('parsed {} sheets'.format(project_calc.workbook.parse_count))
     AddMessage('{} minutes elapsed'.format(round((time.time() - start)/60, 2)))
     start = time.time()
     
-    # read in sql files
-    AddMessage('reading sql files')
-    map_units_sql = os.path.join(sql_dir, 'insert_map_units.sql')
-    current_ls_sql = os.path.join(sql_dir, 'insert_current_ls.sql')
-    projected_ls_sql = os.path.join(sql_dir, 'insert_projected_ls.sql')
-    transect_data_sql = os.path.join(sql_dir, 'insert_transect_data.sql')
-    mgmt_cats_sql = os.path.join(sql_dir, 'insert_project_mgmt_cats.sql')
-    project_wmz_sql = os.path.join(sql_dir, 'insert_project_wmz.sql')
-    project_pmu_sql = os.path.join(sql_dir, 'insert_project_pmu.sql')
-    project_precip_sql = os.path.join(sql_dir, 'insert_project_precip.sql')
-    desktop_results_sql = os.path.join(sql_dir, 'insert_desktop_results.sql')
-    field_sheets_sql = os.path.join(sql_dir, 'insert_field_sheets.sql')
-    field_info_sql = os.path.join(sql_dir, 'insert_field_info.sql')
-    shrubs_sql = os.path.join(sql_dir, 'insert_shrub_data.sql')
-    plots_sql = os.path.join(sql_dir, 'insert_plot_data.sql')
-    forb_grass_sql = os.path.join(sql_dir, 'insert_forb_grass_data.sql')
-    transects_review_sql = os.path.join(sql_dir, 'insert_transect_review.sql')
-    site_scale_values_sql = os.path.join(sql_dir, 'insert_site_scale_values.sql')
-    site_scale_scores_sql = os.path.join(sql_dir, 'insert_site_scale_scores.sql')
-    projected_values_sql = os.path.join(sql_dir, 'insert_projected_values.sql')
-    projected_scores_sql = os.path.join(sql_dir, 'insert_projected_scores.sql')
-    baseline_rr_inputs_sql = os.path.join(sql_dir, 'insert_baseline_rr_inputs.sql')
-    baseline_rr_sql = os.path.join(sql_dir, 'insert_baseline_rr.sql')
-    baseline_credits_sql = os.path.join(sql_dir, 'insert_baseline_credits.sql')
-    current_credits_sql = os.path.join(sql_dir, 'insert_current_credits.sql')
-    projected_credits_sql = os.path.join(sql_dir, 'insert_projected_credits.sql')
-    
-    
     # plot cols (for reading in plot data)
     plot_cols =  {1: 'C:D, E:G', 
                   2: 'C:D, H:J',
@@ -114,130 +196,49 @@ def import_credit_calc(database_path, credit_calc_file):
                   4: 'C:D, N:P',
                   5: 'C:D, Q:S'}
     
-    # insert data into database
-    with conn:
-        AddMessage('inserting map units')
-        for _, map_unit in map_units_df.iterrows():
-            data = tuple(map_unit)
-            insert_data(conn, map_units_sql, data)
-        
-        AddMessage('inserting current local-scale')
-        for _, current_ls in current_ls_df.iterrows():
-            data = tuple(current_ls)
-            insert_data(conn, current_ls_sql, data)
-        
-        AddMessage('inserting projected local-scale')
-        for _, projected_ls in projected_ls_df.iterrows():
-            data = tuple(projected_ls)
-            insert_data(conn, projected_ls_sql, data)
-        
-        AddMessage('inserting transect data')
-        for _, transect in transects_data_df.iterrows():
-            data = tuple(transect)
-            insert_data(conn, transect_data_sql, data)
-        
-        AddMessage('inserting mgmt cats')
-        for _, mgmt_cat in mgmt_cats_df.iterrows():
-            data = tuple(mgmt_cat)
-            insert_data(conn, mgmt_cats_sql, data)
-        
-        AddMessage('inserting wmz')
-        for _, wmz in wmz_df.iterrows():
-            data = tuple(wmz)
-            insert_data(conn, project_wmz_sql, data)
-        
-        AddMessage('inserting pmu')
-        for _, pmu in pmu_df.iterrows():
-            data = tuple(pmu)
-            insert_data(conn, project_pmu_sql, data)
-        
-        AddMessage('inserting precip')
-        for _, precip in precip_df.iterrows():
-            data = tuple(precip)
-            insert_data(conn, project_precip_sql, data)
-        
-        print('inserting desktop results')
-        for _, desktop_result in desktop_results_df.iterrows():
-            data = tuple(desktop_result)
-            insert_data(conn, desktop_results_sql, data)
-        
-        # for _, field_sheet in field_sheets_df.iterrows():
-        #     data = tuple(field_sheet)
-        #     insert_data(conn, field_sheets_sql, data)
-        
-        AddMessage('inserting field info')
-        for _, field_info in field_info_df.iterrows():
-            data = tuple(field_info)
-            insert_data(conn, field_info_sql, data)
-        
-        AddMessage('inserting shrubs')
-        for _, shrub in shrubs_df.iterrows():
-            data = tuple(shrub)
-            insert_data(conn, shrubs_sql, data)
-        
-        AddMessage('inserting plots')
-        for plot_no in plot_cols:
-            plot_df = project_calc.plot_df(plot_cols.get(plot_no))
-            for _, plot in plot_df.iterrows():
-                data = (plot_no,) + tuple(plot)
-                insert_data(conn, plots_sql, data)
-        
-        AddMessage('inserting forbs and grasses')
-        for _, forb_grass in forb_grass_df.iterrows():
-            data = tuple(forb_grass)
-            insert_data(conn, forb_grass_sql, data)
-        
-        print('inserting transect review')
-        for _, transect_data in transects_review_df.iterrows():
-            data = tuple(transect_data)
-            insert_data(conn, transects_review_sql, data)
-        
-        print('inserting site scale values')
-        for _, site_scale_value in site_scale_values_df.iterrows():
-            data = tuple(site_scale_value)
-            insert_data(conn, site_scale_values_sql, data)
-        
-        print('inserting site scale scores')
-        for _, site_scale_score in site_scale_scores_df.iterrows():
-            data = tuple(site_scale_score)
-            insert_data(conn, site_scale_scores_sql, data)
-        
-        AddMessage('inserting projected values')
-        for _, projected_value in projected_values_df.iterrows():
-            data = tuple(projected_value)
-            insert_data(conn, projected_values_sql, data)
-        
-        print('inserting projected scores')
-        for _, projected_score in projected_scores_df.iterrows():
-            data = tuple(projected_score)
-            insert_data(conn, projected_scores_sql, data)
-        
-        AddMessage('inserting baseline and rr inputs')
-        for _, baseline_rr_input in baseline_rr_inputs_df.iterrows():
-            data = tuple(baseline_rr_input)
-            insert_data(conn, baseline_rr_inputs_sql, data)
-        
-        print('inserting baseline and rr scores')
-        for _, baseline_rr in baseline_rr_df.iterrows():
-            data = tuple(baseline_rr)
-            insert_data(conn, baseline_rr_sql, data)
-        
-        print('inserting baseline credits')
-        for _, baseline_credit in baseline_credits_df.iterrows():
-            data = tuple(baseline_credit)
-            insert_data(conn, baseline_credits_sql, data)
-        
-        print('inserting current credits')
-        for _, current_credit in current_credits_df.iterrows():
-            data = tuple(current_credit)
-            insert_data(conn, current_credits_sql, data)
-        
-        print('inserting projected credits')
-        for _, projected_credit in projected_credits_df.iterrows():
-            data = tuple(projected_credit)
-            insert_data(conn, projected_credits_sql, data)
-        
-        AddMessage('{} minutes elapsed'.format(round((time.time() - start)/60, 2)))
+    # stack plots into a single table, prefixed with the plot number
+    plot_dfs = []
+    for plot_no in plot_cols:
+        plot_df = project_calc.plot_df(plot_cols.get(plot_no))
+        plot_df.columns = range(1, len(plot_df.columns) + 1)
+        plot_df.insert(0, 0, plot_no)
+        plot_dfs.append(plot_df)
+    plots_df = pd.concat(plot_dfs, ignore_index=True)
+    
+    # pair each table with the data frame to insert, in insert order
+    tables = [
+        ('map_units', map_units_df),
+        ('current_ls', current_ls_df),
+        ('projected_ls', projected_ls_df),
+        ('transect_data', transects_data_df),
+        ('project_mgmt_cats', mgmt_cats_df),
+        ('project_wmz', wmz_df),
+        ('project_pmu', pmu_df),
+        ('project_precip', precip_df),
+        ('desktop_results', desktop_results_df),
+        # ('field_sheets', field_sheets_df),
+        ('field_info', field_info_df),
+        ('shrub_data', shrubs_df),
+        ('plot_data', plots_df),
+        ('forb_grass_data', forb_grass_df),
+        ('transect_review', transects_review_df),
+        ('site_scale_values', site_scale_values_df),
+        ('site_scale_scores', site_scale_scores_df),
+        ('projected_values', projected_values_df),
+        ('projected_scores', projected_scores_df),
+        ('baseline_rr_inputs', baseline_rr_inputs_df),
+        ('baseline_rr', baseline_rr_df),
+        ('baseline_credits', baseline_credits_df),
+        ('current_credits', current_credits_df),
+        ('projected_credits', projected_credits_df)
+    ]
+    
+    # insert data into database, one executemany per table
+    hashes = stored_hashes(conn) if incremental else None
+    loaded = [table_name for table_name, df in tables
+              if load_table(conn, table_name, df, hashes)]
+    
+    AddMessage('{} minutes elapsed'.format(round((time.time() - start)/60, 2)))
     
     # USING FOREIGN KEYS
     # with conn:      
@@ -269,45 +270,66 @@ def import_credit_calc(database_path, credit_calc_file):
     #             field_info += (transect_key,)
     #             insert_data(conn, f_sql_file, field_info)
     
-    conn.close()
+    if owned:
+        conn.close()
+    
+    return loaded
 
 
-def import_policy_tables(database_path, policy_tables_path):    
+def import_policy_tables(database_path, policy_tables_path, 
+                         incremental=False):
+    """
+    Reads each policy table csv and inserts it into the database. Returns
+    the names of the tables that were (re)loaded.
+    :param database_path: path to the project database
+    :param policy_tables_path: folder of policy table csv files
+    :param incremental: if True, only tables whose content hash differs 
+    from the last import are deleted and reloaded
+    """
     database = database_path
     policy_tables_folder = policy_tables_path
     
     # create database connection
-    conn = create_connection(database)
+    conn, owned = open_database(database)
 
     # read in tables
     start = time.time()
     AddMessage('reading policy tables at ' + policy_tables_folder)
+    hashes = stored_hashes(conn) if incremental else None
+    loaded = []
     for table in os.listdir(policy_tables_folder):
         # read in table
         table_path = os.path.join(policy_tables_folder, table)
         df = pd.read_csv(table_path)
         
-        # read in sql file
-        sql_file_name = 'insert_' + table[:-4].replace('-', '_') + '.sql'
-        sql_file_path = os.path.join(sql_dir, sql_file_name)
-        
         # insert data into database
-        with conn:
-            AddMessage('inserting ' + table[:-4].replace('-', '_'))
-            for _, row in df.iterrows():
-                data = tuple(row)
-                insert_data(conn, sql_file_path, data)
+        table_name = table[:-4].replace('-', '_')
+        if load_table(conn, table_name, df, hashes):
+            loaded.append(table_name)
     
-    conn.close()
+    if owned:
+        conn.close()
         
     AddMessage('{} seconds elapsed'.format(round((time.time() - start), 2)))
     
+    return loaded
+    
+
+def drop_views(database_path):
+    """Drops all views so they are re-created from the current sql files"""
+    conn, owned = open_database(database_path)
+    with conn:
+        for view in reversed(VIEWS):
+            conn.execute('DROP VIEW IF EXISTS {}'.format(view))
+    if owned:
+        conn.close()
+
 
 def create_views(database_path):
     database = database_path
 
     # create database connection
-    conn = create_connection(database)
+    conn, owned = open_database(database)
     
     # Create desktop results view
     AddMessage('creating desktop results view')
@@ -331,15 +353,224 @@ def create_views(database_path):
     view_baseline_sql = os.path.join(sql_dir, 'view_baseline.sql')
     create_view(conn, view_baseline_sql)
     
-    conn.close()
+    if owned:
+        conn.close()
     
         
+def materialize_tables(database_path, refresh=True):
+    """
+    Builds the transect_metrics and site_scale_metrics tables from the 
+    imported field data with set-based queries. These replace reading 
+    view_transect_data and view_site_scale_values, which re-evaluate 
+    correlated subqueries for every transect on each access.
+    :param database_path: path to the project database
+    :param refresh: if True, existing tables are dropped and rebuilt, else
+    only missing tables are created
+    """
+    conn, owned = open_database(database_path)
+    with conn:
+        for table in MATERIALIZED:
+            AddMessage('materializing ' + table)
+            if refresh:
+                conn.execute('DROP TABLE IF EXISTS {}'.format(table))
+            materialize_sql = os.path.join(sql_dir, 
+                                           'materialize_' + table + '.sql')
+            create_view(conn, materialize_sql)
+    if owned:
+        conn.close()
+
+
+def create_indexes(database_path, materialized=False):
+    """
+    Creates the secondary indexes defined in create_index_*.sql and runs
+    ANALYZE so the query planner has statistics. Run in two passes: on the
+    loaded tables before materialize_tables, so the materializing joins can
+    use them, and with materialized=True after it, for the indexes on the 
+    tables it rebuilds (dropping a table drops its indexes).
+    :param database_path: path to the project database
+    :param materialized: if True, create the indexes on the MATERIALIZED
+    tables, else the indexes on every other table
+    """
+    conn, owned = open_database(database_path)
+    
+    # Create list of index files
+    materialized_indexes = [
+        'create_index_' + table + '.sql' for table in MATERIALIZED
+        ]
+    indexes = [index for index in sorted(os.listdir(sql_dir))
+               if index.startswith('create_index')
+               and (index in materialized_indexes) == materialized]
+    
+    # Create each index from list
+    for index in indexes:
+        AddMessage('Running {}'.format(index))
+        with open(os.path.join(sql_dir, index), 'r') as sql_file:
+            sql = sql_file.read()
+            create_table(conn, sql)
+    
+    # gather planner statistics
+    conn.execute('ANALYZE')
+    conn.commit()
+    if owned:
+        conn.close()
+
+
+def compare_parse_timing(credit_calc_file, processes=None):
+    """
+    Times parsing every sheet of a Project Calculator serially and in a pool
+    of worker processes. Returns seconds elapsed as (serial, parallel).
+    :param credit_calc_file: path to the Project Calculator
+    :param processes: number of worker processes, defaults to the number of
+    cpus
+    """
+    processes = processes or multiprocessing.cpu_count()
+    
+    start = time.time()
+    CalculatorWorkbook(credit_calc_file).parse_all()
+    serial = time.time() - start
+    
+    start = time.time()
+    CalculatorWorkbook(credit_calc_file).parse_all(processes)
+    parallel = time.time() - start
+    
+    AddMessage('serial parse: {} seconds'.format(round(serial, 2)))
+    AddMessage('parallel parse ({} processes): {} seconds'.format(
+        processes, round(parallel, 2)))
+    
+    return serial, parallel
+
+
+def replace_file(source, destination):
+    """Moves source over destination, atomically where the os allows"""
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+    else:
+        # python 2 cannot rename over an existing file on windows
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+
+def populate_database(database, calculator_file, policy_tables_path, 
+                      processes=None, incremental=False):
+    """
+    Runs each step of building the project database on a database path or
+    an open connection. Returns the names of the tables that were loaded.
+    """
+    create_database(database)
+    loaded = import_credit_calc(database, calculator_file, processes,
+                                incremental)
+    loaded += import_policy_tables(database, policy_tables_path,
+                                   incremental)
+    
+    # refresh views and materialized tables if any of their inputs changed
+    if loaded:
+        drop_views(database)
+    else:
+        AddMessage('no tables changed since the last import')
+    create_views(database)
+    
+    # index the loaded tables before the materializing joins read them, 
+    # then the materialized tables
+    create_indexes(database)
+    materialize_tables(database, refresh=bool(loaded))
+    create_indexes(database, materialized=True)
+    
+    return loaded
+
+
 def build_database(database_path, calculator_file,
-                   policy_tables_path):
-    create_database(database_path)
-    import_credit_calc(database_path, calculator_file)
-    import_policy_tables(database_path, policy_tables_path)
-    create_views(database_path)
+                   policy_tables_path, processes=None, incremental=False,
+                   build_mode=False, in_memory=False):
+    """
+    Creates the project database and imports the Project Calculator and 
+    policy tables.
+    :param processes: number of worker processes for parsing the calculator,
+    None to parse serially
+    :param incremental: if True, an existing database is updated in place, 
+    reloading only the tables whose content changed since the last import
+    :param build_mode: if True, the database is built in a temporary file 
+    next to database_path on a single connection with BUILD_PRAGMAS. It is
+    then finalized with durable settings, an integrity check and VACUUM 
+    and renamed over database_path. If the build fails the temporary file 
+    is removed, so no half-built database is left behind.
+    :param in_memory: if True, the database is built and finalized in 
+    memory and then written to the temporary file in one sequential pass 
+    with the sqlite3 backup API before it is renamed over database_path.
+    Use this for slow targets such as network shares.
+    """
+    if not (build_mode or in_memory):
+        populate_database(database_path, calculator_file, policy_tables_path,
+                          processes, incremental)
+        return
+    
+    start = time.time()
+    build_path = database_path + '.building'
+    if os.path.exists(build_path):
+        # left behind by a build that was killed
+        os.remove(build_path)
+    
+    if in_memory:
+        conn = create_connection(':memory:', BUILD_PRAGMAS)
+        if incremental and os.path.exists(database_path):
+            existing = create_connection(database_path)
+            copy_database(existing, conn)
+            existing.close()
+    else:
+        if incremental and os.path.exists(database_path):
+            shutil.copyfile(database_path, build_path)
+        conn = create_connection(build_path, BUILD_PRAGMAS)
+    
+    try:
+        populate_database(conn, calculator_file, policy_tables_path,
+                          processes, incremental)
+        AddMessage('finalizing database')
+        finalize_database(conn)
+        if in_memory:
+            AddMessage('writing database to ' + database_path)
+            target = create_connection(build_path)
+            copy_database(conn, target)
+            target.close()
+        conn.close()
+        replace_file(build_path, database_path)
+    except BaseException:
+        conn.close()
+        if os.path.exists(build_path):
+            os.remove(build_path)
+        raise
+    
+    AddMessage('database built in {} seconds'.format(
+        round(time.time() - start, 2)))
+
+
+def compare_build_timing(calculator_file, policy_tables_path, targets, 
+                         processes=None):
+    """
+    Times building the project database directly at each target path and 
+    building it in memory before writing it to the target. Returns a list of
+    (target, direct seconds, in-memory seconds). Each target is overwritten.
+    :param targets: list of database paths, e.g. one on a local disk and one
+    on a network share
+    """
+    timings = []
+    for target in targets:
+        if os.path.exists(target):
+            os.remove(target)
+        start = time.time()
+        build_database(target, calculator_file, policy_tables_path, processes)
+        direct = time.time() - start
+        
+        os.remove(target)
+        start = time.time()
+        build_database(target, calculator_file, policy_tables_path, processes,
+                       in_memory=True)
+        in_memory = time.time() - start
+        
+        AddMessage('{}: direct {} seconds, in memory {} seconds'.format(
+            target, round(direct, 2), round(in_memory, 2)))
+        timings.append((target, direct, in_memory))
+    
+    return timings
     
     
 if __name__ == '__main__':
@@ -0,0 +1,226 @@
+import credit_calc as calc
+import batch_calc as batch
+from response_surface import ResponseSurface, ATTR_SCALES, TRIGGER_ATTRS
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+# Range of values searched for each habitat attribute, None for the edge of
+# the scoring curves
+ATTR_BOUNDS = {
+    'sage_cover': (0, 1),
+    'sage_height': (0, None),
+    'shrub_cover': (0, 1),
+    'forb_cover': (0, 1),
+    'forb_rich': (0, None),
+    'grass_cover': (0, 1),
+    'brotec_cover': (0, 1)
+}
+
+DIRECTIONS = ['increase', 'decrease']
+
+
+# Integer keys of -inf and inf in float order, see float_keys
+INF_KEY = np.array(np.inf).view('int64')
+SIGN_BIT = np.array(-0.0).view('int64')
+
+
+def float_keys(values):
+    '''
+    Returns int64 keys of float64 values that are in the same order as the
+    values and one apart for adjacent floats (-0.0 and 0.0 both map to 0).
+    :param values: array of float64 values, not NaN
+    '''
+    bits = np.asarray(values, dtype='float64').view('int64')
+    return np.where(bits < 0, -(bits & ~SIGN_BIT), bits)
+
+
+def key_floats(keys):
+    '''Returns the float64 values of keys from float_keys'''
+    keys = np.asarray(keys, dtype='int64')
+    return np.where(keys < 0, -keys | SIGN_BIT, keys).view('float64')
+
+
+def step_up(values, condition):
+    '''
+    Returns the smallest float for which condition holds, where condition
+    is False below and True above a breakpoint, e.g. the exact breakpoints
+    of floor(value * scale) and of the breeding trigger despite rounding
+    (0.29 * 100 is 28.999...). Bisects on the float representation from
+    each value up to inf or down to -inf, so it takes at most 64 steps
+    however far the breakpoint is from the value.
+    :param values: array of starting values, usually close to the breakpoint
+    :param condition: function of an array returning a boolean array,
+    assumed False at -inf and True at inf
+    '''
+    keys = float_keys(values)
+    with np.errstate(invalid='ignore'):
+        holds = condition(key_floats(keys))
+    # condition is False at lower and True at upper
+    lower = np.where(holds, -INF_KEY, keys)
+    upper = np.where(holds, keys, INF_KEY)
+    while True:
+        # halve each term so the sum cannot overflow
+        middle = lower // 2 + upper // 2 + (lower % 2 + upper % 2) // 2
+        active = (middle > lower) & (middle < upper)
+        if not active.any():
+            break
+        with np.errstate(invalid='ignore'):
+            holds = condition(key_floats(middle))
+        upper = np.where(active & holds, middle, upper)
+        lower = np.where(active & ~holds, middle, lower)
+    return key_floats(upper)
+
+
+def row_intervals(hab_attr, start, stop):
+    '''
+    Returns the lowest and highest value that falls on each curve row of
+    hab_attr, as CurveTable.rows floors and clips them. The first row
+    extends down and the last row up without limit.
+    :param start, stop: first and last attr_value of the scoring curves
+    '''
+    scale = ATTR_SCALES[hab_attr]
+    rows = np.arange(start + 1, stop + 1, dtype='float64')
+    edges = step_up(rows / scale,
+                    lambda values: np.floor(values * scale) >= rows)
+    lowest = np.append(-np.inf, edges)
+    highest = np.append(np.nextafter(edges, -np.inf), np.inf)
+    return lowest, highest
+
+
+def trigger_breakpoints(other):
+    '''
+    Returns the lowest value of shrub or grass cover that sets the breeding
+    trigger, given the current value of the other attribute, as
+    credit_calc.score_arrays calculates it.
+    :param other: current value of the other attribute for each map unit
+    '''
+    other = np.where(np.isnan(other), 0, other)
+    return step_up(calc.BREEDING_TRIGGER - other,
+                   lambda values: values + other > calc.BREEDING_TRIGGER)
+
+
+def solve_attribute(surface, hab_attr, target, current, direction=None):
+    '''
+    Returns the value of hab_attr closest to its current value that reaches
+    the target credits on each map unit, and the credits at that value
+    (NaN where the target cannot be reached). Searches every curve row, and
+    trigger state for shrub and grass cover, of the response surface at
+    once.
+    :param surface: a ResponseSurface that includes hab_attr
+    :param hab_attr: habitat attribute to change
+    :param target: target credits, one per map unit in the order of
+    surface.map_unit_ids or one for all
+    :param current: current value of hab_attr of each map unit
+    :param direction: 'increase', 'decrease' or None for either
+    '''
+    n_units = len(surface.map_unit_ids)
+    target = np.asarray(target, dtype='float64') + np.zeros(n_units)
+    lowest, highest = row_intervals(hab_attr, surface.start, surface.stop)
+
+    # bounds of each piece of the attribute's domain, unit x row x layer
+    lower_bound, upper_bound = ATTR_BOUNDS[hab_attr]
+    if lower_bound is None:
+        lower_bound = -np.inf
+    if upper_bound is None:
+        upper_bound = np.inf
+    lowest = np.maximum(lowest, lower_bound)[np.newaxis, :, np.newaxis]
+    highest = np.minimum(highest, upper_bound)[np.newaxis, :, np.newaxis]
+    layers = surface.surfaces[hab_attr][:, :, :surface.missing]
+    credits = np.transpose(layers, (1, 2, 0))
+    lowest = lowest + np.zeros(credits.shape)
+    highest = highest + np.zeros(credits.shape)
+    if hab_attr in TRIGGER_ATTRS:
+        # the trigger is off below the breakpoint and on from it
+        trigger_at = trigger_breakpoints(
+            surface.current[TRIGGER_ATTRS[hab_attr]]
+            )[:, np.newaxis]
+        highest[:, :, 0] = np.minimum(highest[:, :, 0],
+                                      np.nextafter(trigger_at, -np.inf))
+        lowest[:, :, 1] = np.maximum(lowest[:, :, 1], trigger_at)
+
+    # the value of each piece closest to the current value
+    current = current[:, np.newaxis, np.newaxis]
+    values = np.clip(current, lowest, highest)
+    with np.errstate(invalid='ignore'):
+        change = values - current
+        reached = (
+            (lowest <= highest)
+            & ~np.isnan(change)
+            & (credits >= target[:, np.newaxis, np.newaxis])
+        )
+        if direction == 'increase':
+            reached &= change >= 0
+        elif direction == 'decrease':
+            reached &= change <= 0
+        elif direction is not None:
+            raise ValueError(
+                'direction must be one of {} or None'.format(
+                    ', '.join(DIRECTIONS))
+                )
+
+    n_pieces = credits.shape[1] * credits.shape[2]
+    distance = np.where(reached, np.abs(change), np.inf)
+    distance = distance.reshape(n_units, n_pieces)
+    best = distance.argmin(axis=1)
+    units = np.arange(n_units)
+    solved = np.isfinite(distance[units, best])
+    value = np.where(solved,
+                     values.reshape(n_units, n_pieces)[units, best], np.nan)
+    solved_credits = np.where(solved,
+                              credits.reshape(n_units, n_pieces)[units, best],
+                              np.nan)
+    return value, solved_credits
+
+
+def solve_targets(project, target, hab_attrs=None, direction=None,
+                  surface=None):
+    '''
+    Finds, for every map unit and habitat attribute, the smallest change to
+    the attribute (holding the others at their current values) that reaches
+    a target number of credits. Credits only change where the value crosses
+    a curve row or the breeding trigger, so each piece of the attribute's
+    domain is checked directly from the response surface rather than by
+    re-running the Calculator. Returns a table with one row per map unit and
+    attribute; value, change and credits are NaN where the target cannot be
+    reached within ATTR_BOUNDS or the current value is missing.
+    :param project: an instance of the CreditData class.
+    :param target: target credits, one number for all map units or a
+    Series indexed by map_unit_id
+    :param hab_attrs: habitat attributes to solve, all of
+    batch_calc.HAB_ATTRS if None
+    :param direction: 'increase', 'decrease' or None to search both ways
+    :param surface: a ResponseSurface of project to reuse, built if None
+    '''
+    if hab_attrs is None:
+        hab_attrs = batch.HAB_ATTRS
+    if surface is None:
+        surface = ResponseSurface(project, hab_attrs)
+
+    map_unit_ids = surface.map_unit_ids
+    if isinstance(target, pd.Series):
+        target = target.reindex(map_unit_ids).values
+
+    site_scale_values = project.site_scale_values.set_index('map_unit_id')
+
+    results = []
+    for hab_attr in hab_attrs:
+        current = np.asarray(
+            site_scale_values[hab_attr].reindex(map_unit_ids), dtype='float64'
+            )
+        value, credits = solve_attribute(surface, hab_attr, target, current,
+                                         direction)
+        result = OrderedDict()
+        result['map_unit_id'] = map_unit_ids
+        result['hab_attr'] = hab_attr
+        result['current_value'] = current
+        result['target'] = np.asarray(target, dtype='float64') + np.zeros(
+            len(map_unit_ids))
+        result['current_credits'] = surface.baseline
+        result['value'] = value
+        result['change'] = value - current
+        result['credits'] = credits
+        results.append(pd.DataFrame(result, columns=list(result.keys())))
+
+    return pd.concat(results, ignore_index=True)
@@ -2,137 +2,309 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+import multiprocessing
 
 # for CreditData class
 from components import create_connection
+from scoring import CurveTable, WeightTable
+from policy import ProjectPolicyContext
 from collections import OrderedDict
 
 # TODO Add column names to each df
 
+# Sheet and columns read from the Project Calculator for each table. Each 
+# sheet is parsed once over the union of the columns listed for it.
+CALC_TABLES = OrderedDict([
+    ('map_units', ('1.1 Enter Map Unit Data', 'C:G,J:O,V')),
+    ('current_ls', ('1.1 Enter Map Unit Data', 'C,P:R')),
+    ('projected_ls', ('1.1 Enter Map Unit Data', 'C,S:U')),
+    ('transects_data', ('1.1 Enter Map Unit Data', 'C:K')),
+    ('mgmt_cats', ('1.3 Enter Mgmt Cats Data', 'C:E')),
+    ('wmz', ('1.3 Enter Mgmt Cats Data', 'J:L')),
+    ('pmu', ('1.3 Enter Mgmt Cats Data', 'Q:S')),
+    ('precip', ('1.3 Enter Mgmt Cats Data', 'X:Z')),
+    ('desktop_results', ('1.4 Review Desktop Results', 'B:AC')),
+    ('field_sheets', ('2.1 Track Field Sheets', 'A:L')),
+    ('field_info', ('2.2 Enter Field Info', 'B:V')),
+    ('shrubs', ('2.3 Enter Shrub Data', 'C:H')),
+    ('plots', ('2.4 Enter Forbs & Grass Data', 'C:S')),
+    ('forb_grass', ('2.4 Enter Forbs & Grass Data', 'C:D, T:X')),
+    ('transects_review', ('2.5 Review Transect Data', 'B:O')),
+    ('site_scale_values', (
+        '2.6 Enter Projected Condition',
+        'B:K, N, R, V, Z, AD, AL, AY, BC, BI, BQ, BU, CH, CL')),
+    ('site_scale_scores', (
+        '2.6 Enter Projected Condition',
+        ("B, L, P, T, X, AB, AF, AH, AJ, AN, AP, AS, AU, AW,"
+         "BA, BE, BG, BK, BM, BO, BS, BW, BY, CB, CD, CF,"
+         "CJ, CN, CP, CS, CU, CW"))),
+    ('projected_values', (
+        '2.6 Enter Projected Condition',
+        ("B, O, S, W, AA, AE, AM, AR, AZ, BD, BJ, BR, BV, CA, CI,"
+         "CM, CR"))),
+    ('projected_scores', (
+        '2.6 Enter Projected Condition',
+        ("B, M, Q, U, Y, AC, AG, AI, AK, AO, AQ, AT, AV, AX,"
+         "BB, BF, BH, BL, BN, BP, BT, BX, BZ, CC, CE, CG,"
+         "CK, CO, CQ, CT, CV, CX"))),
+    ('baseline_rr_inputs', (
+        '3.1 Enter Baseline & Rsrv Acct', 'B, F, H, K, S, T, U')),
+    ('baseline_rr', ('3.1 Enter Baseline & Rsrv Acct', 'B:E, G, I:J, L:R')),
+    ('baseline_credits', ('3.2 Review Credit Amount', 'B:O')),
+    ('current_credits', ('3.2 Review Credit Amount', 'B:C, P:AN')),
+    ('projected_credits', ('3.2 Review Credit Amount', 'B:C, AO:BM'))
+])
+
+
+def column_index(column):
+    """Returns the zero-based index of an Excel column letter (e.g., 'AC')"""
+    index = 0
+    for char in column.strip().upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+def expand_cols(parse_cols):
+    """
+    Returns the sorted zero-based column indices of an Excel column range
+    string as used by parse_cols (e.g., 'C:G,J:O,V')
+    """
+    indices = set()
+    for part in parse_cols.split(','):
+        if ':' in part:
+            first, last = part.split(':')
+            indices.update(range(column_index(first), column_index(last) + 1))
+        else:
+            indices.add(column_index(part))
+    return sorted(indices)
+
+
+def parse_sheet(io, sheet_name, columns, skiprows=5):
+    """
+    Returns a sheet of a Project Calculator parsed over the provided columns,
+    labelled with their zero-based index in the sheet
+    :param io: path to the calculator or an open pd.ExcelFile
+    :param sheet_name: name of the sheet
+    :param columns: sorted zero-based column indices to parse
+    :param skiprows: number of header rows to skip
+    """
+    sheet = pd.read_excel(
+        io,
+        sheet_name,
+        skiprows=skiprows, header=None,
+        parse_cols=columns)
+    # trailing columns beyond the used range of the sheet are empty
+    sheet = sheet.reindex(columns=range(len(columns)))
+    sheet.columns = columns
+    return sheet
+
+
+def parse_sheets_columnar(args):
+    """
+    Worker for parsing several sheets in a separate process. Opens the 
+    workbook once and returns each sheet in compact columnar form, a tuple of
+    (sheet_name, columns, list of column arrays), so only numpy arrays are 
+    pickled back to the parent.
+    :param args: tuple of (calc_file, list of (sheet_name, columns), skiprows)
+    """
+    calc_file, sheet_columns, skiprows = args
+    book = pd.ExcelFile(calc_file)
+    parsed = []
+    for sheet_name, columns in sheet_columns:
+        sheet = parse_sheet(book, sheet_name, columns, skiprows)
+        parsed.append(
+            (sheet_name, columns, [sheet[col].values for col in columns])
+        )
+    return parsed
+
+
+def set_worker_executable():
+    """
+    ArcMap runs python in-process, so multiprocessing would start workers 
+    with ArcMap.exe. Point workers at the interpreter instead.
+    """
+    if (os.name == 'nt' and 
+        not os.path.basename(sys.executable).lower().startswith('python')):
+        multiprocessing.set_executable(
+            os.path.join(sys.exec_prefix, 'pythonw.exe'))
+
+
+class CalculatorWorkbook:
+    """
+    Opens a Project Calculator once and parses each sheet at most once, over
+    the union of the columns registered for that sheet in CALC_TABLES. 
+    Tables are returned as column slices of the cached sheet.
+    """
+    def __init__(self, calc_file, skiprows=5):
+        self.calc_file = calc_file
+        self.skiprows = skiprows
+        self.book = None
+        self.sheets = {}
+        self.columns = {}
+        self.parse_count = 0
+        for sheet_name, parse_cols in CALC_TABLES.values():
+            self.register(sheet_name, parse_cols)
+
+    def register(self, sheet_name, parse_cols):
+        """Adds columns to those parsed for a sheet"""
+        columns = self.columns.setdefault(sheet_name, set())
+        columns.update(expand_cols(parse_cols))
+
+    def sheet(self, sheet_name):
+        """Returns the cached sheet, parsing it on first access. Columns are
+        labelled with their zero-based index in the sheet."""
+        if sheet_name not in self.sheets:
+            if self.book is None:
+                self.book = pd.ExcelFile(self.calc_file)
+            columns = sorted(self.columns[sheet_name])
+            self.sheets[sheet_name] = parse_sheet(
+                self.book, sheet_name, columns, self.skiprows)
+            self.parse_count += 1
+        return self.sheets[sheet_name]
+
+    def parse_all(self, processes=None):
+        """
+        Parses every registered sheet that is not yet cached. If processes is
+        greater than 1, sheets are split across a pool of worker processes, 
+        each of which opens the workbook once, and the columnar results are 
+        assembled into the cache in this process.
+        :param processes: number of worker processes, None or 1 to parse
+        serially
+        """
+        pending = [sheet_name for sheet_name in self.columns 
+                   if sheet_name not in self.sheets]
+        if not processes or processes < 2 or len(pending) < 2:
+            for sheet_name in pending:
+                self.sheet(sheet_name)
+            return
+        
+        set_worker_executable()
+        
+        # deal sheets round-robin so each worker opens the workbook once
+        processes = min(processes, len(pending))
+        groups = [[] for _ in range(processes)]
+        for i, sheet_name in enumerate(pending):
+            groups[i % processes].append(
+                (sheet_name, sorted(self.columns[sheet_name])))
+        tasks = [(self.calc_file, group, self.skiprows) for group in groups]
+        
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(parse_sheets_columnar, tasks)
+        finally:
+            pool.close()
+            pool.join()
+        
+        for parsed in results:
+            for sheet_name, columns, arrays in parsed:
+                self.sheets[sheet_name] = pd.DataFrame(
+                    OrderedDict(zip(columns, arrays)), columns=columns)
+                self.parse_count += 1
+
+    def read(self, sheet_name, parse_cols):
+        """
+        Returns a copy of the requested columns of a sheet, labelled 0..n-1 
+        as pd.read_excel would with header=None
+        :param sheet_name: name of the sheet in the Project Calculator
+        :param parse_cols: Excel column range string (e.g., 'C:G,J:O,V')
+        """
+        columns = expand_cols(parse_cols)
+        if not set(columns) <= self.columns.get(sheet_name, set()):
+            # unregistered columns, re-parse the sheet over the new union
+            self.register(sheet_name, parse_cols)
+            self.sheets.pop(sheet_name, None)
+        df = self.sheet(sheet_name)[columns].copy()
+        df.columns = range(len(columns))
+        return df
+
+    def read_table(self, table_name):
+        """Returns the columns of the sheet registered in CALC_TABLES for a 
+        table"""
+        sheet_name, parse_cols = CALC_TABLES[table_name]
+        return self.read(sheet_name, parse_cols)
+
+
 class CreditCalculator:    
     def __init__(self, calc_file):
         self.calc_file = calc_file
+        self.workbook = CalculatorWorkbook(calc_file)
     
     @property    
     def map_units_df(self):
         # read in map units table
-        map_units_df = pd.read_excel(
-            self.calc_file, 
-            '1.1 Enter Map Unit Data',
-            skiprows=5, header=None,
-            parse_cols="C:G,J:O,V")  # read TRUE/FALSE as bool (0) in indirect_benefits
+        # read TRUE/FALSE as bool (0) in indirect_benefits
+        map_units_df = self.workbook.read_table('map_units')
         map_units_df = map_units_df[map_units_df.iloc[:,0].notnull()]
         return map_units_df
     
     @property
     def current_ls_df(self):
         # read in current local-scale values from map unit table
-        current_ls_df = pd.read_excel(
-            self.calc_file,
-            '1.1 Enter Map Unit Data',
-            skiprows=5, header=None,
-            parse_cols="C,P:R"
-        )
+        current_ls_df = self.workbook.read_table('current_ls')
         current_ls_df = current_ls_df[current_ls_df.iloc[:,0].notnull()]
         return current_ls_df
     
     @property
     def projected_ls_df(self):
         # read in projected local-scale values from map unit table
-        projected_ls_df = pd.read_excel(
-            self.calc_file,
-            '1.1 Enter Map Unit Data',
-            skiprows=5, header=None,
-            parse_cols="C,S:U"
-        )
+        projected_ls_df = self.workbook.read_table('projected_ls')
         projected_ls_df = projected_ls_df[projected_ls_df.iloc[:,0].notnull()]
         return projected_ls_df
     
     @property
     def transects_data_df(self):
         # read in transects table
-        transects_data_df = pd.read_excel(
-            self.calc_file, 
-            '1.1 Enter Map Unit Data',
-            skiprows=5, header=None,
-            parse_cols="C:K")
+        transects_data_df = self.workbook.read_table('transects_data')
         transects_data_df = transects_data_df[transects_data_df.iloc[:,0].notnull()]
         return transects_data_df
     
     @property
     def mgmt_cats_df(self):
         # read in mgmt cats table
-        mgmt_cats_df = pd.read_excel(
-            self.calc_file, 
-            '1.3 Enter Mgmt Cats Data',
-            skiprows=5, header=None,
-            parse_cols="C:E")
+        mgmt_cats_df = self.workbook.read_table('mgmt_cats')
         mgmt_cats_df = mgmt_cats_df[mgmt_cats_df.iloc[:,0].notnull()]
         return mgmt_cats_df
     
     @property
     def wmz_df(self):
         # read in wmz table
-        wmz_df = pd.read_excel(
-            self.calc_file, 
-            '1.3 Enter Mgmt Cats Data',
-            skiprows=5, header=None,
-            parse_cols="J:L")
+        wmz_df = self.workbook.read_table('wmz')
         wmz_df = wmz_df[wmz_df.iloc[:,0].notnull()]
         return wmz_df
     
     @property
     def pmu_df(self):
         # read in pmu table
-        pmu_df = pd.read_excel(
-            self.calc_file, 
-            '1.3 Enter Mgmt Cats Data',
-            skiprows=5, header=None,
-            parse_cols="Q:S")
+        pmu_df = self.workbook.read_table('pmu')
         pmu_df = pmu_df[pmu_df.iloc[:,0].notnull()]
         return pmu_df
     
     @property
     def precip_df(self):
         # read in precip table
-        precip_df = pd.read_excel(
-            self.calc_file, 
-            '1.3 Enter Mgmt Cats Data',
-            skiprows=5, header=None,
-            parse_cols="X:Z")
+        precip_df = self.workbook.read_table('precip')
         precip_df = precip_df[precip_df.iloc[:,0].notnull()]
         return precip_df
     
     @property
     def desktop_results_df(self):
         # read in desktop results table
-        desktop_results_df = pd.read_excel(
-            self.calc_file, 
-            '1.4 Review Desktop Results',
-            skiprows=5, header=None,
-            parse_cols="B:AC")
+        desktop_results_df = self.workbook.read_table('desktop_results')
         desktop_results_df = desktop_results_df[desktop_results_df.iloc[:,0].notnull()]
         return desktop_results_df
     
     @property
     def field_sheets_df(self):
         # read in field sheets table (additional map unit info)
-        field_sheets_df = pd.read_excel(
-            self.calc_file, 
-            '2.1 Track Field Sheets',
-            skiprows=5, header=None,
-            parse_cols="A:L")
+        field_sheets_df = self.workbook.read_table('field_sheets')
         field_sheets_df = field_sheets_df[field_sheets_df[1].notnull()]
         return field_sheets_df
     
     @property
     def field_info_df(self):
         # read in field info table (additional transects info)
-        field_info_df = pd.read_excel(
-            self.calc_file, 
-            '2.2 Enter Field Info',
-            skiprows=5, header=None,
-            parse_cols="B:V")
+        field_info_df = self.workbook.read_table('field_info')
         field_info_df = field_info_df[field_info_df.iloc[:,0].notnull()]    
         # format date column
         field_info_df[8] = field_info_df[8].map(lambda x: x.strftime('%Y-%m-%d') 
@@ -145,69 +317,42 @@ class CreditCalculator:
     @property
     def shrubs_df(self):
         # read in shrub data
-        shrubs_df = pd.read_excel(
-            self.calc_file, 
-            '2.3 Enter Shrub Data',
-            skiprows=5, header=None,
-            parse_cols="C:H")
+        shrubs_df = self.workbook.read_table('shrubs')
         shrubs_df = shrubs_df[shrubs_df.iloc[:,0].notnull()]
         return shrubs_df
         
     # @property
     def plot_df(self, plot_cols):
         # read in plot data        
-        plot_df = pd.read_excel(
-            self.calc_file, 
-            '2.4 Enter Forbs & Grass Data',
-            skiprows=5, header=None,
-            parse_cols=plot_cols)
+        plot_df = self.workbook.read('2.4 Enter Forbs & Grass Data', plot_cols)
         plot_df = plot_df[plot_df.iloc[:,0].notnull()]
         return plot_df
         
     @property
     def forb_grass_df(self):
         # read in forbs and grasses data
-        forb_grass_df = pd.read_excel(
-            self.calc_file, 
-            '2.4 Enter Forbs & Grass Data',
-            skiprows=5, header=None,
-            parse_cols="C:D, T:X")
+        forb_grass_df = self.workbook.read_table('forb_grass')
         forb_grass_df = forb_grass_df[forb_grass_df.iloc[:,0].notnull()]
         return forb_grass_df
         
     @property
     def transects_review_df(self):
         # read in transects data table
-        transects_review_df = pd.read_excel(
-            self.calc_file, 
-            '2.5 Review Transect Data',
-            skiprows=5, header=None,
-            parse_cols="B:O")
+        transects_review_df = self.workbook.read_table('transects_review')
         transects_review_df = transects_review_df[transects_review_df.iloc[:,0].notnull()]
         return transects_review_df
     
     @property
     def site_scale_values_df(self):
         # read in attribute values from projected condition
-        site_scale_values_df = pd.read_excel(
-            self.calc_file, 
-            '2.6 Enter Projected Condition',
-            skiprows=5, header=None,
-            parse_cols="B:K, N, R, V, Z, AD, AL, AY, BC, BI, BQ, BU, CH, CL")
+        site_scale_values_df = self.workbook.read_table('site_scale_values')
         site_scale_values_df = site_scale_values_df[site_scale_values_df.iloc[:,0].notnull()]
         return site_scale_values_df
     
     @property
     def site_scale_scores_df(self):
         # read in attribute values from projected condition
-        site_scale_scores_df = pd.read_excel(
-            self.calc_file, 
-            '2.6 Enter Projected Condition',
-            skiprows=5, header=None,
-            parse_cols=("B, L, P, T, X, AB, AF, AH, AJ, AN, AP, AS, AU, AW,"
-                     "BA, BE, BG, BK, BM, BO, BS, BW, BY, CB, CD, CF,"
-                     "CJ, CN, CP, CS, CU, CW")
-            )
+        site_scale_scores_df = self.workbook.read_table('site_scale_scores')
         site_scale_scores_df = site_scale_scores_df[site_scale_scores_df.iloc[:,0].notnull()]
         return site_scale_scores_df
     
@@ -215,13 +360,7 @@ class CreditCalculator:
     def projected_values_df(self):
         # read in projected attribute values
         # return a tidy dataset with only non-null inputs
-        projected_values_df = pd.read_excel(
-            self.calc_file, 
-            '2.6 Enter Projected Condition',
-            skiprows=5, header=None,
-            parse_cols=("B, O, S, W, AA, AE, AM, AR, AZ, BD, BJ, BR, BV, CA, CI,"
-                     "CM, CR")
-            )
+        projected_values_df = self.workbook.read_table('projected_values')
         projected_values_df = projected_values_df[projected_values_df.iloc[:,0].notnull()]
         
         col_names = [
@@ -253,70 +392,42 @@ class CreditCalculator:
     @property
     def projected_scores_df(self):
         # read in projected attribute values
-        projected_scores_df = pd.read_excel(
-            self.calc_file, 
-            '2.6 Enter Projected Condition',
-            skiprows=5, header=None,
-            parse_cols=("B, M, Q, U, Y, AC, AG, AI, AK, AO, AQ, AT, AV, AX,"
-                     "BB, BF, BH, BL, BN, BP, BT, BX, BZ, CC, CE, CG,"
-                     "CK, CO, CQ, CT, CV, CX")
-            )
+        projected_scores_df = self.workbook.read_table('projected_scores')
         projected_scores_df = projected_scores_df[projected_scores_df.iloc[:,0].notnull()]
         return projected_scores_df
     
     @property
     def baseline_rr_inputs_df(self):
         # read in baseline and rr inputs
-        baseline_rr_inputs_df = pd.read_excel(
-            self.calc_file,
-            '3.1 Enter Baseline & Rsrv Acct',
-            skiprows=5, header=None,
-            parse_cols="B, F, H, K, S, T, U"
-        )
+        baseline_rr_inputs_df = self.workbook.read_table('baseline_rr_inputs')
         baseline_rr_inputs_df = baseline_rr_inputs_df[baseline_rr_inputs_df.iloc[:,0].notnull()]
         return baseline_rr_inputs_df
     
     @property
     def baseline_rr_df(self):
         # read in baseline
-        baseline_rr_df = pd.read_excel(
-            self.calc_file, 
-            '3.1 Enter Baseline & Rsrv Acct',
-            skiprows=5, header=None,
-            parse_cols="B:E, G, I:J, L:R")
+        baseline_rr_df = self.workbook.read_table('baseline_rr')
         baseline_rr_df = baseline_rr_df[baseline_rr_df.iloc[:,0].notnull()]
         return baseline_rr_df
     
     @property
     def baseline_credits_df(self):
         # read in credit amount
-        baseline_credits_df = pd.read_excel(
-            self.calc_file, 
-            '3.2 Review Credit Amount',
-            skiprows=5, header=None,
-            parse_cols="B:O")
+        baseline_credits_df = self.workbook.read_table('baseline_credits')
         baseline_credits_df = baseline_credits_df[baseline_credits_df.iloc[:,0].notnull()]
         return baseline_credits_df
     
     @property
     def current_credits_df(self):
         # read in credit amount
-        current_credits_df = pd.read_excel(
-            self.calc_file, 
-            '3.2 Review Credit Amount',
-            skiprows=5, header=None,
-            parse_cols="B:C, P:AN")
+        current_credits_df = self.workbook.read_table('current_credits')
         current_credits_df = current_credits_df[current_credits_df.iloc[:,0].notnull()]
         return current_credits_df
     
     @property
     def projected_credits_df(self):
         # read in credit amount
-        projected_credits_df = pd.read_excel(
-            self.calc_file, 
-            '3.2 Review Credit Amount',
-            skiprows=5, header=None,
-            parse_cols="B:C, AO:BM")
+        projected_credits_df = self.workbook.read_table('projected_credits')
         projected_credits_df = projected_credits_df[projected_credits_df.iloc[:,0].notnull()]
         return projected_credits_df
 
@@ -332,88 +443,193 @@ class PolicyTables:
 
     
 class CreditData:
+    """
+    Reads the project tables from the database. Each table is read once and
+    cached; every access returns a copy of the cached frame so callers can 
+    modify it in place (e.g. set_index(..., inplace=True)) without changing
+    what later callers see. The cache is cleared when this connection writes
+    to the database; call invalidate() after writing through any other 
+    connection, e.g. after build_database.
+    """
+    # objects compiled from a cached table, dropped along with it
+    DERIVED = {
+        'scoring_curves': ['curve_table'],
+        'scoring_weights': ['weight_table'],
+        'desktop_results': ['policy_context'],
+        'multipliers_policy': ['policy_context'],
+        'standard_values': ['policy_context'],
+        'reserve_account': ['policy_context'],
+        'standard_baseline': ['policy_context']
+        }
+
+    # view each materialized table is built from, read in its place from
+    # databases built before the table was materialized
+    MATERIALIZED_VIEWS = {
+        'site_scale_metrics': 'view_site_scale_values',
+        'transect_metrics': 'view_transect_data'
+        }
+
     def __init__(self, db):
         self.db = db
         self.conn = create_connection(self.db)
+        self._cache = {}
+        self._changes = self.conn.total_changes
+
+    def invalidate(self, *tables):
+        """
+        Drops cached tables so they are read again on next access.
+        :param tables: property names to drop, e.g. 'desktop_results'; all 
+        cached tables are dropped if none are given
+        :return: None
+        """
+        if tables:
+            for table in tables:
+                self._cache.pop(table, None)
+                for derived in self.DERIVED.get(table, []):
+                    self._cache.pop(derived, None)
+        else:
+            self._cache.clear()
+
+    def _refresh(self):
+        """Drops the cache if this connection has written to the database"""
+        if self.conn.total_changes != self._changes:
+            self.invalidate()
+            self._changes = self.conn.total_changes
+
+    def _read(self, name, query, index_col=None):
+        """
+        Returns a copy of the cached result of query, reading it from the 
+        database if it is not cached.
+        :param name: cache key, the name of the calling property
+        :param query: sql query to run
+        :param index_col: passed to read_sql_query
+        :return: pandas DataFrame
+        """
+        self._refresh()
+        if name not in self._cache:
+            self._cache[name] = pd.read_sql_query(
+                query, self.conn, index_col=index_col
+                )
+        return self._cache[name].copy()
+
+    def _materialized(self, table):
+        """
+        Returns table if the database has it, else the view it is
+        materialized from (the database was built before materialize_tables;
+        re-run build_database to create the table).
+        :param table: name of a materialized table, e.g. 'site_scale_metrics'
+        """
+        exists = self.conn.execute(
+            """SELECT 1 FROM sqlite_master
+               WHERE type = 'table' AND name = ?""", (table,)
+            ).fetchone()
+        if exists:
+            return table
+        return self.MATERIALIZED_VIEWS[table]
 
     @property
     def desktop_results(self):
-        desktop_results = pd.read_sql_query(
-            """SELECT * FROM view_desktop_results""", self.conn
+        return self._read(
+            'desktop_results', """SELECT * FROM view_desktop_results"""
             )
-        return desktop_results
 
     @property
     def site_scale_values(self):
-        site_scale_values = pd.read_sql_query(
-            """SELECT * FROM view_site_scale_values""", self.conn
+        return self._read(
+            'site_scale_values',
+            """SELECT * FROM {}""".format(
+                self._materialized('site_scale_metrics'))
+            )
+
+    @property
+    def transect_metrics(self):
+        return self._read(
+            'transect_metrics',
+            """SELECT * FROM {}""".format(
+                self._materialized('transect_metrics'))
             )
-        return site_scale_values
 
     @property
     def current_ls(self):
-        current_ls = pd.read_sql_query(
-            """SELECT * FROM current_ls""", self.conn
-        )
-        return current_ls
+        return self._read(
+            'current_ls', """SELECT * FROM current_ls"""
+            )
 
     @property
     def projected_ls(self):
-        projected_ls = pd.read_sql_query(
-            """SELECT * FROM projected_ls""", self.conn
-        )
-        return projected_ls
+        return self._read(
+            'projected_ls', """SELECT * FROM projected_ls"""
+            )
 
     @property
     def scoring_curves(self):
-        scoring_curves = pd.read_sql_query(
-            """SELECT * FROM scoring_curves_v100""", self.conn,
-            index_col= 'attr_value'
+        return self._read(
+            'scoring_curves', """SELECT * FROM scoring_curves_v100""",
+            index_col='attr_value'
             )
-        return scoring_curves
+
+    @property
+    def curve_table(self):
+        # reading scoring_curves first drops a stale curve_table
+        scoring_curves = self.scoring_curves
+        if 'curve_table' not in self._cache:
+            self._cache['curve_table'] = CurveTable(scoring_curves)
+        return self._cache['curve_table']
 
     @property
     def scoring_weights(self):
-        scoring_weights = pd.read_sql_query(
-            """SELECT * FROM scoring_weights""", self.conn,
+        return self._read(
+            'scoring_weights', """SELECT * FROM scoring_weights""",
             index_col=['season', 'attribute']
             )
-        return scoring_weights
+
+    @property
+    def weight_table(self):
+        # reading scoring_weights first drops a stale weight_table
+        scoring_weights = self.scoring_weights
+        if 'weight_table' not in self._cache:
+            self._cache['weight_table'] = WeightTable(scoring_weights)
+        return self._cache['weight_table']
 
     @property
     def standard_baseline(self):
-        standard_baseline = pd.read_sql_query(
-            """SELECT * FROM view_baseline""", self.conn
+        return self._read(
+            'standard_baseline', """SELECT * FROM view_baseline"""
             )
-        return standard_baseline
 
     @property
     def multipliers_policy(self):
-        multipliers_policy = pd.read_sql_query(
-            """SELECT * FROM mgmt_multiplier""", self.conn
+        return self._read(
+            'multipliers_policy', """SELECT * FROM mgmt_multiplier"""
             )
-        return multipliers_policy
 
     @property
     def standard_values(self):
-        standard_values = pd.read_sql_query(
-            """SELECT * FROM standard_values""", self.conn
+        return self._read(
+            'standard_values', """SELECT * FROM standard_values"""
             )
-        return standard_values
-    
+
     @property
     def reserve_account(self):
-        reserve_account = pd.read_sql_query(
-            """SELECT * FROM view_reserve_account""", self.conn
+        return self._read(
+            'reserve_account', """SELECT * FROM view_reserve_account"""
             )
-        return reserve_account
+
+    @property
+    def policy_context(self):
+        # compiled from the policy tables once, see ProjectPolicyContext
+        self._refresh()
+        if 'policy_context' not in self._cache:
+            self._cache['policy_context'] = (
+                ProjectPolicyContext.from_project(self)
+                )
+        return self._cache['policy_context']
 
     @property
     def projected_values(self):
-        projected_values = pd.read_sql_query(
-            """SELECT * FROM projected_values""", self.conn
+        return self._read(
+            'projected_values', """SELECT * FROM projected_values"""
             )
-        return projected_values
 
     @property
     def curve_lookup(self):
@@ -0,0 +1,218 @@
+import credit_calc as calc
+from models import set_worker_executable
+from scoring import CurveTable, WeightTable
+from collections import OrderedDict
+import multiprocessing
+import numpy as np
+import pandas as pd
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8, e.g. ArcMap
+    shared_memory = None
+
+
+# Project tables in each worker, set by init_worker
+_worker = {}
+
+
+class SharedArrays:
+    '''
+    Places numpy arrays in shared memory once, so worker processes can use
+    them without each unpickling a copy. Where shared memory is not
+    available the arrays are pickled to each worker once, when it starts.
+    '''
+    def __init__(self, arrays):
+        '''
+        :param arrays: dict of numpy arrays, numeric dtypes only
+        '''
+        self.blocks = []
+        self.handles = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if shared_memory is None:
+                self.handles[name] = array
+                continue
+            block = shared_memory.SharedMemory(create=True,
+                                               size=max(array.nbytes, 1))
+            shared = np.ndarray(array.shape, dtype=array.dtype,
+                                buffer=block.buf)
+            shared[...] = array
+            self.blocks.append(block)
+            self.handles[name] = (block.name, array.shape, array.dtype.str)
+
+    def release(self):
+        '''Frees the shared memory, call once the workers are done'''
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_arrays(handles):
+    '''
+    Returns a dict of the arrays in SharedArrays.handles, backed by the
+    shared memory, and the list of shared memory blocks to keep open while
+    the arrays are used.
+    '''
+    arrays = {}
+    blocks = []
+    for name, handle in handles.items():
+        if isinstance(handle, np.ndarray):
+            arrays[name] = handle
+            continue
+        block_name, shape, dtype = handle
+        block = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        blocks.append(block)
+    return arrays, blocks
+
+
+class WorkerProject:
+    '''
+    Stands in for CreditData in a worker process, with the tables used to
+    score site-scale values and calculate credits. Tables are returned as
+    copies, as they are by CreditData.
+    '''
+    def __init__(self, tables, site_scale_values, curve_table, weight_table,
+                 curve_lookup, policy_context):
+        self.tables = tables
+        self._site_scale_values = site_scale_values
+        self.curve_table = curve_table
+        self.weight_table = weight_table
+        self.curve_lookup = curve_lookup
+        self.policy_context = policy_context
+
+    @property
+    def site_scale_values(self):
+        return self._site_scale_values.copy()
+
+    @property
+    def desktop_results(self):
+        return self.tables['desktop_results'].copy()
+
+    @property
+    def projected_ls(self):
+        return self.tables['projected_ls'].copy()
+
+
+
+def init_worker(handles, context):
+    '''
+    Pool initializer. Attaches the shared arrays and rebuilds the project
+    tables around them once per worker.
+    :param handles: SharedArrays.handles
+    :param context: dict of the labels and small tables that are not shared
+    '''
+    arrays, blocks = attach_arrays(handles)
+
+    # site-scale values, numeric columns are read from shared memory
+    columns = OrderedDict()
+    for column in context['site_columns']:
+        if 'site.' + column in arrays:
+            columns[column] = arrays['site.' + column]
+        else:
+            columns[column] = context['site_objects'][column]
+    site_scale_values = pd.DataFrame(columns, columns=context['site_columns'])
+
+    curve_table = CurveTable.from_arrays(
+        {'values': arrays['curves']}, context['curve_labels'])
+    weight_table = WeightTable.from_arrays(
+        {'attr_weights': arrays['attr_weights'],
+         'func_weights': arrays['func_weights']},
+        context['weight_labels'])
+
+    _worker['blocks'] = blocks
+    _worker['project'] = WorkerProject(
+        context['tables'], site_scale_values, curve_table, weight_table,
+        context['curve_lookup'], context['policy_context'])
+    _worker['current_facres'] = context['current_facres']
+
+
+def calc_variant_credits(task):
+    '''
+    Worker for a single scenario variant. Projects, scores and calculates
+    f-acres and credits for one set of projected values.
+    :param task: tuple of (position, projected_values)
+    '''
+    position, projected_values = task
+    project = _worker['project']
+    desktop_results = project.desktop_results
+
+    projected_site_scale = calc.project_site_scale(
+        projected_values, project.site_scale_values)
+    projected_scores = calc.score_site_scale(project, projected_site_scale)
+    projected_facres = calc.calc_facres(desktop_results, projected_scores,
+                                        project.projected_ls)
+    projected_credits = calc.calc_credits(project, desktop_results,
+                                          _worker['current_facres'],
+                                          projected_facres)
+
+    return position, projected_credits
+
+
+def calc_parallel_credits(project, names, projected_values_list,
+                          current_facres, processes):
+    '''
+    Calculates credits for each set of projected values in a pool of worker
+    processes. The site-scale values, scoring curves and scoring weights are
+    placed in shared memory once for all workers. Returns an OrderedDict of
+    credit reports keyed by name, in the order of names.
+    :param project: an instance of the CreditData class.
+    :param names: name of each set of projected values
+    :param projected_values_list: list of projected_values in tidy form with
+    columns ['map_unit_id', 'hab_attr', and 'attr_value']
+    :param current_facres: the f-acre report to compare to
+    :param processes: number of worker processes
+    '''
+    site_scale_values = project.site_scale_values
+    curve_arrays, curve_labels = project.curve_table.arrays()
+    weight_arrays, weight_labels = project.weight_table.arrays()
+
+    # numeric columns are shared, text columns are sent with the context
+    arrays = {
+        'curves': curve_arrays['values'],
+        'attr_weights': weight_arrays['attr_weights'],
+        'func_weights': weight_arrays['func_weights']
+    }
+    site_objects = {}
+    for column in site_scale_values.columns:
+        values = site_scale_values[column].values
+        if values.dtype.kind in 'biuf':
+            arrays['site.' + column] = values
+        else:
+            site_objects[column] = values
+
+    context = {
+        'site_columns': list(site_scale_values.columns),
+        'site_objects': site_objects,
+        'curve_labels': curve_labels,
+        'weight_labels': weight_labels,
+        'curve_lookup': project.curve_lookup,
+        'current_facres': current_facres,
+        'policy_context': project.policy_context,
+        'tables': {
+            'desktop_results': project.desktop_results,
+            'projected_ls': project.projected_ls
+        }
+    }
+
+    set_worker_executable()
+    shared = SharedArrays(arrays)
+    try:
+        pool = multiprocessing.Pool(processes, init_worker,
+                                    (shared.handles, context))
+        try:
+            results = pool.map(calc_variant_credits,
+                               list(enumerate(projected_values_list)))
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shared.release()
+
+    # results come back in task order, key them in the order of names
+    credit_reports = OrderedDict()
+    for position, projected_credits in sorted(results, key=lambda r: r[0]):
+        credit_reports[names[position]] = projected_credits
+
+    return credit_reports
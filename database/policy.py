@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+
+SEASONS = ['breed', 'summer', 'winter']
+
+MGMT_CATS = ['PHMA', 'GHMA', 'OHMA']
+
+# Tables the policy context of a project is compiled from
+POLICY_TABLES = ['desktop_results', 'multipliers_policy', 'standard_values',
+                 'reserve_account', 'standard_baseline']
+
+
+def mgmt_multipliers(desktop_results, multipliers_policy):
+    """
+    Returns the management multiplier of each map unit of desktop_results,
+    the average of the multipliers of its management categories weighted
+    by their proportions.
+    """
+    weighted = pd.DataFrame(index=desktop_results.index)
+    for mgmt_cat in MGMT_CATS:
+        col_name = mgmt_cat.lower()
+        filt = multipliers_policy['mgmt_cat'] == mgmt_cat
+        weighted[col_name] = (
+            desktop_results[col_name].values
+            * multipliers_policy.loc[filt, 'multiplier'].values
+        )
+    return weighted.sum(axis=1).values
+
+
+class ProjectPolicyContext(object):
+    """
+    Policy values of a project aligned to the map units of desktop_results:
+    the management and meadow multipliers, the reserve account contribution
+    and the standard baseline of each map unit. Computed once per project
+    (CreditData.policy_context) and reused by every credit calculation.
+    """
+    def __init__(self, desktop_results, multipliers_policy, standard_values,
+                 reserve_account, standard_baseline):
+        """
+        :param desktop_results, multipliers_policy, standard_values,
+        reserve_account, standard_baseline: the tables read from the
+        database (CreditData)
+        """
+        self.map_unit_ids = desktop_results['map_unit_id'].values
+        self.index = pd.Index(self.map_unit_ids)
+
+        self.mgmt_multiplier = mgmt_multipliers(desktop_results,
+                                                multipliers_policy)
+
+        # meadow multiplier, 0 if not meadow
+        standard_values = standard_values.set_index('variable')
+        self.meadow_value = (
+            standard_values.at['meadow_multiplier', 'standard_value']
+        )
+        self.meadow_multiplier = np.where(
+            desktop_results['meadow'].values == 'No Meadow', 0,
+            self.meadow_value)
+
+        # map units without a reserve account get no credits
+        reserve_account = reserve_account.set_index('map_unit_id')
+        self.in_reserve = self.index.isin(reserve_account.index)
+        self.total_contribution = (
+            reserve_account['total_contribution']
+            .reindex(self.map_unit_ids).values
+        )
+
+        # standard baseline score of each season, NaN where there is none
+        baseline = standard_baseline.pivot(
+            index='map_unit_id', columns='season', values='baseline')
+        self.baseline = OrderedDict(
+            (season, np.asarray(baseline.reindex(self.map_unit_ids)[season],
+                                dtype='float64'))
+            if season in baseline.columns
+            else (season, np.nan + np.zeros(len(self.map_unit_ids)))
+            for season in SEASONS
+            )
+
+    @classmethod
+    def from_project(cls, project):
+        """Returns the policy context of an instance of CreditData"""
+        return cls(project.desktop_results, project.multipliers_policy,
+                   project.standard_values, project.reserve_account,
+                   project.standard_baseline)
+
+    def rows(self, map_unit_ids):
+        """Returns the position of each map unit id, -1 if it is not in
+        desktop_results"""
+        return self.index.get_indexer(map_unit_ids)
+
+    def baseline_scores(self, map_unit_ids):
+        """
+        Returns the standard baseline score of each season as an array over
+        map_unit_ids, NaN where there is none.
+        """
+        # position -1 picks the NaN appended to each season
+        rows = self.rows(map_unit_ids)
+        return OrderedDict(
+            (season, np.append(values, np.nan)[rows])
+            for season, values in self.baseline.items()
+            )
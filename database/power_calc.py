@@ -0,0 +1,125 @@
+import bootstrap_calc as boot
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+def simulate_widths(project, sizes, replicates=500, confidence=0.9,
+                    credit_column='saleable_credits', seed=None,
+                    chunk_size=100):
+    '''
+    Simulates the confidence interval of each map unit's current credits
+    for each candidate number of transects. For every size, transects are
+    drawn with replacement from the surveyed transects of each map unit, so
+    the spread of the surveyed transects stands in for the spread of the
+    map unit. All sizes are resampled and scored together in vectorized
+    chunks. Returns a long-format table with one row per map unit and size.
+    :param project: an instance of the CreditData class.
+    :param sizes: candidate numbers of transects, e.g. range(1, 21)
+    :param replicates: number of bootstrap replicates per size
+    :param confidence: width of the confidence interval, e.g. 0.9 for the
+    5th to 95th percentile
+    :param credit_column: column of the calc_credits report to simulate
+    :param seed: seed for the random numbers, for repeatable results
+    :param chunk_size: number of replicates scored at once, limits memory
+    '''
+    sizes = np.asarray(sorted(set(sizes)), dtype='int64')
+    if len(sizes) == 0 or sizes.min() < 1:
+        raise ValueError('sizes must be one or more counts of at least 1')
+
+    # read from database
+    site_scale_values = project.site_scale_values
+    desktop_results = project.desktop_results
+    current_ls = project.current_ls
+
+    current_credits, baseline_facres = boot.point_estimates(project)
+    data, starts, counts = boot.transect_arrays(project.transect_metrics,
+                                                site_scale_values)
+    random_state = np.random.RandomState(seed)
+
+    # replicates of all sizes along one axis, the size of each row
+    row_sizes = np.repeat(sizes, replicates)
+    results = []
+    for start in range(0, len(row_sizes), chunk_size):
+        chunk_sizes = row_sizes[start:start + chunk_size]
+        draws = random_state.random_sample(
+            (len(chunk_sizes), len(site_scale_values), chunk_sizes.max()))
+        means = boot.resample_means(data, starts, counts, draws,
+                                    chunk_sizes[:, np.newaxis])
+        template, credits = boot.replicate_credits(
+            project, means, site_scale_values, desktop_results, current_ls,
+            baseline_facres, credit_column)
+        results.append(credits)
+    credits = np.concatenate(results)
+
+    # percentiles of each size and map unit, size x template row
+    tail = 100 * (1 - confidence) / 2
+    n_rows = credits.shape[1]
+    by_size = credits.reshape(len(sizes), replicates, n_rows)
+    by_size = by_size.transpose(1, 0, 2).reshape(replicates, -1)
+    lower, upper = boot.nan_percentiles(by_size, [tail, 100 - tail])
+
+    surveyed = pd.Series(counts, index=site_scale_values['map_unit_id'])
+    widths = OrderedDict()
+    widths['map_unit_id'] = np.tile(template['map_unit_id'].values,
+                                    len(sizes))
+    widths['map_unit_name'] = np.tile(template['map_unit_name'].values,
+                                      len(sizes))
+    widths['no_transects'] = surveyed.reindex(widths['map_unit_id']).values
+    widths['transects'] = np.repeat(sizes, n_rows)
+    widths['lower'] = lower
+    widths['upper'] = upper
+    widths['width'] = upper - lower
+    return pd.DataFrame(widths, columns=list(widths.keys()))
+
+
+def recommend_transects(project, target_width, sizes=range(1, 21),
+                        replicates=500, confidence=0.9,
+                        credit_column='saleable_credits', seed=None,
+                        chunk_size=100):
+    '''
+    Recommends the number of transects for each map unit: the smallest
+    candidate size from which the simulated confidence interval of current
+    credits is no wider than target_width at that and every larger size
+    (so a lucky narrow interval is not recommended). Returns the
+    recommendation of each map unit, NaN where no candidate size is
+    enough, and the simulated widths from simulate_widths.
+    Map units with a single surveyed transect show no spread and should be
+    surveyed further before relying on their recommendation.
+    :param project: an instance of the CreditData class.
+    :param target_width: widest acceptable confidence interval, in credits
+    :param sizes: candidate numbers of transects
+    :param replicates, confidence, credit_column, seed, chunk_size: see
+    simulate_widths
+    '''
+    widths = simulate_widths(project, sizes, replicates, confidence,
+                             credit_column, seed, chunk_size)
+
+    table = widths.pivot_table(index='map_unit_id', columns='transects',
+                               values='width', aggfunc='first',
+                               dropna=False)
+    # sizes where this and every larger size meet the target
+    with np.errstate(invalid='ignore'):
+        met = np.asarray(table.values <= target_width)
+    met = np.cumprod(met[:, ::-1], axis=1)[:, ::-1].astype(bool)
+    sizes = table.columns.values
+    recommended = np.where(met.any(axis=1), sizes[met.argmax(axis=1)],
+                           np.nan)
+
+    recommendations = (
+        widths[['map_unit_id', 'map_unit_name', 'no_transects']]
+        .drop_duplicates('map_unit_id')
+        .reset_index(drop=True)
+    )
+    recommendations['recommended_transects'] = pd.Series(
+        recommended, index=table.index).reindex(
+            recommendations['map_unit_id']).values
+    with_size = widths.set_index(['map_unit_id', 'transects'])['width']
+    recommendations['width'] = [
+        with_size.get((map_unit_id, size), np.nan)
+        if not np.isnan(size) else np.nan
+        for map_unit_id, size in zip(recommendations['map_unit_id'],
+                                     recommendations['recommended_transects'])
+        ]
+
+    return recommendations, widths
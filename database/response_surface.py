@@ -0,0 +1,198 @@
+import credit_calc as calc
+import batch_calc as batch
+from math import floor, isnan
+import numpy as np
+import pandas as pd
+
+
+# Multiplier applied to each habitat attribute before it is looked up on its
+# scoring curves (see credit_calc.score_arrays)
+ATTR_SCALES = {
+    'sage_cover': 100,
+    'sage_height': 1,
+    'shrub_cover': 100,
+    'forb_cover': 100,
+    'forb_rich': 1,
+    'grass_cover': 100,
+    'brotec_cover': 100
+}
+
+# Attributes that also set the breeding trigger, and the attribute each is
+# added to
+TRIGGER_ATTRS = {
+    'shrub_cover': 'grass_cover',
+    'grass_cover': 'shrub_cover'
+}
+
+
+class ResponseSurface:
+    '''
+    Precomputed credits of each map unit across the whole domain of a
+    habitat attribute, holding the other attributes at their current values.
+    Scoring curves are step functions over integer attr_value, so credits
+    only change where the curve row floor(value * scale) changes, and, for
+    shrub and grass cover, where the breeding trigger changes. One outcome
+    is calculated per curve row (and per trigger state for shrub and grass
+    cover) plus one for a missing value, so any proposed value is answered
+    with a lookup.
+    '''
+    def __init__(self, project, hab_attrs=None, local_scale=None,
+                 credit_column='saleable_credits', chunk_size=128):
+        '''
+        :param project: an instance of the CreditData class.
+        :param hab_attrs: habitat attributes to build surfaces for, all of
+        batch_calc.HAB_ATTRS if None
+        :param local_scale: local-scale table to use with the proposed
+        values, current_ls if None so that credits come from the site-scale
+        change alone
+        :param credit_column: column of the calc_credits report to tabulate
+        :param chunk_size: number of attribute values scored at once
+        '''
+        if hab_attrs is None:
+            hab_attrs = batch.HAB_ATTRS
+
+        # read from database
+        site_scale_values = project.site_scale_values
+        desktop_results = project.desktop_results
+        current_ls = project.current_ls
+        if local_scale is None:
+            local_scale = current_ls
+        curve_table = project.curve_table
+
+        # Get current facres report to compare proposed values with
+        current_site_scale = calc.score_site_scale(project, site_scale_values)
+        current_facres = calc.calc_facres(desktop_results, current_site_scale,
+                                          current_ls)
+
+        current = np.asarray(site_scale_values[batch.HAB_ATTRS],
+                             dtype='float64')
+
+        def batch_credits(projected, trigger=None):
+            # credits of a batch of projected values, batch x template rows
+            present = np.ones(projected.shape[:2], dtype=bool)
+            scores = batch.score_batch(project, projected, present,
+                                       site_scale_values, trigger)
+            facres = batch.facres_batch(desktop_results, site_scale_values,
+                                        scores, local_scale)
+            template, credits = batch.credit_arrays(
+                project, desktop_results, current_facres, facres)
+            return template, credits[credit_column]
+
+        def outcomes(hab_attr, samples, trigger=None):
+            # credits with hab_attr at each sample, map unit x sample
+            i = batch.HAB_ATTRS.index(hab_attr)
+            results = []
+            for start in range(0, len(samples), chunk_size):
+                chunk = samples[start:start + chunk_size]
+                projected = np.tile(current, (len(chunk), 1, 1))
+                projected[:, :, i] = chunk[:, np.newaxis]
+                results.append(batch_credits(projected, trigger)[1])
+            return np.concatenate(results).T
+
+        self.start = curve_table.start
+        self.stop = curve_table.stop
+        # a value that falls on each curve row, and a missing value last
+        rows = np.arange(self.start, self.stop + 1, dtype='float64')
+        self.missing = len(rows)
+
+        self.surfaces = {}
+        for hab_attr in hab_attrs:
+            samples = np.append((rows + 0.5) / ATTR_SCALES[hab_attr], np.nan)
+            if hab_attr in TRIGGER_ATTRS:
+                # one layer with the breeding trigger off and one with it on
+                layers = [outcomes(hab_attr, samples, trigger)
+                          for trigger in [False, True]]
+            else:
+                layers = [outcomes(hab_attr, samples)]
+            self.surfaces[hab_attr] = np.array(layers)
+
+        # credits at current values, to report changes from
+        template, baseline = batch_credits(current[np.newaxis])
+        self.baseline = baseline[0]
+
+        self.map_unit_ids = template['map_unit_id'].values
+        self.units = dict(
+            (map_unit_id, unit) for unit, map_unit_id
+            in enumerate(self.map_unit_ids)
+            )
+        # current values of each map unit, used for the breeding trigger
+        site = site_scale_values.set_index('map_unit_id')
+        self.current = {}
+        for hab_attr in TRIGGER_ATTRS:
+            self.current[hab_attr] = np.asarray(
+                site[hab_attr].reindex(self.map_unit_ids), dtype='float64')
+
+    def _column(self, hab_attr, value):
+        # curve row of a value, clipped as CurveTable.rows does
+        if value is None or isnan(value):
+            return self.missing
+        row = int(floor(value * ATTR_SCALES[hab_attr]))
+        return min(max(row, self.start), self.stop) - self.start
+
+    def _layer(self, hab_attr, unit, value):
+        # breeding trigger of a proposed shrub or grass cover value
+        if hab_attr not in TRIGGER_ATTRS:
+            return 0
+        other = self.current[TRIGGER_ATTRS[hab_attr]][unit]
+        value = 0 if value is None or isnan(value) else value
+        other = 0 if isnan(other) else other
+        return int(value + other > calc.BREEDING_TRIGGER)
+
+    def credits(self, map_unit_id, hab_attr, value):
+        '''
+        Returns the credits of a map unit with hab_attr at a proposed value
+        and the other attributes at their current values.
+        :param map_unit_id: map unit to look up
+        :param hab_attr: habitat attribute, e.g. 'brotec_cover'
+        :param value: proposed value, as in site_scale_values (e.g. 0.15
+        for 15 percent cover); None or NaN for a missing value
+        '''
+        unit = self.units[map_unit_id]
+        return self.surfaces[hab_attr][
+            self._layer(hab_attr, unit, value), unit,
+            self._column(hab_attr, value)
+            ]
+
+    def delta(self, map_unit_id, hab_attr, value):
+        '''
+        Returns the change in credits of a map unit from its current values
+        if hab_attr is changed to a proposed value.
+        :param map_unit_id: map unit to look up
+        :param hab_attr: habitat attribute, e.g. 'brotec_cover'
+        :param value: proposed value, as in site_scale_values
+        '''
+        return (self.credits(map_unit_id, hab_attr, value)
+                - self.baseline[self.units[map_unit_id]])
+
+    def deltas(self, hab_attr, values):
+        '''
+        Returns the change in credits of every map unit (in the order of
+        map_unit_ids) for proposed values of hab_attr.
+        :param hab_attr: habitat attribute, e.g. 'brotec_cover'
+        :param values: proposed value of each map unit, or one value for
+        all map units
+        '''
+        n_units = len(self.map_unit_ids)
+        values = np.asarray(values, dtype='float64') + np.zeros(n_units)
+        missing = np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            rows = np.floor(
+                np.where(missing, self.start, values)
+                * ATTR_SCALES[hab_attr]
+                )
+        columns = np.clip(rows, self.start, self.stop).astype('int64')
+        columns = np.where(missing, self.missing, columns - self.start)
+
+        if hab_attr in TRIGGER_ATTRS:
+            other = self.current[TRIGGER_ATTRS[hab_attr]]
+            layers = (
+                np.where(missing, 0, values)
+                + np.where(np.isnan(other), 0, other)
+            ) > calc.BREEDING_TRIGGER
+            layers = layers.astype('int64')
+        else:
+            layers = np.zeros(n_units, dtype='int64')
+
+        units = np.arange(n_units)
+        return (self.surfaces[hab_attr][layers, units, columns]
+                - self.baseline)
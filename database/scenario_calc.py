@@ -1,6 +1,10 @@
 import credit_calc as calc
+import batch_calc as batch
+import parallel_calc as parallel
 from models import CreditData
+from collections import OrderedDict
 import os
+import numpy as np
 import pandas as pd
 
 
@@ -12,57 +16,131 @@ def apply_improvement(value, factor, lower_bound=None, upper_bound=None):
     return improved
 
 
-def run_scenario(site_scale_values_indexed, improvements):
+def improve_values(values, factor, lower_bound, upper_bound):
     '''
-    returns dict of projected_values as tidy dataframes for each effort level.
+    Returns values multiplied by factor and bounded as apply_improvement 
+    does, for numpy arrays that broadcast together. NaN bounds are no bound.
+    '''
+    improved = values * factor
+    with np.errstate(invalid='ignore'):
+        improved = np.where(improved >= upper_bound, upper_bound, improved)
+        improved = np.where(improved <= lower_bound, lower_bound, improved)
+    return improved
+
+
+def improved_arrays(site_scale_values_indexed, improvements):
+    '''
+    Returns the effort levels (in the order they first appear), the habitat
+    attributes improved and an effort x map unit x attribute array of the 
+    improved values, every effort level of every attribute computed in one
+    broadcast. Attributes that are not site-scale values are left out, and
+    effort levels not defined for an attribute leave its values unchanged.
+    :param site_scale_values_indexed, improvements: see run_scenario
+    '''
+    hab_attrs = [hab_attr for hab_attr in improvements.keys()
+                 if hab_attr in site_scale_values_indexed.columns]
+    efforts = []
+    for levels in improvements.values():
+        for effort in levels.keys():
+            if effort not in efforts:
+                efforts.append(effort)
+
+    # factor and bounds of each effort level and attribute
+    factor = np.ones((len(efforts), len(hab_attrs)))
+    lower_bound = np.empty(factor.shape)
+    lower_bound.fill(np.nan)
+    upper_bound = lower_bound.copy()
+    for i, hab_attr in enumerate(hab_attrs):
+        for effort, level in improvements[hab_attr].items():
+            e = efforts.index(effort)
+            factor[e, i] = level[0]
+            if level[1] is not None:
+                lower_bound[e, i] = level[1]
+            if level[2] is not None:
+                upper_bound[e, i] = level[2]
+
+    current = np.asarray(site_scale_values_indexed[hab_attrs], 
+                         dtype='float64')
+    improved = improve_values(current, factor[:, np.newaxis], 
+                              lower_bound[:, np.newaxis],
+                              upper_bound[:, np.newaxis])
+    return efforts, hab_attrs, improved
+
+
+def scenario_tensor(site_scale_values_indexed, improvements):
+    '''
+    Returns the effort levels and an effort x map unit x attribute array of
+    the site-scale values of each effort level (attributes in 
+    batch_calc.HAB_ATTRS order), ready for batch_calc.calc_projected_credits.
+    :param site_scale_values_indexed, improvements: see run_scenario
+    '''
+    efforts, hab_attrs, improved = improved_arrays(site_scale_values_indexed,
+                                                   improvements)
+    current = np.asarray(site_scale_values_indexed[batch.HAB_ATTRS], 
+                         dtype='float64')
+    projected = np.tile(current, (len(efforts), 1, 1))
+
+    # attributes that are not projected (e.g., dist_sage) are not scored
+    # from projected values
+    improved_attrs = [i for i, hab_attr in enumerate(hab_attrs)
+                      if hab_attr in batch.HAB_ATTRS]
+    columns = [batch.HAB_ATTRS.index(hab_attrs[i]) for i in improved_attrs]
+    projected[:, :, columns] = improved[:, :, improved_attrs]
+
+    return efforts, projected
+
+
+def run_scenario(site_scale_values_indexed, improvements, tidy=False):
+    '''
+    returns the effort levels and the effort x map unit x attribute array of
+    site-scale values from scenario_tensor, or if tidy, dict of 
+    projected_values as tidy dataframes for each effort level.
     :param site_scale_values_indexed: site-scale values read from the database 
     (excludes seasonal duplication) where the index is 'map_unit_id'.
     :param improvements: a dictionary of dictionaries, specifying the factor to multiply
     each current value by, with a lower and upper bound as a tuple, for low, med, and 
     high efforts.
+    :param tidy: if True, return projected values in tidy form
     '''
-    # Set up empty dict for storing outcomes
-    outcomes = {}
-
-    projected = site_scale_values_indexed.drop(site_scale_values_indexed.columns, axis=1)
-
-    for hab_attr in improvements.keys():
-        filt = site_scale_values_indexed.columns.str.endswith(hab_attr)
-        if filt.sum() > 0:
-            df = site_scale_values_indexed.loc[:, filt].copy()
-            for effort, level in improvements[hab_attr].items():
-                result = df.apply(apply_improvement, factor=level[0], 
-                                  lower_bound=level[1], upper_bound=level[2])
-                result.columns = [hab_attr + '_' + effort]
-                projected = projected.join(result)
-    
-    # melt each effort level and append to outcomes
-    for effort in improvements[hab_attr].keys():
-        filt = projected.columns.str.endswith(effort)
-        df = projected.loc[:, filt].copy()
-        # remove effort from column name
-        df.columns = [col_name[0] for col_name in df.columns.str.split('_' + effort)]
-        melted = pd.melt(df.reset_index(), 
-                         id_vars = 'map_unit_id', 
-                         var_name='hab_attr')
-        outcomes[effort] = melted        
+    if not tidy:
+        return scenario_tensor(site_scale_values_indexed, improvements)
+
+    efforts, hab_attrs, improved = improved_arrays(site_scale_values_indexed,
+                                                   improvements)
+    map_unit_ids = site_scale_values_indexed.index.values
+    
+    # melt each effort level, attributes in the order of improvements
+    outcomes = OrderedDict()
+    for e, effort in enumerate(efforts):
+        attrs = [i for i, hab_attr in enumerate(hab_attrs) 
+                 if effort in improvements[hab_attr]]
+        melted = OrderedDict()
+        melted['map_unit_id'] = np.tile(map_unit_ids, len(attrs))
+        melted['hab_attr'] = np.repeat(
+            np.array(hab_attrs, dtype=object)[attrs], len(map_unit_ids))
+        melted['value'] = improved[e][:, attrs].T.ravel()
+        outcomes[effort] = pd.DataFrame(melted, columns=list(melted.keys()))
         
     return outcomes
 
 
-def run_base_scenarios(site_scale_values_indexed):
+def run_base_scenarios(site_scale_values_indexed, tidy=False):
     '''
     defines and runs base scenarios (brotec, forb_grass, shrub), returns nested dict of
     scenarios and levels of effort
     :param site_scale_values_indexed: site-scale values read from the database 
     (excludes seasonal duplication) where the index is 'map_unit_id'.
+    :param tidy: if True, each scenario is a dict of tidy projected_values 
+    per effort level, otherwise the effort levels and scenario tensor (see
+    run_scenario)
     '''
-    scenarios = {}
+    scenarios = OrderedDict()
     # Create brotec scenario
     improvements = {
         'brotec_cover': {'low': (0.5, 0, 1), 'med': (0.25, 0, 1), 'high': (0.1, 0, 1)}
     }
-    brotec_scenario = run_scenario(site_scale_values_indexed, improvements)
+    brotec_scenario = run_scenario(site_scale_values_indexed, improvements, 
+                                   tidy)
     scenarios['brotec'] = brotec_scenario
     
     # Create forb and grass scenario
@@ -71,7 +149,8 @@ def run_base_scenarios(site_scale_values_indexed):
         'forb_rich': {'low': (1, 0, None), 'med': (2, 0, None), 'high': (3, 0, None)},
         'grass_cover': {'low': (1.1, 0, 1), 'med': (1.25, 0, 1), 'high': (1.5, 0, 1)}
     }
-    forb_grass_scenario = run_scenario(site_scale_values_indexed, improvements)
+    forb_grass_scenario = run_scenario(site_scale_values_indexed, 
+                                       improvements, tidy)
     scenarios['forb_grass'] = forb_grass_scenario
     
     # Create shrub scenario
@@ -79,46 +158,57 @@ def run_base_scenarios(site_scale_values_indexed):
         'sage_cover': {'low': (1.1, 0, 1), 'med': (1.2, 0, 1), 'high': (1.3, 0, 1)},
         'shrub_cover': {'low': (1.1, 0, 1), 'med': (1.2, 0, 1), 'high': (1.3, 0, 1)}
     }
-    shrub_scenario = run_scenario(site_scale_values_indexed, improvements)
+    shrub_scenario = run_scenario(site_scale_values_indexed, improvements, 
+                                  tidy)
     scenarios['shrub'] = shrub_scenario
     
     return scenarios
 
 
-def calc_scenario_credits(scenarios, project, current_facres):
+def calc_scenario_credits(scenarios, project, current_facres, processes=None):
     '''
     calculate functional acres report for each scenario and compares to current
     functional acres report to calculate credits.
     :param scenarios: nested dict of scenarios and levels of effort, generated by
-    run_base_scenarios()
+    run_base_scenarios(), as scenario tensors with map units in the order of 
+    the project's site_scale_values
     :param project: an instance of the CreditData class.
     :param current_facres: the current_facres report to compare scenarios for the 
     purpose of calculating credits.
+    :param processes: number of worker processes to calculate scenarios in, 
+    None or 1 to calculate all scenarios in one vectorized pass
     '''
-    desktop_results = project.desktop_results
-    site_scale_values = project.site_scale_values
-    projected_ls = project.projected_ls
-    credit_reports = {}
+    # Stack every scenario and effort level and calculate credits for all of 
+    # them in one vectorized pass
+    names = []
+    tensors = []
+    for scenario_name, (efforts, projected) in scenarios.items():
+        names.extend(scenario_name + '_' + effort for effort in efforts)
+        tensors.append(projected)
+    projected = np.concatenate(tensors)
     
-    for scenario_name, scenario_results in scenarios.items():
-        for effort, projected_values in scenario_results.items():
-            # Project site-scale values
-            projected_site_scale = calc.project_site_scale(projected_values, 
-                                                           site_scale_values)
-            
-            # Score projected site-scale values
-            projected_scores = calc.score_site_scale(project, projected_site_scale)
-            
-            # Create projected functional acre report
-            projected_facres = calc.calc_facres(desktop_results, projected_scores, 
-                                                projected_ls)
-            
-            # Calculate projected credits
-            projected_credits = calc.calc_credits(project, desktop_results, current_facres, 
-                                                  projected_facres)
-            
-            # Append scenario name and dataframe to credit_reports dictionary
-            credit_reports[scenario_name + '_' + effort] = projected_credits
+    if processes and processes > 1:
+        # workers project tidy values, one set per scenario and effort level
+        site_scale_values = project.site_scale_values
+        n_units = len(site_scale_values)
+        projected_values_list = [
+            pd.DataFrame(OrderedDict([
+                ('map_unit_id', np.tile(site_scale_values['map_unit_id'].values,
+                                        len(batch.HAB_ATTRS))),
+                ('hab_attr', np.repeat(batch.HAB_ATTRS, n_units)),
+                ('value', values.T.ravel())
+            ]))
+            for values in projected
+            ]
+        credit_reports = parallel.calc_parallel_credits(project, names, 
+                                                        projected_values_list,
+                                                        current_facres, 
+                                                        processes)
+    else:
+        present = np.ones(projected.shape[:2], dtype=bool)
+        credit_reports = batch.calc_projected_credits(project, names, 
+                                                      projected, present,
+                                                      current_facres)
     
     return credit_reports
 
@@ -147,33 +237,34 @@ def calc_conifer_credits(project, current_site_scale, current_facres):
     return conifer_credits
 
 
-def run_scenario_report(project, save_interims=False):
+def run_scenario_report(project, save_interims=False, processes=None):
     '''
     returns dataframe with saleable credits per scenario. 
-    :param project: an instance of the CreditData class.
+    :param project: an instance of the CreditData class, or a 
+    credit_calc.ProjectSession to reuse its current state.
     :param save_interims: if True, the full credit report for each scenario 
-    and for the conifer scenario is saved as a csv.'''
+    and for the conifer scenario is saved as a csv.
+    :param processes: number of worker processes to calculate scenarios in, 
+    None or 1 to calculate all scenarios in one vectorized pass'''
+    session = calc.project_session(project)
+    
     # read from database
-    site_scale_values = project.site_scale_values
-    current_ls = project.current_ls
-    desktop_results = project.desktop_results
+    site_scale_values = session.site_scale_values
     
     # set index of site_scale values for use in run_scenario
     site_scale_values_indexed = site_scale_values.set_index('map_unit_id')
     
-    # Get current facres report to streamline comparison with scenarios
-    # Score current site-scale values
-    current_site_scale = calc.score_site_scale(project, site_scale_values)
-    
-    # Create current functional acre report
-    current_facres = calc.calc_facres(desktop_results, current_site_scale, 
-                                      current_ls)
+    # Get current scores and facres report to streamline comparison with 
+    # scenarios, computed once per session
+    current_site_scale = session.current_site_scale
+    current_facres = session.current_facres
     
     # Run scenarios
     scenarios = run_base_scenarios(site_scale_values_indexed)
     
     # Calculate credits for each scenario 
-    credit_reports = calc_scenario_credits(scenarios, project, current_facres)
+    credit_reports = calc_scenario_credits(scenarios, session, current_facres,
+                                           processes)
     
     # Compile saleable_credits for each scenario into a single dataframe
     list_of_credit_reports = list(credit_reports.items())  # make list to maintain order
@@ -190,7 +281,7 @@ def run_scenario_report(project, save_interims=False):
                                    suffixes=(False, False))
     
     # Calculate credits from conifer alone    
-    conifer_credits = calc_conifer_credits(project, current_site_scale, current_facres)
+    conifer_credits = calc_conifer_credits(session, current_site_scale, current_facres)
     
     # Append to scenario report
     conifer_report = conifer_credits[['map_unit_id', 'saleable_credits']].copy()
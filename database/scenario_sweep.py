@@ -0,0 +1,213 @@
+import credit_calc as calc
+import batch_calc as batch
+import scenario_calc as scen
+from collections import OrderedDict
+import csv
+import itertools
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+# Effort level of a scenario that is not applied
+NO_EFFORT = 'none'
+
+
+def load_scenario_spec(spec_file):
+    '''
+    Reads scenario definitions from a JSON or CSV file. Returns an
+    OrderedDict of scenarios, each an OrderedDict of habitat attributes,
+    each an OrderedDict of effort levels with (factor, lower_bound,
+    upper_bound), the same form as the improvements passed to
+    scenario_calc.run_scenario.
+
+    JSON: {"brotec": {"brotec_cover": {"low": [0.5, 0, 1], ...}}, ...}
+    CSV: one row per scenario, hab_attr and effort with columns scenario,
+    hab_attr, effort, factor, lower_bound and upper_bound. Leave a bound
+    empty (or null in JSON) for no bound.
+    :param spec_file: path to a .json or .csv file
+    '''
+    spec = OrderedDict()
+    extension = os.path.splitext(spec_file)[1].lower()
+    if extension == '.json':
+        with open(spec_file, 'r') as f:
+            scenarios = json.load(f, object_pairs_hook=OrderedDict)
+        for scenario, hab_attrs in scenarios.items():
+            spec[scenario] = OrderedDict()
+            for hab_attr, efforts in hab_attrs.items():
+                spec[scenario][hab_attr] = OrderedDict(
+                    (effort, tuple(level)) for effort, level in efforts.items()
+                    )
+    elif extension == '.csv':
+        def bound(value):
+            return float(value) if value.strip() else None
+        with open(spec_file, 'r') as f:
+            for row in csv.DictReader(f):
+                hab_attrs = spec.setdefault(row['scenario'], OrderedDict())
+                efforts = hab_attrs.setdefault(row['hab_attr'], OrderedDict())
+                efforts[row['effort']] = (float(row['factor']),
+                                          bound(row['lower_bound']),
+                                          bound(row['upper_bound']))
+    else:
+        raise ValueError(
+            'scenario spec must be a .json or .csv file: ' + spec_file
+            )
+
+    for scenario, hab_attrs in spec.items():
+        for hab_attr, efforts in hab_attrs.items():
+            if hab_attr not in batch.HAB_ATTRS:
+                raise ValueError(
+                    '{} in scenario {} is not one of {}'.format(
+                        hab_attr, scenario, ', '.join(batch.HAB_ATTRS))
+                    )
+            if NO_EFFORT in efforts:
+                raise ValueError(
+                    '{} is reserved for scenarios that are not applied'
+                    .format(NO_EFFORT)
+                    )
+
+    return spec
+
+
+def effort_levels(spec):
+    '''
+    Returns an OrderedDict of the effort levels of each scenario, starting
+    with NO_EFFORT, in the order they first appear in the spec.
+    '''
+    levels = OrderedDict()
+    for scenario, hab_attrs in spec.items():
+        levels[scenario] = [NO_EFFORT]
+        for efforts in hab_attrs.values():
+            for effort in efforts.keys():
+                if effort not in levels[scenario]:
+                    levels[scenario].append(effort)
+    return levels
+
+
+def sweep_projected_values(site_scale_values, spec, combinations):
+    '''
+    Returns a combination x map unit x attribute array of site-scale values
+    with the effort levels of each combination applied. Each scenario
+    multiplies the values of its habitat attributes by the factor of its
+    effort level and bounds them as scenario_calc.improve_values does;
+    scenarios that share an attribute are applied in the order of the spec.
+    :param site_scale_values: the site_scale_values table read from the
+    database.
+    :param spec: scenarios from load_scenario_spec
+    :param combinations: array of effort level indices (from effort_levels),
+    one row per combination and one column per scenario
+    '''
+    current = np.asarray(site_scale_values[batch.HAB_ATTRS], dtype='float64')
+    projected = np.tile(current, (len(combinations), 1, 1))
+    levels = effort_levels(spec)
+
+    for s, (scenario, hab_attrs) in enumerate(spec.items()):
+        choice = combinations[:, s]
+        for hab_attr, efforts in hab_attrs.items():
+            # factor and bounds of each effort level, NO_EFFORT and levels
+            # not defined for this attribute leave the values unchanged
+            factor = np.ones(len(levels[scenario]))
+            lower = np.empty(len(levels[scenario]))
+            lower.fill(np.nan)
+            upper = lower.copy()
+            for effort, (level_factor, lower_bound, upper_bound) in (
+                    efforts.items()):
+                level = levels[scenario].index(effort)
+                factor[level] = level_factor
+                if lower_bound is not None:
+                    lower[level] = lower_bound
+                if upper_bound is not None:
+                    upper[level] = upper_bound
+
+            i = batch.HAB_ATTRS.index(hab_attr)
+            projected[:, :, i] = scen.improve_values(
+                projected[:, :, i], factor[choice][:, np.newaxis],
+                lower[choice][:, np.newaxis], upper[choice][:, np.newaxis])
+
+    return projected
+
+
+def run_scenario_sweep(project, spec, chunk_size=256):
+    '''
+    Calculates saleable credits for every combination of effort levels
+    across the scenarios in spec, where each scenario may also be left out
+    (effort level NO_EFFORT). Combinations are scored in vectorized chunks.
+    Returns a long-format table with one row per combination and map unit,
+    ranked by the total saleable credits of the combination.
+    :param project: an instance of the CreditData class.
+    :param spec: scenarios from load_scenario_spec, or the path to a spec
+    file
+    :param chunk_size: number of combinations scored at once, limits memory
+    '''
+    if not isinstance(spec, dict):
+        spec = load_scenario_spec(spec)
+
+    # read from database
+    site_scale_values = project.site_scale_values
+    desktop_results = project.desktop_results
+    current_ls = project.current_ls
+    projected_ls = project.projected_ls
+
+    # Get current facres report to compare with each combination
+    current_site_scale = calc.score_site_scale(project, site_scale_values)
+    current_facres = calc.calc_facres(desktop_results, current_site_scale,
+                                      current_ls)
+
+    levels = effort_levels(spec)
+    combinations = np.array(
+        list(itertools.product(*[range(len(level))
+                                 for level in levels.values()])),
+        dtype='int64'
+        ).reshape(-1, len(levels))
+
+    saleable_credits = []
+    for start in range(0, len(combinations), chunk_size):
+        chunk = combinations[start:start + chunk_size]
+        projected = sweep_projected_values(site_scale_values, spec, chunk)
+        present = np.ones(projected.shape[:2], dtype=bool)
+        scores = batch.score_batch(project, projected, present,
+                                   site_scale_values)
+        facres = batch.facres_batch(desktop_results, site_scale_values,
+                                    scores, projected_ls)
+        template, credits = batch.credit_arrays(project, desktop_results,
+                                                current_facres, facres)
+        saleable_credits.append(credits['saleable_credits'])
+    saleable_credits = np.concatenate(saleable_credits)
+
+    # name each combination by the scenarios applied
+    names = []
+    for combination in combinations:
+        applied = [
+            scenario + '_' + levels[scenario][level]
+            for scenario, level in zip(levels.keys(), combination)
+            if level > 0
+            ]
+        names.append('+'.join(applied) if applied else NO_EFFORT)
+
+    # long-format table, one row per combination and map unit
+    n_units = len(template)
+    sweep = OrderedDict()
+    sweep['combination'] = np.repeat(names, n_units)
+    for s, (scenario, scenario_levels) in enumerate(levels.items()):
+        sweep[scenario] = np.repeat(
+            np.array(scenario_levels, dtype=object)[combinations[:, s]],
+            n_units
+            )
+    sweep['map_unit_id'] = np.tile(template['map_unit_id'].values,
+                                   len(combinations))
+    sweep['map_unit_name'] = np.tile(template['map_unit_name'].values,
+                                     len(combinations))
+    sweep['saleable_credits'] = saleable_credits.ravel()
+    totals = pd.DataFrame(saleable_credits).sum(axis=1).values
+    sweep['total_saleable_credits'] = np.repeat(totals, n_units)
+    sweep = pd.DataFrame(sweep)
+
+    # rank combinations by total saleable credits
+    order = np.argsort(-totals, kind='mergesort')
+    rank = np.empty(len(order), dtype='int64')
+    rank[order] = np.arange(1, len(order) + 1)
+    sweep.insert(0, 'rank', np.repeat(rank, n_units))
+    sweep = sweep.iloc[np.argsort(sweep['rank'].values, kind='mergesort')]
+
+    return sweep.reset_index(drop=True)
@@ -0,0 +1,148 @@
+import numpy as np
+
+
+class CompiledTable(object):
+    """
+    Base for lookup tables held as numpy arrays (named in ARRAYS) plus 
+    labels. The arrays can be placed in shared memory and the table rebuilt
+    around them in another process without copying them.
+    """
+    ARRAYS = []
+
+    def arrays(self):
+        """
+        Returns a dict of the arrays and a dict of the labels of the table,
+        for from_arrays
+        """
+        arrays = dict((name, getattr(self, name)) for name in self.ARRAYS)
+        labels = dict(
+            (name, value) for name, value in self.__dict__.items()
+            if name not in self.ARRAYS
+            )
+        return arrays, labels
+
+    @classmethod
+    def from_arrays(cls, arrays, labels):
+        """
+        Rebuilds a table from the output of arrays(). The arrays are used as
+        they are, e.g. backed by shared memory, and made read-only.
+        """
+        table = cls.__new__(cls)
+        table.__dict__.update(labels)
+        for name in cls.ARRAYS:
+            array = arrays[name]
+            array.flags.writeable = False
+            setattr(table, name, array)
+        return table
+
+
+class CurveTable(CompiledTable):
+    """
+    Compiled copy of the scoring_curves table for scoring whole columns of
+    habitat attribute values at once. The curves are held in one contiguous
+    array with a row per attr_value and a column per curve name.
+    """
+    ARRAYS = ['values']
+
+    def __init__(self, scoring_curves):
+        """
+        :param scoring_curves: scoring curves dataframe indexed by
+        attr_value, one column per curve (CreditData.scoring_curves)
+        """
+        self.start = int(scoring_curves.index.min())
+        self.stop = int(scoring_curves.index.max())
+        # one row per integer attr_value; gaps in the table score as NaN
+        curves = scoring_curves.reindex(range(self.start, self.stop + 1))
+        self.values = np.ascontiguousarray(curves.values, dtype='float64')
+        self.values.flags.writeable = False
+        self.columns = dict(
+            (name, i) for i, name in enumerate(curves.columns)
+            )
+
+    def rows(self, hab_values):
+        """
+        Returns the curve row of each value (floored and clipped to the
+        range of attr_value) and a mask of the values that are NaN.
+        :param hab_values: array-like of habitat attribute values
+        """
+        hab_values = np.asarray(hab_values, dtype='float64')
+        missing = np.isnan(hab_values)
+        rows = np.floor(np.where(missing, self.start, hab_values))
+        rows = np.clip(rows, self.start, self.stop).astype('int64')
+        return rows - self.start, missing
+
+    def score(self, hab_values, curve_name):
+        """
+        Looks up the score of each value on a scoring curve. N/A returns 0.
+        :param hab_values: array-like of habitat attribute values, percents
+        as integers (e.g., 35 percent cover of forb_cover)
+        :param curve_name: name of the scoring curve to use (e.g.,
+        b_sage_cover)
+        :return: numpy array of scores
+        """
+        rows, missing = self.rows(hab_values)
+        scores = self.values[rows, self.columns[curve_name]]
+        scores[missing] = 0
+        return scores
+
+
+class WeightTable(CompiledTable):
+    """
+    Compiled copy of the scoring_weights table. Attribute weights are held 
+    in a dense season x attribute array and function weights (the sum of 
+    the attribute weights of each habitat function) in a dense season x 
+    function array. Combinations not in the table are NaN.
+    """
+    ARRAYS = ['attr_weights', 'func_weights']
+
+    def __init__(self, scoring_weights):
+        """
+        :param scoring_weights: scoring weights dataframe indexed by season
+        and attribute (CreditData.scoring_weights)
+        """
+        weights = scoring_weights.reset_index()  # for pandas v0.16
+        self.seasons = self._positions(weights['season'])
+        self.attributes = self._positions(weights['attribute'])
+        self.functions = self._positions(weights['hab_function'].dropna())
+        
+        self.attr_weights = np.empty((len(self.seasons), len(self.attributes)))
+        self.attr_weights.fill(np.nan)
+        for season, attribute, weight in zip(
+                weights['season'], weights['attribute'], 
+                weights['score_weight']):
+            self.attr_weights[
+                self.seasons[season], self.attributes[attribute]
+                ] = weight
+        
+        self.func_weights = np.empty((len(self.seasons), len(self.functions)))
+        self.func_weights.fill(np.nan)
+        function_weights = (
+            weights.groupby(['season', 'hab_function'])['score_weight'].sum()
+            )
+        for (season, function), weight in zip(
+                function_weights.index, function_weights.values):
+            self.func_weights[
+                self.seasons[season], self.functions[function]
+                ] = weight
+        
+        self.attr_weights.flags.writeable = False
+        self.func_weights.flags.writeable = False
+
+    @staticmethod
+    def _positions(labels):
+        positions = {}
+        for label in labels:
+            positions.setdefault(label, len(positions))
+        return positions
+
+    def attr_weight(self, season, attribute):
+        """Returns the weight of a habitat attribute in a season"""
+        return self.attr_weights[
+            self.seasons[season], self.attributes[attribute]
+            ]
+
+    def func_weight(self, season, hab_function):
+        """Returns the weight of a habitat function in a season"""
+        return self.func_weights[
+            self.seasons[season], self.functions[hab_function]
+            ]
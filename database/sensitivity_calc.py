@@ -0,0 +1,231 @@
+import credit_calc as calc
+import batch_calc as batch
+import bootstrap_calc as boot
+from scoring import WeightTable
+from policy import ProjectPolicyContext, POLICY_TABLES
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+# Site-scale values that can be perturbed, besides batch_calc.HAB_ATTRS
+SITE_ATTRS = batch.HAB_ATTRS + ['dist_sage']
+
+MGMT_CATS = ['PHMA', 'GHMA', 'OHMA']
+
+# Credits closer to 0 than this are float residue, where elasticity is
+# left undefined
+CREDIT_TOLERANCE = 1e-9
+
+
+class PerturbedProject:
+    '''
+    Stands in for CreditData with some tables replaced, e.g. a WeightTable
+    holding a batch of perturbed scoring weights. Other tables are read
+    from the project. The policy context is rebuilt if a table it is
+    compiled from is replaced.
+    '''
+    def __init__(self, project, **tables):
+        self.project = project
+        self.tables = tables
+        if set(tables) & set(POLICY_TABLES) and 'policy_context' not in tables:
+            self.tables['policy_context'] = (
+                ProjectPolicyContext.from_project(self))
+
+    def __getattr__(self, name):
+        if name in self.tables:
+            return self.tables[name]
+        return getattr(self.project, name)
+
+
+def sensitivity_parameters(project, delta=0.1, deltas=None):
+    '''
+    Returns an OrderedDict of the inputs to perturb, each a (kind, key,
+    relative delta) tuple keyed by parameter name. Kinds are 'site' for a
+    site-scale value of every map unit, 'weight' for a scoring weight,
+    'meadow' for the meadow multiplier and 'mgmt' for the multiplier of a
+    management category.
+    :param project: an instance of the CreditData class.
+    :param delta: relative change applied down and up, e.g. 0.1 for 10%
+    :param deltas: optional dict of relative change by parameter name, e.g.
+    {'brotec_cover': 0.2, 'weight:breed:sage_cover': 0.05}; a delta of 0
+    leaves the parameter out
+    '''
+    if deltas is None:
+        deltas = {}
+    parameters = OrderedDict()
+    for hab_attr in SITE_ATTRS:
+        parameters[hab_attr] = ('site', hab_attr)
+    for season, attribute in project.scoring_weights.index:
+        parameters['weight:{}:{}'.format(season, attribute)] = (
+            'weight', (season, attribute))
+    parameters['meadow_multiplier'] = ('meadow', None)
+    for mgmt_cat in MGMT_CATS:
+        parameters['mgmt_multiplier:' + mgmt_cat] = ('mgmt', mgmt_cat)
+
+    unknown = set(deltas) - set(parameters)
+    if unknown:
+        raise ValueError(
+            'unknown parameters: {}'.format(', '.join(sorted(unknown)))
+            )
+
+    return OrderedDict(
+        (name, (kind, key, deltas.get(name, delta)))
+        for name, (kind, key) in parameters.items()
+        if deltas.get(name, delta) != 0
+        )
+
+
+def perturbed_weights(scoring_weights, rows):
+    '''
+    Returns a WeightTable whose weights have trailing batch axes, so that
+    attr_weight and func_weight return one weight per batch row that
+    broadcasts over map units. Function weights are the sums of the
+    perturbed attribute weights.
+    :param scoring_weights: the scoring_weights table read from the database
+    :param rows: list of (season, attribute) and factor for each batch row,
+    None for the weights as they are
+    '''
+    base = WeightTable(scoring_weights)
+    attr_weights = []
+    func_weights = []
+    for row in rows:
+        if row is None:
+            table = base
+        else:
+            key, factor = row
+            weights = scoring_weights.copy()
+            weights.loc[key, 'score_weight'] = (
+                weights.loc[key, 'score_weight'] * factor)
+            table = WeightTable(weights)
+        attr_weights.append(table.attr_weights)
+        func_weights.append(table.func_weights)
+    arrays, labels = base.arrays()
+    # season x attribute (or function) x batch row x 1
+    arrays = {
+        'attr_weights': np.array(attr_weights).transpose(1, 2, 0)[
+            ..., np.newaxis],
+        'func_weights': np.array(func_weights).transpose(1, 2, 0)[
+            ..., np.newaxis]
+    }
+    return WeightTable.from_arrays(arrays, labels)
+
+
+def run_sensitivity(project, delta=0.1, deltas=None,
+                    credit_column='saleable_credits'):
+    '''
+    Perturbs each input of score_site_scale and calc_credits down and up by
+    a relative delta, holding the others at their current values, and
+    calculates current credits (as run_calculator does) for all
+    perturbations in one batched evaluation. Returns per map unit
+    elasticities (the relative change in credits per relative change in
+    the input, central difference) and a tornado table of the change in
+    project credits of each input, ranked by swing. Elasticity is NaN
+    where credits are within CREDIT_TOLERANCE of 0; use credits_low and
+    credits_high (or the tornado swing) there.
+    :param project: an instance of the CreditData class.
+    :param delta, deltas: see sensitivity_parameters
+    :param credit_column: column of the calc_credits report to analyze
+    '''
+    parameters = sensitivity_parameters(project, delta, deltas)
+
+    # read from database
+    site_scale_values = project.site_scale_values
+    desktop_results = project.desktop_results
+    current_ls = project.current_ls
+    scoring_weights = project.scoring_weights
+    baseline_facres = boot.point_estimates(project)[1]
+
+    # batch rows: current values, then each parameter down and up
+    rows = [(None, None, 1.0)]
+    for name, (kind, key, change) in parameters.items():
+        rows.append((kind, key, 1 - change))
+        rows.append((kind, key, 1 + change))
+    n_rows = len(rows)
+
+    values, site = calc.site_scale_arrays(site_scale_values)
+    for hab_attr in SITE_ATTRS:
+        factors = np.array([
+            factor if kind == 'site' and key == hab_attr else 1.0
+            for kind, key, factor in rows
+            ])
+        values[hab_attr] = values[hab_attr] * factors[:, np.newaxis]
+
+    weight_table = perturbed_weights(scoring_weights, [
+        (key, factor) if kind == 'weight' else None
+        for kind, key, factor in rows
+        ])
+    scores = calc.score_arrays(
+        PerturbedProject(project, weight_table=weight_table), values, site)
+
+    # multipliers of each batch row, in the order of the credit template
+    template = calc.calc_credits(project, desktop_results, baseline_facres,
+                                 baseline_facres)
+    desktop = desktop_results.set_index('map_unit_id').reindex(
+        template['map_unit_id'])
+    policy = project.multipliers_policy.set_index('mgmt_cat')['multiplier']
+    mgmt_multiplier = template['mgmt_multiplier'].values + np.zeros(
+        (n_rows, len(template)))
+    meadow_multiplier = template['meadow_multiplier'].values + np.zeros(
+        (n_rows, len(template)))
+    for i, (kind, key, factor) in enumerate(rows):
+        if kind == 'mgmt':
+            mgmt_multiplier[i] += (
+                (factor - 1) * policy[key]
+                * desktop[key.lower()].fillna(0).values
+                )
+        elif kind == 'meadow':
+            meadow_multiplier[i] *= factor
+
+    template, credits = batch.current_credit_arrays(
+        project, desktop_results, site_scale_values, scores, current_ls,
+        baseline_facres,
+        {'mgmt_multiplier': mgmt_multiplier,
+         'meadow_multiplier': meadow_multiplier})
+    credits = credits[credit_column]
+    base = credits[0]
+    low = credits[1::2]
+    high = credits[2::2]
+    changes = np.array([change for kind, key, change in parameters.values()])
+
+    # elasticity of each map unit, undefined where it has no credits
+    with np.errstate(invalid='ignore', divide='ignore'):
+        elasticity = (high - low) / (2 * changes[:, np.newaxis] * base)
+    elasticity[:, ~(np.abs(base) >= CREDIT_TOLERANCE)] = np.nan
+
+    n_units = len(template)
+    names = list(parameters.keys())
+    elasticities = OrderedDict()
+    elasticities['map_unit_id'] = np.tile(template['map_unit_id'].values,
+                                          len(names))
+    elasticities['map_unit_name'] = np.tile(template['map_unit_name'].values,
+                                            len(names))
+    elasticities['parameter'] = np.repeat(names, n_units)
+    elasticities[credit_column] = np.tile(base, len(names))
+    elasticities['credits_low'] = low.ravel()
+    elasticities['credits_high'] = high.ravel()
+    elasticities['elasticity'] = elasticity.ravel()
+    elasticities = pd.DataFrame(elasticities,
+                                columns=list(elasticities.keys()))
+
+    # project totals of each parameter, ranked by swing
+    totals = pd.DataFrame(credits).sum(axis=1).values
+    tornado = OrderedDict()
+    tornado['parameter'] = names
+    tornado['kind'] = [kind for kind, key, change in parameters.values()]
+    tornado['delta'] = changes
+    tornado['total_low'] = totals[1::2]
+    tornado['total_high'] = totals[2::2]
+    tornado['swing'] = np.abs(totals[2::2] - totals[1::2])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tornado['elasticity'] = np.where(
+            np.abs(totals[0]) >= CREDIT_TOLERANCE,
+            (totals[2::2] - totals[1::2]) / (2 * changes * totals[0]),
+            np.nan)
+    tornado = pd.DataFrame(tornado, columns=list(tornado.keys()))
+    order = np.argsort(-tornado['swing'].values, kind='mergesort')
+    tornado = tornado.iloc[order].reset_index(drop=True)
+    tornado.insert(0, 'rank', np.arange(1, len(tornado) + 1))
+    tornado.insert(len(tornado.columns) - 1, 'total_credits', totals[0])
+
+    return elasticities, tornado
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+import numpy as np
+
+
+# Treatment of a map unit that is left untreated
+NO_TREATMENT = 'none'
+
+METHODS = ['greedy', 'dp']
+
+# Range of the number of budget steps of the dynamic program
+MIN_STEPS = 1000
+MAX_STEPS = 100000
+
+# Cap on the map unit x step cells of the dynamic program's traceback table
+# (one byte per cell for up to 127 options), which bounds its memory
+MAX_TABLE_CELLS = 50000000
+
+
+def treatment_options(scenario_report, costs):
+    '''
+    Returns the map unit x option arrays of saleable credits and total cost,
+    and the option names. Options are the columns of scenario_report with a
+    cost; options with missing or no positive credits on a map unit are
+    never worth their cost and are marked unavailable (NaN credits).
+    :param scenario_report: saleable credits per map unit and scenario, from
+    scenario_calc.run_scenario_report
+    :param costs: dict of cost per acre keyed by scenario column, e.g.
+    {'brotec_high': 120.0}
+    '''
+    options = [column for column in scenario_report.columns
+               if column in costs]
+    if not options:
+        raise ValueError(
+            'costs must include at least one scenario column: {}'.format(
+                ', '.join(scenario_report.columns[4:]))
+            )
+    credits = np.asarray(scenario_report[options], dtype='float64')
+    area = np.asarray(scenario_report['map_unit_area'], dtype='float64')
+    per_acre = np.array([costs[option] for option in options],
+                        dtype='float64')
+    cost = area[:, np.newaxis] * per_acre
+    with np.errstate(invalid='ignore'):
+        unavailable = ~(credits > 0) | np.isnan(cost)
+    credits[unavailable] = np.nan
+    return credits, cost, options
+
+
+def efficient_steps(credits, cost):
+    '''
+    Returns the steps along the upper convex hull of the options of one map
+    unit, starting from no treatment, as (option, added credits, added cost)
+    with decreasing credits per unit cost. Options off the hull are
+    dominated in the linear relaxation of the knapsack.
+    :param credits, cost: arrays of each option of the map unit
+    '''
+    available = np.flatnonzero(~np.isnan(credits))
+    # cheapest first, most credits first among equal costs
+    order = available[np.lexsort((-credits[available], cost[available]))]
+    hull = [(-1, 0.0, 0.0)]
+    for option in order:
+        point = (option, credits[option], cost[option])
+        if point[1] <= hull[-1][1]:
+            continue
+        while len(hull) > 1:
+            (_, c1, w1), (_, c2, w2) = hull[-2], hull[-1]
+            # drop the last point if it lies on or below the line to point
+            if (c2 - c1) * (point[2] - w1) <= (point[1] - c1) * (w2 - w1):
+                hull.pop()
+            else:
+                break
+        hull.append(point)
+    return [
+        (option, c2 - c1, w2 - w1)
+        for (_, c1, w1), (option, c2, w2) in zip(hull[:-1], hull[1:])
+        ]
+
+
+def greedy_selection(credits, cost, budget):
+    '''
+    Multiple-choice knapsack by the greedy algorithm: takes the steps of all
+    map units' efficient_steps in order of credits per unit cost while they
+    fit the budget. Returns the option chosen for each map unit (-1 for none)
+    and the upper bound on total credits from the linear relaxation.
+    :param credits, cost: map unit x option arrays from treatment_options
+    :param budget: total budget
+    '''
+    steps = []
+    for unit in range(len(credits)):
+        for option, added_credits, added_cost in efficient_steps(
+                credits[unit], cost[unit]):
+            steps.append((unit, option, added_credits, added_cost))
+
+    choice = -np.ones(len(credits), dtype='int64')
+    blocked = np.zeros(len(credits), dtype=bool)
+    remaining = float(budget)
+    total = 0.0
+    bound = None
+    # highest credits per unit cost first, free steps before all others
+    steps.sort(key=lambda step: (
+        -np.inf if step[3] <= 0 else -step[2] / step[3]))
+    for unit, option, added_credits, added_cost in steps:
+        if blocked[unit]:
+            continue
+        if added_cost <= remaining:
+            choice[unit] = option
+            remaining -= added_cost
+            total += added_credits
+            continue
+        # the remaining steps of this unit build on this one
+        blocked[unit] = True
+        if bound is None:
+            bound = total + added_credits * remaining / added_cost
+    if bound is None:
+        bound = total
+    return choice, bound
+
+
+def dp_selection(credits, cost, budget, steps=None):
+    '''
+    Multiple-choice knapsack by dynamic programming over the budget divided
+    into steps. Costs are rounded up to whole steps, so the selection never
+    exceeds the budget and is optimal at that resolution. Returns the option
+    chosen for each map unit (-1 for none).
+    :param credits, cost: map unit x option arrays from treatment_options
+    :param budget: total budget
+    :param steps: number of steps the budget is divided into, if None
+    enough that a step is a tenth of the cheapest option (from MIN_STEPS to
+    MAX_STEPS, and at most MAX_TABLE_CELLS / map units)
+    '''
+    n_units, n_options = credits.shape
+    max_steps = MAX_TABLE_CELLS // max(n_units, 1) - 1
+    if steps is None:
+        cheapest = cost[~np.isnan(credits) & (cost > 0)]
+        steps = MIN_STEPS
+        if len(cheapest) > 0:
+            steps = int(np.clip(np.ceil(10 * budget / cheapest.min()),
+                                MIN_STEPS, MAX_STEPS))
+        if max_steps >= MIN_STEPS:
+            steps = min(steps, max_steps)
+    if steps > max_steps:
+        raise ValueError(
+            '{} steps over {} map units exceed MAX_TABLE_CELLS ({}), use at '
+            'most {} steps or the greedy method'.format(
+                steps, n_units, MAX_TABLE_CELLS, max(max_steps, 0))
+            )
+    resolution = float(budget) / steps if budget > 0 else 1.0
+    with np.errstate(invalid='ignore'):
+        weights = np.ceil(cost / resolution - 1e-9)
+    available = ~np.isnan(credits) & (weights <= steps)
+    weights = np.where(available, weights, 0).astype('int64')
+
+    best = np.zeros(steps + 1)
+    dtype = 'int8' if n_options <= np.iinfo('int8').max else 'int16'
+    chosen = -np.ones((n_units, steps + 1), dtype=dtype)
+    for unit in range(n_units):
+        updated = best.copy()
+        for option in np.flatnonzero(available[unit]):
+            weight = weights[unit, option]
+            candidate = best[:steps + 1 - weight] + credits[unit, option]
+            better = candidate > updated[weight:]
+            updated[weight:][better] = candidate[better]
+            chosen[unit, weight:][better] = option
+        best = updated
+
+    # trace the choices back from the full budget
+    choice = -np.ones(n_units, dtype='int64')
+    remaining = steps
+    for unit in range(n_units - 1, -1, -1):
+        option = chosen[unit, remaining]
+        if option >= 0:
+            choice[unit] = option
+            remaining -= weights[unit, option]
+    return choice
+
+
+def selected_credits(credits, choice):
+    '''Returns the total credits of the options chosen for each map unit'''
+    treated = np.flatnonzero(choice >= 0)
+    return credits[treated, choice[treated]].sum()
+
+
+def optimize_treatments(scenario_report, costs, budget, method='greedy',
+                        steps=None):
+    '''
+    Selects at most one scenario and effort level per map unit to maximize
+    total saleable credits within a budget, a multiple-choice knapsack over
+    the scenario report. Returns the selected treatment of each map unit
+    and a summary of total credits and cost, with the upper bound on the
+    total credits of any selection from the linear relaxation.
+    :param scenario_report: saleable credits per map unit and scenario, from
+    scenario_calc.run_scenario_report
+    :param costs: dict of cost per acre keyed by scenario column, e.g.
+    {'brotec_high': 120.0}; columns without a cost are not treatments
+    :param budget: total budget, in the units of costs times acres
+    :param method: 'greedy' (fast, near optimal on large projects) or 'dp'
+    (optimal with costs rounded up to a step of the budget, slower and
+    better suited to projects with few map units or a small budget). 'dp'
+    keeps a map unit x step table of up to MAX_TABLE_CELLS cells (about
+    50 MB), so the default steps shrink as map units grow, and it raises
+    ValueError above MAX_TABLE_CELLS / MIN_STEPS (50,000) map units or if
+    steps is set past the cap.
+    :param steps: number of steps the budget is divided into for 'dp', see
+    dp_selection
+    '''
+    if method not in METHODS:
+        raise ValueError(
+            'method must be one of {}'.format(', '.join(METHODS))
+            )
+    credits, cost, options = treatment_options(scenario_report, costs)
+
+    # the greedy selection also bounds the credits of any selection
+    choice, bound = greedy_selection(credits, cost, budget)
+    if method == 'dp':
+        # costs rounded up to the step can cost the dynamic program more
+        # credits than the greedy selection loses, keep the better of the two
+        dp_choice = dp_selection(credits, cost, budget, steps)
+        if selected_credits(credits, dp_choice) >= selected_credits(credits,
+                                                                    choice):
+            choice = dp_choice
+
+    units = np.arange(len(choice))
+    treated = choice >= 0
+    column = np.where(treated, choice, 0)
+    selection = scenario_report[['map_unit_id', 'map_unit_name',
+                                 'map_unit_area']].copy()
+    selection['treatment'] = np.where(
+        treated, np.array(options, dtype=object)[column], NO_TREATMENT)
+    selection['cost'] = np.where(treated, cost[units, column], 0)
+    selection['saleable_credits'] = np.where(treated,
+                                             credits[units, column], 0)
+
+    summary = OrderedDict()
+    summary['budget'] = budget
+    summary['cost'] = selection['cost'].sum()
+    summary['saleable_credits'] = selection['saleable_credits'].sum()
+    summary['upper_bound'] = bound
+
+    return selection, summary
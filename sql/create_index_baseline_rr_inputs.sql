@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS idx_baseline_rr_inputs_map_unit_id ON baseline_rr_inputs (
+    map_unit_id,
+    rr_score,
+    wildfire_score,
+    land_use_contribution
+);
\ No newline at end of file
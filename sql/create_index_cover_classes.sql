@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_cover_classes_class ON cover_classes (
+    class,
+    cover
+);
\ No newline at end of file
@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS idx_current_ls_map_unit_id ON current_ls (
+    map_unit_id,
+    ls_breed,
+    ls_summer,
+    ls_winter
+);
\ No newline at end of file
@@ -0,0 +1,3 @@
+CREATE INDEX IF NOT EXISTS idx_desktop_results_map_unit_id ON desktop_results (
+    map_unit_id
+);
\ No newline at end of file
@@ -0,0 +1,3 @@
+CREATE INDEX IF NOT EXISTS idx_field_info_transect_id ON field_info (
+    transect_id
+);
\ No newline at end of file
@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_forb_grass_data_transect_id ON forb_grass_data (
+    transect_id,
+    unique_forbs
+);
\ No newline at end of file
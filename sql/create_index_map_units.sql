@@ -0,0 +1,3 @@
+CREATE INDEX IF NOT EXISTS idx_map_units_map_unit_id ON map_units (
+    map_unit_id
+);
\ No newline at end of file
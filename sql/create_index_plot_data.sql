@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS idx_plot_data_transect_id ON plot_data (
+    transect_id,
+    forb_class,
+    grass_class,
+    brotec_class
+);
\ No newline at end of file
@@ -0,0 +1,5 @@
+CREATE INDEX IF NOT EXISTS idx_project_mgmt_cats_map_unit_id ON project_mgmt_cats (
+    map_unit_id,
+    mgmt_cat,
+    proportion
+);
\ No newline at end of file
@@ -0,0 +1,5 @@
+CREATE INDEX IF NOT EXISTS idx_project_precip_map_unit_id ON project_precip (
+    map_unit_id,
+    precip,
+    proportion
+);
\ No newline at end of file
@@ -0,0 +1,5 @@
+CREATE INDEX IF NOT EXISTS idx_project_wmz_map_unit_id ON project_wmz (
+    map_unit_id,
+    wmz,
+    proportion
+);
\ No newline at end of file
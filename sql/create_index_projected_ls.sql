@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS idx_projected_ls_map_unit_id ON projected_ls (
+    map_unit_id,
+    ls_breed,
+    ls_summer,
+    ls_winter
+);
\ No newline at end of file
@@ -0,0 +1,5 @@
+CREATE INDEX IF NOT EXISTS idx_rr_add_contribution_rr ON rr_add_contribution (
+    rr,
+    wildfire,
+    contribution
+);
\ No newline at end of file
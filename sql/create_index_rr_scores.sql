@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_rr_scores_score ON rr_scores (
+    score,
+    category
+);
\ No newline at end of file
@@ -0,0 +1,7 @@
+CREATE INDEX IF NOT EXISTS idx_shrub_data_transect_id ON shrub_data (
+    transect_id,
+    shrub_type,
+    shrub_start,
+    shrub_end,
+    shrub_height
+);
\ No newline at end of file
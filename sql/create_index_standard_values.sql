@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_standard_values_variable ON standard_values (
+    variable,
+    standard_value
+);
\ No newline at end of file
@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_transect_metrics_map_unit_id ON transect_metrics (
+    map_unit_id,
+    sage_species
+);
\ No newline at end of file
@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_wildfire_scores_score ON wildfire_scores (
+    score,
+    category
+);
\ No newline at end of file
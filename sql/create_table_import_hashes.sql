@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS import_hashes (
+    table_name text PRIMARY KEY,
+    content_hash text,
+    imported_at text
+);
\ No newline at end of file
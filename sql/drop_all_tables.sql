@@ -28,6 +28,9 @@ DROP TABLE IF EXISTS scoring_weights;
 DROP TABLE IF EXISTS standard_baseline;
 DROP TABLE IF EXISTS standard_values;
 DROP TABLE IF EXISTS wildfire_scores;
+DROP TABLE IF EXISTS import_hashes;
+DROP TABLE IF EXISTS transect_metrics;
+DROP TABLE IF EXISTS site_scale_metrics;
 DROP VIEW IF EXISTS view_desktop_results;
 DROP VIEW IF EXISTS view_transect_data;
 DROP VIEW IF EXISTS view_site_scale_values;
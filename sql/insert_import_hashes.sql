@@ -0,0 +1,5 @@
+INSERT OR REPLACE INTO import_hashes (
+    table_name,
+    content_hash,
+    imported_at)
+    VALUES(?, ?, ?)
\ No newline at end of file
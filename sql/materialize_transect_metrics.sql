@@ -0,0 +1,49 @@
+CREATE TABLE IF NOT EXISTS transect_metrics AS
+    SELECT f.map_unit_id,
+           f.map_unit_name,
+           f.transect_id,
+           f.meadow,
+           f.sage_species,
+           f.dist_sage,
+           s.sage_cover,
+           s.sage_height,
+           s.shrub_cover,
+           p.forb_cover,
+           g.unique_forbs,
+           p.grass_cover,
+           p.brotec_cover
+      FROM field_info AS f
+           LEFT JOIN
+           (
+               SELECT transect_id,
+                      SUM(CASE WHEN shrub_type != 'Other' THEN shrub_end - shrub_start END) / 50 AS sage_cover,
+                      AVG(CASE WHEN shrub_type != 'Other' THEN shrub_height END) AS sage_height,
+                      SUM(shrub_end - shrub_start) / 50 AS shrub_cover
+                 FROM shrub_data
+                GROUP BY transect_id
+           )
+           AS s ON s.transect_id = f.transect_id
+           LEFT JOIN
+           (
+               SELECT plot_data.transect_id,
+                      AVG(fc.cover) AS forb_cover,
+                      AVG(gc.cover) AS grass_cover,
+                      AVG(bc.cover) AS brotec_cover
+                 FROM plot_data
+                      LEFT JOIN
+                      cover_classes AS fc ON plot_data.forb_class = fc.class
+                      LEFT JOIN
+                      cover_classes AS gc ON plot_data.grass_class = gc.class
+                      LEFT JOIN
+                      cover_classes AS bc ON plot_data.brotec_class = bc.class
+                GROUP BY plot_data.transect_id
+           )
+           AS p ON p.transect_id = f.transect_id
+           LEFT JOIN
+           (
+               SELECT transect_id,
+                      unique_forbs
+                 FROM forb_grass_data
+                GROUP BY transect_id
+           )
+           AS g ON g.transect_id = f.transect_id;
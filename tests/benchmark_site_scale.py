@@ -0,0 +1,110 @@
+import os
+import random
+import sqlite3
+import time
+
+# Compares the view_transect_data and view_site_scale_values views against 
+# the materialized transect_metrics and site_scale_metrics tables on a 
+# synthetic project. Run from the repository root.
+
+# Size of the synthetic project (map_units * transects_per_unit transects)
+map_units = 2000
+transects_per_unit = 6
+random.seed(0)
+
+conn = sqlite3.connect(':memory:')
+
+# Create schema
+for filename in os.listdir('sql/'):
+    if filename.startswith('create_table'):
+        with open(os.path.join('sql', filename), 'r') as file:
+            conn.execute(file.read())
+
+# Populate tables used by the views
+conn.executemany(
+    'INSERT INTO cover_classes VALUES (?, ?, ?)',
+    [(1, 0, 0), (1, 1, 0.025), (1, 2, 0.15), (1, 3, 0.375), (1, 4, 0.625),
+     (1, 5, 0.85), (1, 6, 0.975)]
+)
+transect_id = 0
+for map_unit_id in range(1, map_units + 1):
+    meadow = random.choice(['No Meadow', 'No Meadow', 'Altered', 'Unaltered'])
+    conn.execute(
+        'INSERT INTO map_units (map_unit_id, map_unit_name, meadow, '
+        'indirect_benefits_area, map_unit_area) VALUES (?, ?, ?, ?, ?)',
+        (map_unit_id, 'MU{}'.format(map_unit_id), meadow, 0, 
+         random.uniform(5, 500))
+    )
+    conn.execute('INSERT INTO project_precip VALUES (?, ?, ?)',
+                 (map_unit_id, 'Arid', 1.0))
+    species = random.choice(['Big Sagebrush', 'Low or Black Sagebrush'])
+    for _ in range(transects_per_unit):
+        transect_id += 1
+        conn.execute(
+            'INSERT INTO field_info (map_unit_id, map_unit_name, transect_id, '
+            'meadow, sage_species, dist_sage) VALUES (?, ?, ?, ?, ?, ?)',
+            (map_unit_id, 'MU{}'.format(map_unit_id), transect_id, meadow,
+             species, random.uniform(0, 500))
+        )
+        start = 0.0
+        for _ in range(random.randint(0, 10)):
+            start += random.uniform(0, 3)
+            end = start + random.uniform(0, 2)
+            conn.execute(
+                'INSERT INTO shrub_data VALUES (?, ?, ?, ?, ?, ?)',
+                (map_unit_id, transect_id, 
+                 random.choice(['Sagebrush', 'Sagebrush', 'Other']),
+                 start, end, random.uniform(10, 80))
+            )
+            start = end
+        for plot_id in range(1, 6):
+            conn.execute(
+                'INSERT INTO plot_data VALUES (?, ?, ?, ?, ?, ?)',
+                (plot_id, map_unit_id, transect_id, random.randint(0, 6), 
+                 random.randint(0, 6), random.randint(0, 6))
+            )
+        conn.execute(
+            'INSERT INTO forb_grass_data (map_unit_id, transect_id, '
+            'unique_forbs) VALUES (?, ?, ?)',
+            (map_unit_id, transect_id, random.randint(0, 12))
+        )
+conn.commit()
+
+for view in ['view_desktop_results', 'view_transect_data', 
+             'view_site_scale_values']:
+    with open(os.path.join('sql', view + '.sql'), 'r') as file:
+        conn.execute(file.read())
+
+# Time the views
+start = time.time()
+view_rows = conn.execute(
+    'SELECT * FROM view_site_scale_values ORDER BY map_unit_id').fetchall()
+view_seconds = time.time() - start
+
+# Time building the materialized tables and reading from them
+start = time.time()
+for table in ['transect_metrics', 'site_scale_metrics']:
+    with open(os.path.join('sql', 'materialize_' + table + '.sql'), 'r') as file:
+        conn.execute(file.read())
+build_seconds = time.time() - start
+
+start = time.time()
+table_rows = conn.execute(
+    'SELECT * FROM site_scale_metrics ORDER BY map_unit_id').fetchall()
+read_seconds = time.time() - start
+
+print('{} transects in {} map units'.format(transect_id, map_units))
+print('view_site_scale_values: {} seconds'.format(round(view_seconds, 3)))
+print('materialize tables: {} seconds'.format(round(build_seconds, 3)))
+print('site_scale_metrics read: {} seconds'.format(round(read_seconds, 3)))
+
+# Test if materialized tables match the views
+transect_view = conn.execute(
+    'SELECT * FROM view_transect_data ORDER BY transect_id').fetchall()
+transect_table = conn.execute(
+    'SELECT * FROM transect_metrics ORDER BY transect_id').fetchall()
+assert(transect_view == transect_table)
+assert(view_rows == table_rows)
+
+# Print success message if no error
+print('Passes')
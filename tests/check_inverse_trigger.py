@@ -0,0 +1,73 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, 'database')
+
+import numpy as np
+import credit_calc as calc
+import inverse_calc as inv
+from models import CreditData
+from response_surface import ResponseSurface
+
+# Sets shrub or grass cover of a few map units to exactly the breeding
+# trigger (0.3) or one float above it, then solves targets with
+# inverse_calc.solve_targets and checks each solved value against
+# ResponseSurface.credits. Run from the repository root with the path to a
+# project database, e.g. python tests/check_inverse_trigger.py project.db;
+# the database is copied, not changed.
+
+trigger = calc.BREEDING_TRIGGER
+folder = tempfile.mkdtemp()
+db = os.path.join(folder, 'project.db')
+shutil.copy(sys.argv[1], db)
+
+# cover values on and just above the trigger, by map unit
+conn = sqlite3.connect(db)
+map_unit_ids = [map_unit_id for (map_unit_id,) in conn.execute(
+    'SELECT map_unit_id FROM site_scale_metrics ORDER BY map_unit_id')]
+updates = [
+    ('grass_cover', trigger),
+    ('shrub_cover', trigger),
+    ('grass_cover', np.nextafter(trigger, np.inf)),
+    ('shrub_cover', np.nextafter(trigger, np.inf))
+]
+for map_unit_id, (hab_attr, value) in zip(map_unit_ids, updates):
+    conn.execute(
+        'UPDATE site_scale_metrics SET {} = ? WHERE map_unit_id = ?'.format(
+            hab_attr), (float(value), map_unit_id))
+conn.commit()
+conn.close()
+
+project = CreditData(db)
+surface = ResponseSurface(project)
+
+# the trigger breakpoint is the first value that sets the trigger
+other = np.array([trigger, np.nextafter(trigger, np.inf)])
+breakpoints = inv.trigger_breakpoints(other)
+assert(((breakpoints + other) > trigger).all())
+assert(not ((np.nextafter(breakpoints, -np.inf) + other) > trigger).any())
+
+for direction in [None, 'increase', 'decrease']:
+    start = time.time()
+    results = inv.solve_targets(project, 5.0, direction=direction,
+                                surface=surface)
+    print('{}: solved {} of {} in {} seconds'.format(
+        direction, results['value'].notnull().sum(), len(results),
+        round(time.time() - start, 3)))
+
+    # Test that every solved value reaches the target with the credits given
+    solved = results[results['value'].notnull()]
+    for row in solved.itertuples():
+        credits = surface.credits(row.map_unit_id, row.hab_attr, row.value)
+        assert(credits == row.credits)
+        assert(credits >= row.target)
+
+project.conn.close()
+shutil.rmtree(folder)
+
+# Print success message if no error
+print('Passes')
@@ -0,0 +1,141 @@
+import os
+import re
+import sqlite3
+
+# Creates the schema, indexes, views and materialized tables in an in-memory
+# database, runs ANALYZE and checks the query plan of every view and 
+# materialized table. Fails if a project table is read with a full scan 
+# inside a nested loop (an inner loop of a join or a correlated subquery).
+# Run from the repository root.
+
+# Policy tables are small and of fixed size, full scans of these are accepted
+policy_tables = [table[:-4].replace('-', '_') 
+                 for table in os.listdir(os.path.join('data', 'policy-tables'))]
+
+
+def read_sql(filename):
+    with open(os.path.join('sql', filename), 'r') as file:
+        return file.read()
+
+
+def nested_full_scans(conn, query, definition, tables):
+    """
+    Returns (table, plan detail) for each nested full scan of tables
+    :param query: the query to explain
+    :param definition: sql the query reads from, used to resolve aliases
+    :param tables: names of the tables to check
+    """
+    # map aliases used in the definition to table names
+    aliases = dict((table, table) for table in tables)
+    for table, alias in re.findall(r'(\w+)\s+AS\s+(\w+)', definition, 
+                                   re.IGNORECASE):
+        if table in tables:
+            aliases[alias] = table
+
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + query).fetchall()
+    nodes = dict((node, (parent, detail)) for node, parent, _, detail in plan)
+    outer_loops = set()
+    offenders = []
+    for node, parent, _, detail in plan:
+        words = detail.split()
+        if words[0] not in ('SCAN', 'SEARCH'):
+            continue
+        # a loop is nested if its select already has an outer loop or if it
+        # runs inside a correlated subquery
+        nested = parent in outer_loops
+        outer_loops.add(parent)
+        ancestor = parent
+        while ancestor in nodes:
+            ancestor, ancestor_detail = nodes[ancestor]
+            if ancestor_detail.startswith('CORRELATED'):
+                nested = True
+        table = aliases.get(words[1])
+        if nested and words[0] == 'SCAN' and table in tables:
+            offenders.append((table, detail))
+    return offenders
+
+
+conn = sqlite3.connect(':memory:')
+
+# Create schema
+for filename in sorted(os.listdir('sql/')):
+    if filename.startswith('create_table'):
+        conn.execute(read_sql(filename))
+
+# Populate a small project so ANALYZE has statistics to work with
+conn.executemany('INSERT INTO cover_classes VALUES (?, ?, ?)',
+                 [(1, c, c / 6.0) for c in range(7)])
+conn.executemany('INSERT INTO standard_values VALUES (?, ?, ?)',
+                 [(1, 'meadow_multiplier', 8), 
+                  (1, 'standard_contribution', 0.04)])
+for map_unit_id in range(1, 51):
+    conn.execute('INSERT INTO map_units (map_unit_id, map_unit_name) '
+                 'VALUES (?, ?)', (map_unit_id, 'MU'))
+    for table in ['current_ls', 'projected_ls']:
+        conn.execute('INSERT INTO {} VALUES (?, ?, ?, ?)'.format(table),
+                     (map_unit_id, 0.5, 0.5, 0.5))
+    for table, value in [('project_mgmt_cats', 'PHMA'), 
+                         ('project_wmz', 'MZ III'), 
+                         ('project_precip', 'Arid')]:
+        conn.execute('INSERT INTO {} VALUES (?, ?, ?)'.format(table),
+                     (map_unit_id, value, 1.0))
+    conn.execute('INSERT INTO baseline_rr_inputs (map_unit_id, rr_score, '
+                 'wildfire_score, land_use_contribution) '
+                 'VALUES (?, ?, ?, ?)', (map_unit_id, 10, 20, 0))
+    conn.execute('INSERT INTO desktop_results (map_unit_id) VALUES (?)',
+                 (map_unit_id,))
+    for transect in range(5):
+        transect_id = map_unit_id * 10 + transect
+        conn.execute('INSERT INTO field_info (map_unit_id, transect_id) '
+                     'VALUES (?, ?)', (map_unit_id, transect_id))
+        conn.execute('INSERT INTO forb_grass_data (map_unit_id, transect_id, '
+                     'unique_forbs) VALUES (?, ?, ?)', 
+                     (map_unit_id, transect_id, 5))
+        for plot_id in range(1, 6):
+            conn.execute('INSERT INTO plot_data VALUES (?, ?, ?, ?, ?, ?)',
+                         (plot_id, map_unit_id, transect_id, 1, 2, 3))
+            conn.execute('INSERT INTO shrub_data VALUES (?, ?, ?, ?, ?, ?)',
+                         (map_unit_id, transect_id, 'Sagebrush', 
+                          plot_id, plot_id + 0.5, 30))
+conn.commit()
+
+# Create views, materialized tables and indexes, then gather statistics
+views = ['view_desktop_results', 'view_transect_data', 
+         'view_site_scale_values', 'view_reserve_account', 'view_baseline']
+materialized = ['transect_metrics', 'site_scale_metrics']
+for view in views:
+    conn.execute(read_sql(view + '.sql'))
+for table in materialized:
+    conn.execute(read_sql('materialize_' + table + '.sql'))
+for filename in sorted(os.listdir('sql/')):
+    if filename.startswith('create_index'):
+        conn.execute(read_sql(filename))
+conn.execute('ANALYZE')
+
+project_tables = [
+    name for (name,) in 
+    conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    if name not in policy_tables and not name.startswith('sqlite_')
+]
+
+# Queries to check, the select statement of each view and materialized table
+queries = [(view, 'SELECT * FROM ' + view, read_sql(view + '.sql')) 
+           for view in views]
+for table in materialized:
+    definition = read_sql('materialize_' + table + '.sql')
+    query = re.sub(r'^CREATE TABLE IF NOT EXISTS \w+ AS', '', definition)
+    queries.append((table, query.strip(), definition))
+
+failed = False
+for name, query, definition in queries:
+    print(name)
+    offenders = nested_full_scans(conn, query, definition, project_tables)
+    for table, detail in offenders:
+        print('  nested full scan of {}: {}'.format(table, detail))
+    failed = failed or bool(offenders)
+
+# Test that no view or materialized table falls back to a nested full scan
+assert(not failed)
+
+# Print success message if no error
+print('Passes')
@@ -0,0 +1,219 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, 'database')
+
+try:
+    from pandas.testing import assert_frame_equal
+except ImportError:  # pandas < 0.20
+    from pandas.util.testing import assert_frame_equal
+import numpy as np
+import pandas as pd
+import credit_calc as calc
+import scenario_calc as scen
+import batch_calc as batch
+from models import CreditData
+
+# Compares the credit reports from calc_credits and from the batched
+# scenario engine against a frozen copy of the merge-based calc_facres and
+# calc_credits (reference_facres, reference_credits below) run on each
+# scenario in turn. The reference is kept here, unchanged, so that changes
+# to the array kernels shared by credit_calc and batch_calc are checked
+# against it rather than against themselves. Run from the repository root
+# with the path to a project database, e.g.
+# python tests/compare_batch_credits.py project.db
+
+
+def reference_facres(desktop_results, site_scale_scores, local_scale):
+    """Returns f-acre report for any set of site_scale_scores"""
+    facres_report = (
+        desktop_results[
+            ['map_unit_id', 'map_unit_name', 'meadow', 'map_unit_area']
+            ]
+        .copy()
+    )
+    facres_report = pd.merge(facres_report, local_scale, how='left',
+                             on='map_unit_id')
+    facres_report = pd.merge(
+        facres_report,
+        site_scale_scores[['map_unit_id', 'breed', 'summer', 'winter']],
+        how='left', on='map_unit_id')
+
+    for season in ['breed', 'summer', 'winter']:
+        facres_report[season + '_overall'] = (
+            facres_report[season] * facres_report['ls_' + season]
+        )
+        facres_report[season + '_facres'] = (
+            facres_report[season + '_overall']
+            * facres_report['map_unit_area']
+        )
+
+    facres_col_order = [
+        'map_unit_id', 'map_unit_name', 'meadow', 'map_unit_area',
+        'breed', 'ls_breed', 'breed_overall', 'breed_facres',
+        'summer', 'ls_summer', 'summer_overall', 'summer_facres',
+        'winter', 'ls_winter', 'winter_overall', 'winter_facres'
+    ]
+    return facres_report[facres_col_order]
+
+
+def reference_credits(project, desktop_results, pre_facre_report,
+                      post_facre_report):
+    """
+    Returns credits as difference between pre_facre_report and
+    post_facre_report.
+    """
+    reserve_account = project.reserve_account
+    standard_values = project.standard_values
+    multipliers_policy = project.multipliers_policy
+
+    credit_compare = pd.merge(
+        pre_facre_report, post_facre_report,
+        on=['map_unit_id', 'map_unit_name', 'meadow', 'map_unit_area'],
+        suffixes=('_pre', '_post'))
+    for season in ['breed', 'summer', 'winter']:
+        credit_compare[season + '_delta'] = (
+            credit_compare[season + '_facres_post']
+            - credit_compare[season + '_facres_pre']
+        )
+
+    # weighted average of the mgmt multipliers
+    multipliers_df = (
+        desktop_results[['map_unit_id', 'phma', 'ghma', 'ohma']].copy()
+    )
+    for mgmt_cat in ['PHMA', 'GHMA', 'OHMA']:
+        col_name = mgmt_cat.lower()
+        filt = multipliers_policy['mgmt_cat'] == mgmt_cat
+        multipliers_df[col_name] = (
+            multipliers_df[col_name]
+            * multipliers_policy.loc[filt, 'multiplier'].values
+        )
+    col_names = [mgmt_cat.lower() for mgmt_cat in ['PHMA', 'GHMA', 'OHMA']]
+    multipliers_df['mgmt_multiplier'] = multipliers_df[col_names].sum(axis=1)
+    credit_compare = pd.merge(
+        credit_compare, multipliers_df[['map_unit_id', 'mgmt_multiplier']],
+        on='map_unit_id')
+
+    # meadow multiplier, 0 if not meadow
+    standard_values.set_index('variable', inplace=True)
+    credit_compare['meadow_multiplier'] = (
+        standard_values.at['meadow_multiplier', 'standard_value']
+    )
+    filt = credit_compare['meadow'] == 'No Meadow'
+    credit_compare.loc[filt, 'meadow_multiplier'] = 0
+
+    credit_compare['breed_credits'] = (
+        credit_compare['breed_delta'] * credit_compare['mgmt_multiplier']
+    )
+    credit_compare['summer_credits'] = (
+        credit_compare['summer_delta']
+        * (credit_compare['mgmt_multiplier']
+           + credit_compare['meadow_multiplier'])
+    )
+    credit_compare['winter_credits'] = (
+        credit_compare['winter_delta'] * credit_compare['mgmt_multiplier']
+    )
+
+    # credits are the maximum seasonal credits
+    credit_columns = ['breed_credits', 'summer_credits', 'winter_credits']
+    season_dict = {
+        np.nan: 'None',
+        'breed_credits': 'Breeding',
+        'summer_credits': 'Late Brood-Rearing',
+        'winter_credits': 'Winter'
+    }
+    credit_compare['habitat_type'] = (
+        credit_compare.loc[:, credit_columns].idxmax(axis=1)
+    )
+    credit_compare['habitat_type'] = (
+        credit_compare['habitat_type'].map(season_dict)
+    )
+    credit_compare['credits'] = (
+        credit_compare.loc[:, credit_columns].max(axis=1)
+    )
+    filt = credit_compare['credits'] == 0
+    credit_compare.loc[filt, 'habitat_type'] = 'None'
+
+    # reserve account contribution
+    credit_compare = pd.merge(
+        credit_compare,
+        reserve_account[['map_unit_id', 'total_contribution']],
+        on='map_unit_id')
+    credit_compare['reserve_credits'] = (
+        credit_compare['credits'] * credit_compare['total_contribution']
+    )
+    credit_compare['saleable_credits'] = (
+        credit_compare['credits'] - credit_compare['reserve_credits']
+    )
+    return credit_compare
+
+
+project = CreditData(sys.argv[1])
+desktop_results = project.desktop_results
+site_scale_values = project.site_scale_values
+projected_ls = project.projected_ls
+
+current_site_scale = calc.score_site_scale(project, site_scale_values)
+current_facres = calc.calc_facres(desktop_results, current_site_scale,
+                                  project.current_ls)
+reference_current = reference_facres(desktop_results, current_site_scale,
+                                     project.current_ls)
+
+# Base scenarios plus the projected values from the Calculator, which leave
+# out map units without projected values
+scenarios = scen.run_base_scenarios(site_scale_values.set_index('map_unit_id'),
+                                     tidy=True)
+names = []
+projected_values_list = []
+for scenario_name, scenario_results in scenarios.items():
+    for effort, projected_values in scenario_results.items():
+        names.append(scenario_name + '_' + effort)
+        projected_values_list.append(projected_values)
+names.append('calculator')
+projected_values_list.append(project.projected_values)
+
+# Calculate credits one scenario at a time, by the reference and by
+# calc_facres and calc_credits
+start = time.time()
+expected = []
+facres = []
+credits = []
+for projected_values in projected_values_list:
+    projected_site_scale = calc.project_site_scale(projected_values,
+                                                   site_scale_values)
+    projected_scores = calc.score_site_scale(project, projected_site_scale)
+    reference_projected = reference_facres(desktop_results, projected_scores,
+                                           projected_ls)
+    expected.append(reference_credits(project, desktop_results,
+                                      reference_current, reference_projected))
+    projected_facres = calc.calc_facres(desktop_results, projected_scores,
+                                        projected_ls)
+    facres.append((projected_facres, reference_projected))
+    credits.append(calc.calc_credits(project, desktop_results,
+                                     current_facres, projected_facres))
+loop_seconds = time.time() - start
+
+# Calculate credits for all scenarios in one pass
+start = time.time()
+credit_reports = batch.calc_batch_credits(project, names,
+                                          projected_values_list,
+                                          current_facres)
+batch_seconds = time.time() - start
+
+print('{} scenarios: one at a time {} seconds, batched {} seconds'.format(
+    len(names), round(loop_seconds, 3), round(batch_seconds, 3)))
+
+# Test if the reports are the same as the reference
+assert_frame_equal(current_facres, reference_current, check_dtype=True)
+for report, reference in facres:
+    assert_frame_equal(report, reference, check_dtype=True)
+assert(list(credit_reports.keys()) == names)
+for name, report, reference in zip(names, credits, expected):
+    assert_frame_equal(report, reference, check_dtype=True)
+    assert_frame_equal(credit_reports[name], reference, check_dtype=True)
+
+project.conn.close()
+
+# Print success message if no error
+print('Passes')